@@ -0,0 +1,49 @@
+"""single active production instance per project
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+PRODUCTION_INDEX = "uq_odoo_instances_active_production"
+ACTIVE_PRODUCTION = "instance_type = 'PRODUCTION' AND is_active"
+
+
+def upgrade():
+    # The index cannot be built while a project breaks the rule; list them
+    # so they can be fixed by hand rather than picking a winner here
+    if not context.is_offline_mode():
+        duplicates = op.get_bind().execute(sa.text(
+            "SELECT project_id FROM odoo_instances "
+            f"WHERE {ACTIVE_PRODUCTION} "
+            "GROUP BY project_id HAVING COUNT(*) > 1"
+        )).scalars().all()
+    else:
+        duplicates = []
+
+    if duplicates:
+        raise RuntimeError(
+            "Projects with more than one active PRODUCTION instance: "
+            + ", ".join(str(project_id) for project_id in duplicates)
+        )
+
+    op.create_index(
+        PRODUCTION_INDEX,
+        "odoo_instances",
+        ["project_id"],
+        unique=True,
+        sqlite_where=sa.text(ACTIVE_PRODUCTION),
+        postgresql_where=sa.text(ACTIVE_PRODUCTION),
+    )
+
+
+def downgrade():
+    op.drop_index(PRODUCTION_INDEX, table_name="odoo_instances")
@@ -0,0 +1,25 @@
+"""composite index on project_users(user_id, project_id)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_project_users_user_id_project_id",
+        "project_users",
+        ["user_id", "project_id"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_project_users_user_id_project_id", table_name="project_users")
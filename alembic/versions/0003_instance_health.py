@@ -0,0 +1,36 @@
+"""instance_health table for URL probe results
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "instance_health",
+        sa.Column(
+            "instance_id",
+            sa.Integer(),
+            sa.ForeignKey("odoo_instances.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("status_code", sa.SmallInteger(), nullable=True),
+        sa.Column("ok", sa.Boolean(), nullable=False),
+        sa.Column("latency_ms", sa.Integer(), nullable=True),
+        sa.Column("error", sa.String(200), nullable=True),
+        sa.Column("checked_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_seen_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table("instance_health")
@@ -0,0 +1,61 @@
+"""instance_samples and instance_metric_rollups time-series tables
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "instance_samples",
+        sa.Column(
+            "instance_id",
+            sa.Integer(),
+            sa.ForeignKey("odoo_instances.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("ts", sa.Integer(), primary_key=True),
+        sa.Column("ok", sa.Boolean(), nullable=False),
+        sa.Column("status_code", sa.SmallInteger(), nullable=True),
+        sa.Column("latency_ms", sa.Integer(), nullable=True),
+    )
+    op.create_index("ix_instance_samples_ts", "instance_samples", ["ts"])
+
+    op.create_table(
+        "instance_metric_rollups",
+        sa.Column(
+            "instance_id",
+            sa.Integer(),
+            sa.ForeignKey("odoo_instances.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("resolution", sa.Integer(), primary_key=True),
+        sa.Column("bucket", sa.Integer(), primary_key=True),
+        sa.Column("samples", sa.Integer(), nullable=False),
+        sa.Column("ok_samples", sa.Integer(), nullable=False),
+        sa.Column("latency_samples", sa.Integer(), nullable=False),
+        sa.Column("latency_sum", sa.Integer(), nullable=False),
+        sa.Column("latency_min", sa.Integer(), nullable=True),
+        sa.Column("latency_max", sa.Integer(), nullable=True),
+    )
+    op.create_index(
+        "ix_instance_metric_rollups_resolution_bucket",
+        "instance_metric_rollups",
+        ["resolution", "bucket"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_instance_metric_rollups_resolution_bucket", table_name="instance_metric_rollups")
+    op.drop_table("instance_metric_rollups")
+    op.drop_index("ix_instance_samples_ts", table_name="instance_samples")
+    op.drop_table("instance_samples")
@@ -0,0 +1,99 @@
+"""search index over clients, projects, instances and users
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+SQLite gets an FTS5 table with the trigram tokenizer (SQLite 3.34+), kept
+in sync by triggers so every write path, including bulk imports, updates
+it. Postgres gets pg_trgm indexes on the searched columns instead.
+
+"""
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# rowid = source id * 4 + kind code; must match app.search.KIND_CODES
+SOURCES = (
+    # table, kind code, project_id, name, detail, watched columns
+    ("clients", 0, "NULL", "name", "NULL", "name"),
+    ("projects", 1, "{row}.id", "name", "NULL", "name"),
+    ("odoo_instances", 2, "{row}.project_id", "name", "url", "name, url, project_id"),
+    ("users", 3, "NULL", "email", "NULL", "email"),
+)
+
+TRIGRAM_INDEXES = (
+    ("ix_clients_name_trgm", "clients", "name"),
+    ("ix_projects_name_trgm", "projects", "name"),
+    ("ix_odoo_instances_name_trgm", "odoo_instances", "name"),
+    ("ix_odoo_instances_url_trgm", "odoo_instances", "url"),
+    ("ix_users_email_trgm", "users", "email"),
+)
+
+
+def _values(row, code, project_id, name, detail):
+    def column(expression):
+        return expression if expression == "NULL" else f"{row}.{expression}"
+    return (
+        f"{row}.id * 4 + {code}, {project_id.format(row=row)}, "
+        f"{column(name)}, {column(detail)}"
+    )
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for index, table, column in TRIGRAM_INDEXES:
+            op.execute(f"CREATE INDEX {index} ON {table} USING gin ({column} gin_trgm_ops)")
+        return
+
+    if dialect != "sqlite":
+        return
+
+    op.execute(
+        "CREATE VIRTUAL TABLE search_index USING fts5("
+        "project_id UNINDEXED, name, detail, tokenize = 'trigram')"
+    )
+
+    for table, code, project_id, name, detail, watched in SOURCES:
+        op.execute(
+            f"INSERT INTO search_index (rowid, project_id, name, detail) "
+            f"SELECT {_values(table, code, project_id, name, detail)} FROM {table}"
+        )
+        op.execute(
+            f"CREATE TRIGGER search_index_{table}_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO search_index (rowid, project_id, name, detail) "
+            f"VALUES ({_values('new', code, project_id, name, detail)}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER search_index_{table}_update AFTER UPDATE OF {watched} ON {table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 4 + {code}; "
+            f"INSERT INTO search_index (rowid, project_id, name, detail) "
+            f"VALUES ({_values('new', code, project_id, name, detail)}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER search_index_{table}_delete AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 4 + {code}; END"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        for index, _, _ in TRIGRAM_INDEXES:
+            op.execute(f"DROP INDEX IF EXISTS {index}")
+        return
+
+    if dialect != "sqlite":
+        return
+
+    for table, *_ in SOURCES:
+        for action in ("insert", "update", "delete"):
+            op.execute(f"DROP TRIGGER IF EXISTS search_index_{table}_{action}")
+    op.execute("DROP TABLE IF EXISTS search_index")
@@ -0,0 +1,27 @@
+"""users.token_version for revoking issued access tokens
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "users",
+        sa.Column("token_version", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+
+
+def downgrade():
+    # Plain ALTER TABLE (SQLite 3.35+): a batch rebuild would drop the
+    # search index triggers on users
+    op.drop_column("users", "token_version")
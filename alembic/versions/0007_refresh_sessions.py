@@ -0,0 +1,40 @@
+"""refresh_sessions table for rotating refresh tokens
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "refresh_sessions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "user_id",
+            sa.Integer(),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("token_hash", sa.LargeBinary(32), nullable=False),
+        sa.Column("family_hash", sa.LargeBinary(32), nullable=False),
+        sa.Column("expires_at", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_refresh_sessions_user_id", "refresh_sessions", ["user_id"])
+    op.create_index("ix_refresh_sessions_token_hash", "refresh_sessions", ["token_hash"], unique=True)
+    op.create_index("ix_refresh_sessions_family_hash", "refresh_sessions", ["family_hash"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_refresh_sessions_family_hash", table_name="refresh_sessions")
+    op.drop_index("ix_refresh_sessions_token_hash", table_name="refresh_sessions")
+    op.drop_index("ix_refresh_sessions_user_id", table_name="refresh_sessions")
+    op.drop_table("refresh_sessions")
@@ -1,29 +1,49 @@
+from dataclasses import replace
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import os
 from dotenv import load_dotenv
-from .database import get_db
+from .database import get_db, get_async_db
 from .models import User, UserRole
+from .user_cache import user_cache
+from .password_pool import password_pool
+from .metrics import auth_failures
+from .tokens import TokenVerifier
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "12"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+token_verifier = TokenVerifier(SECRET_KEY, ALGORITHM)
+# min_rounds makes needs_update() flag hashes made with a lower cost factor
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=PASSWORD_HASH_ROUNDS,
+    bcrypt__min_rounds=PASSWORD_HASH_ROUNDS,
+)
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    """Returns (valid, new_hash); new_hash is set when the stored hash is outdated."""
+    return await password_pool.run_async(pwd_context.verify_and_update, plain_password, hashed_password)
 
 def hash_password(password):
+    """For scripts; request handlers use hash_password_async."""
     return pwd_context.hash(password)
 
+async def hash_password_async(password):
+    return await password_pool.run_async(pwd_context.hash, password)
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
 
@@ -36,38 +56,95 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
-    credentials_exception = HTTPException(
+def create_user_token(user, expires_delta: timedelta | None = None):
+    """Access token carrying the user's role and token version."""
+    return create_access_token(
+        data={"sub": str(user.id), "role": user.role.value, "ver": user.token_version},
+        expires_delta=expires_delta,
+    )
+
+def _credentials_exception(reason: str):
+    auth_failures.inc((reason,))
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+def _decode_claims(token: str) -> tuple[int, int, UserRole | None]:
+    """(user id, token version, role); tokens issued before versions count as 0."""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
+        payload = token_verifier.decode(token)
+        user_id = payload.get("sub")
 
         if user_id is None:
-            raise credentials_exception
+            raise _credentials_exception("invalid_token")
+
+        role = payload.get("role")
+        return int(user_id), int(payload.get("ver", 0)), UserRole(role) if role is not None else None
+
+    except (JWTError, ValueError, TypeError):
+        raise _credentials_exception("invalid_token")
 
-    except JWTError:
-        raise credentials_exception
+def _check_version(cached_user, token_version: int, role: UserRole | None):
+    if cached_user.token_version != token_version:
+        raise _credentials_exception("revoked_token")
+    # A role change bumps the version, so with a matching one the role claim
+    # still holds and decides what the token may do
+    if role is not None and role != cached_user.role:
+        return replace(cached_user, role=role)
+    return cached_user
 
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    user_id, token_version, role = _decode_claims(token)
+
+    cached_user = user_cache.get(user_id)
+    if cached_user is not None:
+        return _check_version(cached_user, token_version, role)
+
+    # Taken before the read so an invalidation during it is noticed
+    generation = user_cache.generation
     user = db.query(User).filter(User.id == user_id).first()
 
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception("unknown_user")
+
+    return _check_version(user_cache.set(user, generation), token_version, role)
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    user_id, token_version, role = _decode_claims(token)
+
+    cached_user = user_cache.get(user_id)
+    if cached_user is not None:
+        return _check_version(cached_user, token_version, role)
+
+    # Taken before the read so an invalidation during it is noticed
+    generation = user_cache.generation
+    user = await db.scalar(select(User).where(User.id == user_id))
+
+    if user is None:
+        raise _credentials_exception("unknown_user")
+
+    return _check_version(user_cache.set(user, generation), token_version, role)
 
-    return user
+def revoke_tokens(user):
+    """Invalidates every access token issued to `user` so far; commit to apply."""
+    user.token_version += 1
 
 def get_current_admin(current_user: User = Depends(get_current_user)):
     if current_user.role != UserRole.ADMIN:
+        auth_failures.inc(("not_admin",))
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin privileges required"
         )
     return current_user
 
+async def get_current_admin_async(current_user: User = Depends(get_current_user_async)):
+    return get_current_admin(current_user)
@@ -0,0 +1,322 @@
+import glob
+import json
+import logging
+import os
+import socket
+import threading
+import uuid
+
+# "off" (default, one worker), "socket" (workers on one host) or "redis"
+# (workers on several hosts)
+BUS_BACKEND = os.getenv("BUS_BACKEND", "off").lower()
+BUS_SOCKET_DIR = os.getenv("BUS_SOCKET_DIR", "/tmp/client-infra-bus")
+BUS_REDIS_URL = os.getenv("BUS_REDIS_URL", "redis://localhost:6379/0")
+BUS_CHANNEL = os.getenv("BUS_CHANNEL", "cim:bus")
+BUS_RETRY_MAX_SECONDS = float(os.getenv("BUS_RETRY_MAX_SECONDS", "30"))
+# Delay between attempts to tell other workers that one of them missed a message
+BUS_RESET_RETRY_SECONDS = float(os.getenv("BUS_RESET_RETRY_SECONDS", "0.5"))
+
+logger = logging.getLogger(__name__)
+
+# Well under the smallest default Unix datagram limit
+_MAX_DATAGRAM = 64 * 1024
+
+# Tells the receivers to run their reset handlers
+_RESET_CHANNEL = "bus.reset"
+
+
+class SocketBackend:
+    """One Unix datagram socket per worker, all in one directory.
+
+    Sending goes to every other socket found there; a socket nobody
+    listens on any more belongs to a dead worker and is removed.
+    """
+
+    name = "socket"
+
+    def __init__(self, directory: str = BUS_SOCKET_DIR):
+        self.directory = directory
+        self.path = os.path.join(directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._sock: socket.socket | None = None
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+
+    def open(self):
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+
+    def send(self, raw: bytes) -> bool:
+        """Sends `raw` to every other worker; False when one of them missed it."""
+        if len(raw) > _MAX_DATAGRAM:
+            raise ValueError(f"bus message of {len(raw)} bytes is too large")
+        delivered = True
+        for path in glob.glob(os.path.join(self.directory, "*.sock")):
+            if path == self.path:
+                continue
+            try:
+                self._sender.sendto(raw, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except BlockingIOError:
+                logger.warning("Bus receiver %s is full, message dropped", path)
+                delivered = False
+        return delivered
+
+    def receive(self):
+        while True:
+            try:
+                raw = self._sock.recv(_MAX_DATAGRAM)
+            except OSError:
+                return
+            if not raw:
+                return
+            yield raw
+
+    def close(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                # Unblocks the receiving thread
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class RedisBackend:
+    """Redis pub/sub, reaching workers on every host.
+
+    A lost connection is retried with exponential backoff until close().
+    receive() yields None when it is lost and again once subscribed anew,
+    as messages published in between never arrive.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = BUS_REDIS_URL, channel: str = BUS_CHANNEL,
+                 retry_max: float = BUS_RETRY_MAX_SECONDS):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("BUS_BACKEND=redis needs the redis package installed")
+
+        self._client = redis.Redis.from_url(url)
+        self._channel = channel
+        self._pubsub = None
+        self._closed = threading.Event()
+        self.retry_min = min(0.5, retry_max)
+        self.retry_max = retry_max
+
+    def open(self):
+        self._closed.clear()
+        self._subscribe()
+
+    def _subscribe(self):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(self._channel)
+        except Exception:
+            pubsub.close()
+            raise
+        self._pubsub = pubsub
+
+    def _disconnect(self):
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is not None:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+
+    def send(self, raw: bytes) -> bool:
+        self._client.publish(self._channel, raw)
+        return True
+
+    def receive(self):
+        retry = self.retry_min
+        while not self._closed.is_set():
+            try:
+                if self._pubsub is None:
+                    self._subscribe()
+                    retry = self.retry_min
+                    logger.info("Reconnected to the Redis bus")
+                    yield None
+                message = self._pubsub.get_message(timeout=1.0)
+            except Exception:
+                if self._closed.is_set():
+                    return
+                logger.warning("Redis bus connection failed, retrying in %.1fs", retry, exc_info=True)
+                if self._pubsub is not None:
+                    self._disconnect()
+                    yield None
+                self._closed.wait(retry)
+                retry = min(retry * 2, self.retry_max)
+                continue
+            if message is not None:
+                yield message["data"]
+
+    def close(self):
+        self._closed.set()
+        self._disconnect()
+
+
+class InvalidationBus:
+    """Replays cache invalidations and change events in every other worker.
+
+    Callers apply a change locally as before and publish it; each other
+    worker hands it to the handler registered for its channel. A worker
+    that may have missed messages runs the reset handlers instead, which
+    drop everything they could have kept stale: on a lost Redis connection,
+    or when a sender found its socket full. The sender then keeps
+    publishing a reset until every worker got it.
+    """
+
+    def __init__(self, backend, reset_retry: float = BUS_RESET_RETRY_SECONDS):
+        self.backend = backend
+        self.origin = uuid.uuid4().hex
+        self.reset_retry = reset_retry
+        self._handlers = {}
+        self._reset_handlers = []
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._reset_timer: threading.Timer | None = None
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+        self.dropped = 0
+        self.resets = 0
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def on(self, channel: str, handler):
+        """Registers `handler(payload)` for messages other workers publish on `channel`."""
+        self._handlers[channel] = handler
+
+    def on_reset(self, handler):
+        """Registers `handler()` for when messages from other workers may have been missed."""
+        self._reset_handlers.append(handler)
+
+    def publish(self, channel: str, payload):
+        """Sends a JSON-serialisable payload to the other workers.
+
+        Works without start(), so scripts such as import_export.py can
+        notify running workers too.
+        """
+        if not self.enabled:
+            return
+        if self._send(channel, payload):
+            self.sent += 1
+
+    def _send(self, channel: str, payload) -> bool:
+        raw = json.dumps({"o": self.origin, "c": channel, "p": payload}, separators=(",", ":")).encode()
+        try:
+            delivered = self.backend.send(raw)
+        except Exception:
+            self.errors += 1
+            logger.warning("Could not publish %s on the bus", channel, exc_info=True)
+            return False
+        if not delivered:
+            self.dropped += 1
+            self._request_reset()
+        return True
+
+    def _request_reset(self):
+        with self._lock:
+            if self._reset_timer is not None:
+                return
+            self._reset_timer = threading.Timer(self.reset_retry, self._send_reset)
+            self._reset_timer.daemon = True
+            self._reset_timer.start()
+
+    def _send_reset(self):
+        with self._lock:
+            self._reset_timer = None
+        # A failed or dropped send requests the next attempt itself
+        if not self._send(_RESET_CHANNEL, None):
+            self._request_reset()
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self.backend.open()
+        self._thread = threading.Thread(target=self._run, name="invalidation-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            timer, self._reset_timer = self._reset_timer, None
+        if timer is not None:
+            timer.cancel()
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self.backend.close()
+        thread.join(timeout=5)
+
+    def _run(self):
+        try:
+            for raw in self.backend.receive():
+                if raw is None:
+                    self._reset()
+                else:
+                    self._deliver(raw)
+        except Exception:
+            logger.exception("Invalidation bus receiver stopped")
+
+    def _deliver(self, raw: bytes):
+        try:
+            message = json.loads(raw)
+            if message["o"] == self.origin:
+                return
+            if message["c"] == _RESET_CHANNEL:
+                self._reset()
+                return
+            handler = self._handlers.get(message["c"])
+            if handler is not None:
+                handler(message["p"])
+                self.received += 1
+        except Exception:
+            self.errors += 1
+            logger.warning("Could not apply a bus message", exc_info=True)
+
+    def _reset(self):
+        self.resets += 1
+        for handler in self._reset_handlers:
+            try:
+                handler()
+            except Exception:
+                self.errors += 1
+                logger.warning("Could not reset after missed bus messages", exc_info=True)
+
+    def stats(self):
+        thread = self._thread
+        return {
+            "backend": self.backend.name if self.enabled else "off",
+            "running": thread is not None and thread.is_alive(),
+            "sent": self.sent,
+            "received": self.received,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "resets": self.resets,
+        }
+
+
+def _make_backend():
+    if BUS_BACKEND == "socket":
+        return SocketBackend()
+    if BUS_BACKEND == "redis":
+        return RedisBackend()
+    return None
+
+
+bus = InvalidationBus(_make_backend())
@@ -0,0 +1,133 @@
+import hashlib
+import threading
+import uuid
+from collections import defaultdict
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .bus import bus
+from .models import UserRole
+from .pagination import wants_ndjson
+
+_CHANGED_TABLES = "changed_tables"
+
+# Rows the ORM or the database removes along with a deleted row, without the
+# session ever seeing them as deleted objects
+DELETE_CASCADES = {
+    "clients": {"projects", "odoo_instances", "project_users"},
+    "projects": {"odoo_instances", "project_users"},
+    "users": {"project_users"},
+}
+
+
+class ChangeVersions:
+    """Per-table counters bumped after every committed write.
+
+    Counters only live in this process, with other workers' writes arriving
+    over the bus, so the boot token keeps ETags handed out before a restart
+    or by another worker from matching these counters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = defaultdict(int)
+        self.boot = uuid.uuid4().hex[:8]
+
+    def bump(self, tables):
+        self._bump(tables)
+        bus.publish("change_versions", sorted(tables))
+
+    def _bump(self, tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] += 1
+
+    def get(self, tables) -> tuple[int, ...]:
+        with self._lock:
+            return tuple(self._versions[table] for table in tables)
+
+    def snapshot(self):
+        with self._lock:
+            return {"boot": self.boot, **self._versions}
+
+    def reset(self):
+        """Retires every ETag handed out so far, for when bumps may have been missed."""
+        with self._lock:
+            self.boot = uuid.uuid4().hex[:8]
+
+
+change_versions = ChangeVersions()
+bus.on("change_versions", change_versions._bump)
+bus.on_reset(change_versions.reset)
+
+
+def _changed_tables(session) -> set:
+    return session.info.setdefault(_CHANGED_TABLES, set())
+
+
+# Registered on the Session class so AsyncSessions (which wrap a sync
+# Session) are tracked too
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    changed = _changed_tables(session)
+
+    for obj in session.new:
+        changed.add(obj.__table__.name)
+
+    for obj in session.dirty:
+        if session.is_modified(obj):
+            changed.add(obj.__table__.name)
+
+    for obj in session.deleted:
+        table = obj.__table__.name
+        changed.add(table)
+        changed.update(DELETE_CASCADES.get(table, ()))
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_changes(session):
+    changed = session.info.pop(_CHANGED_TABLES, None)
+    if changed:
+        change_versions.bump(changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_CHANGED_TABLES, None)
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def list_etag(tables: tuple[str, ...], user_dependency):
+    """Dependency answering If-None-Match for a list endpoint before it touches the database.
+
+    The ETag covers the versions of `tables`, the query string and, for
+    non-admins, who is asking (their visible rows differ). A matching request
+    gets a bodyless 304; anything else gets the ETag set on the response.
+    """
+    def dependency(request: Request, response: Response, current_user=Depends(user_dependency)):
+        scope = "admin" if current_user.role == UserRole.ADMIN else f"user:{current_user.id}"
+        key = "|".join([
+            ",".join(f"{table}={version}" for table, version in zip(tables, change_versions.get(tables))),
+            scope,
+            str(request.url.query),
+            # JSON and streamed NDJSON bodies are different representations
+            "ndjson" if wants_ndjson(request) else "json",
+        ])
+        etag = f'"{change_versions.boot}-{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Authorization, Accept"}
+
+        if _matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response.headers.update(headers)
+        return etag
+
+    return dependency
@@ -0,0 +1,480 @@
+import csv
+import io
+import json
+import os
+from dataclasses import dataclass, field
+
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .change_versions import change_versions
+from .events import INSTANCE_CREATED, USER_ASSIGNED, instance_data, publish_changes
+from .membership_cache import membership_cache
+from .models import Client, OdooInstance, OdooInstanceType, Project, ProjectUser, User
+from .response_cache import response_cache
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+MAX_REPORTED_ERRORS = 100
+
+RECORD_TYPES = ("client", "project", "instance", "assignment")
+# Union of every record type's fields, in CSV column order
+CSV_COLUMNS = (
+    "type", "ref", "name", "client", "client_id", "project", "project_id",
+    "url", "instance_type", "is_active", "user", "user_id",
+)
+
+
+class RecordError(ValueError):
+    pass
+
+
+@dataclass
+class ImportSummary:
+    created: dict = field(default_factory=lambda: {kind: 0 for kind in RECORD_TYPES})
+    skipped: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "errors": self.errors,
+        }
+
+
+def _int(value, name):
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise RecordError(f"{name} must be an integer")
+
+
+def _bool(value):
+    if isinstance(value, bool):
+        return value
+    if value in (None, ""):
+        return True
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes"):
+        return True
+    if text in ("0", "false", "no"):
+        return False
+    raise RecordError("is_active must be true or false")
+
+
+def _required(record, name):
+    value = record.get(name)
+    if value in (None, ""):
+        raise RecordError(f"{name} is required")
+    return str(value)
+
+
+def parse_ndjson_line(line: str) -> dict | None:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise RecordError(f"invalid JSON: {exc.msg}")
+    if not isinstance(record, dict):
+        raise RecordError("each line must be a JSON object")
+    return record
+
+
+def _ndjson_records(lines):
+    for number, line in enumerate(lines, start=1):
+        try:
+            record = parse_ndjson_line(line)
+        except RecordError as exc:
+            yield number, exc
+            continue
+        if record is not None:
+            yield number, record
+
+
+def _csv_records(lines):
+    """One reader over every line, so a quoted field may span several.
+
+    The lines must keep their line endings, as from a file opened with
+    newline="". The first row is the header.
+    """
+    reader = csv.reader(lines)
+    header = None
+    while True:
+        number = reader.line_num + 1
+        try:
+            values = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            yield number, RecordError(f"invalid CSV: {exc}")
+            continue
+
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield number, dict(zip(header, values))
+
+
+def read_records(lines, fmt: str = "ndjson"):
+    """Yield (line number, record) pairs, with a RecordError as the record for
+    one that could not be parsed. A CSV record's number is its first line.
+    """
+    return _csv_records(lines) if fmt == "csv" else _ndjson_records(lines)
+
+
+class Importer:
+    """Loads client/project/instance/assignment records in chunked bulk inserts.
+
+    Records are buffered and written one chunk per transaction. Within a
+    chunk each type is inserted with a single executemany, in dependency
+    order. `ref` values name clients and projects created earlier in the
+    same import, so later records can point at them without knowing their
+    ids.
+    """
+
+    def __init__(self, db: Session, chunk_size: int = IMPORT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.summary = ImportSummary()
+        self._pending: list[tuple[int, dict]] = []
+        self._client_refs: dict[str, int] = {}
+        self._project_refs: dict[str, int] = {}
+        # Projects given an active PRODUCTION instance earlier in this import
+        self._production_projects: set[int] = set()
+
+    def add(self, line: int, record: dict):
+        self._pending.append((line, record))
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def finish(self) -> ImportSummary:
+        self.flush()
+        return self.summary
+
+    def flush(self):
+        chunk, self._pending = self._pending, []
+        if not chunk:
+            return
+
+        failed_before = self.summary.failed
+        by_type = {kind: [] for kind in RECORD_TYPES}
+        for line, record in chunk:
+            kind = record.get("type")
+            if kind not in by_type:
+                self.summary.error(line, f"unknown type {kind!r}")
+                continue
+            by_type[kind].append((line, record))
+
+        touched_projects: set[int] = set()
+        assigned_users: set[int] = set()
+        # The change events the session hooks would have sent
+        changes: list = []
+        created = {kind: 0 for kind in RECORD_TYPES}
+        client_refs = dict(self._client_refs)
+        project_refs = dict(self._project_refs)
+        production_projects = set(self._production_projects)
+
+        try:
+            created["client"] = self._insert_clients(by_type["client"], client_refs)
+            created["project"] = self._insert_projects(by_type["project"], client_refs, project_refs)
+            created["instance"] = self._insert_instances(
+                by_type["instance"], project_refs, production_projects, touched_projects, changes
+            )
+            created["assignment"] = self._insert_assignments(
+                by_type["assignment"], project_refs, assigned_users, changes
+            )
+            self.db.commit()
+        except IntegrityError as exc:
+            self.db.rollback()
+            first_line = chunk[0][0]
+            self.summary.error(first_line, f"chunk starting here rolled back: {exc.orig}")
+            self.summary.failed = failed_before + len(chunk)
+            return
+
+        self._client_refs = client_refs
+        self._project_refs = project_refs
+        self._production_projects = production_projects
+        for kind, count in created.items():
+            self.summary.created[kind] += count
+
+        self._notify(created, touched_projects, assigned_users, changes)
+
+    def _resolve(self, record, ref_name, id_name, refs, existing_ids):
+        ref = record.get(ref_name)
+        if ref not in (None, ""):
+            if str(ref) not in refs:
+                raise RecordError(f"unknown {ref_name} ref {ref!r}")
+            return refs[str(ref)]
+
+        target_id = _int(record.get(id_name), id_name)
+        if target_id is None:
+            raise RecordError(f"{ref_name} or {id_name} is required")
+        if target_id not in existing_ids:
+            raise RecordError(f"{id_name} {target_id} does not exist")
+        return target_id
+
+    def _existing_ids(self, column, records, id_name):
+        ids = set()
+        for _, record in records:
+            try:
+                value = _int(record.get(id_name), id_name)
+            except RecordError:
+                continue
+            if value is not None:
+                ids.add(value)
+        if not ids:
+            return set()
+        return set(self.db.scalars(select(column).where(column.in_(ids))))
+
+    def _insert_returning_ids(self, model, rows):
+        # One INSERT ... RETURNING for the whole chunk, ids in parameter order
+        return list(self.db.scalars(
+            insert(model).returning(model.id, sort_by_parameter_order=True), rows
+        ))
+
+    def _insert_clients(self, records, client_refs):
+        rows, refs = [], []
+        for line, record in records:
+            try:
+                rows.append({"name": _required(record, "name")})
+                refs.append(record.get("ref"))
+            except RecordError as exc:
+                self.summary.error(line, str(exc))
+
+        if not rows:
+            return 0
+
+        for ref, client_id in zip(refs, self._insert_returning_ids(Client, rows)):
+            if ref not in (None, ""):
+                client_refs[str(ref)] = client_id
+        return len(rows)
+
+    def _insert_projects(self, records, client_refs, project_refs):
+        existing_clients = self._existing_ids(Client.id, records, "client_id")
+        rows, refs = [], []
+        for line, record in records:
+            try:
+                rows.append({
+                    "name": _required(record, "name"),
+                    "client_id": self._resolve(record, "client", "client_id", client_refs, existing_clients),
+                })
+                refs.append(record.get("ref"))
+            except RecordError as exc:
+                self.summary.error(line, str(exc))
+
+        if not rows:
+            return 0
+
+        for ref, project_id in zip(refs, self._insert_returning_ids(Project, rows)):
+            if ref not in (None, ""):
+                project_refs[str(ref)] = project_id
+        return len(rows)
+
+    def _insert_instances(self, records, project_refs, production_projects, touched_projects, changes):
+        existing_projects = self._existing_ids(Project.id, records, "project_id")
+        rows = []
+        for line, record in records:
+            try:
+                try:
+                    instance_type = OdooInstanceType(_required(record, "instance_type").upper())
+                except ValueError:
+                    raise RecordError(f"invalid instance_type {record.get('instance_type')!r}")
+
+                rows.append((line, {
+                    "name": _required(record, "name"),
+                    "url": _required(record, "url"),
+                    "instance_type": instance_type,
+                    "is_active": _bool(record.get("is_active")),
+                    "project_id": self._resolve(record, "project", "project_id", project_refs, existing_projects),
+                }))
+            except RecordError as exc:
+                self.summary.error(line, str(exc))
+
+        # SINGLE PRODUCTION RULE, checked for the whole chunk with one query
+        wants_production = {
+            row["project_id"] for _, row in rows
+            if row["instance_type"] == OdooInstanceType.PRODUCTION and row["is_active"]
+        }
+        if wants_production:
+            production_projects.update(self.db.scalars(
+                select(OdooInstance.project_id).where(
+                    OdooInstance.project_id.in_(wants_production - production_projects),
+                    OdooInstance.instance_type == OdooInstanceType.PRODUCTION,
+                    OdooInstance.is_active == True
+                )
+            ))
+
+        accepted = []
+        for line, row in rows:
+            if row["instance_type"] == OdooInstanceType.PRODUCTION and row["is_active"]:
+                if row["project_id"] in production_projects:
+                    self.summary.error(line, "project already has an active Production instance")
+                    continue
+                production_projects.add(row["project_id"])
+            accepted.append(row)
+            touched_projects.add(row["project_id"])
+
+        if accepted:
+            for row, instance_id in zip(accepted, self._insert_returning_ids(OdooInstance, accepted)):
+                changes.append((INSTANCE_CREATED, row["project_id"], instance_data(OdooInstance(id=instance_id, **row))))
+        return len(accepted)
+
+    def _insert_assignments(self, records, project_refs, assigned_users, changes):
+        existing_projects = self._existing_ids(Project.id, records, "project_id")
+
+        emails = {str(record["user"]) for _, record in records if record.get("user") not in (None, "")}
+        user_ids_by_email = dict(
+            self.db.execute(select(User.email, User.id).where(User.email.in_(emails))).all()
+        ) if emails else {}
+        existing_users = self._existing_ids(User.id, records, "user_id")
+
+        pairs = []
+        for line, record in records:
+            try:
+                project_id = self._resolve(record, "project", "project_id", project_refs, existing_projects)
+                user_id = self._resolve(record, "user", "user_id", user_ids_by_email, existing_users)
+                pairs.append((project_id, user_id))
+            except RecordError as exc:
+                self.summary.error(line, str(exc))
+
+        if not pairs:
+            return 0
+
+        already = set(self.db.execute(
+            select(ProjectUser.project_id, ProjectUser.user_id)
+            .where(tuple_(ProjectUser.project_id, ProjectUser.user_id).in_(set(pairs)))
+        ).all())
+
+        rows = []
+        for pair in dict.fromkeys(pairs):
+            if pair in already:
+                continue
+            rows.append({"project_id": pair[0], "user_id": pair[1]})
+            assigned_users.add(pair[1])
+            changes.append((USER_ASSIGNED, pair[0], {"project_id": pair[0], "user_id": pair[1]}))
+
+        self.summary.skipped += len(pairs) - len(rows)
+        if rows:
+            self.db.execute(insert(ProjectUser.__table__), rows)
+        return len(rows)
+
+    def _notify(self, created, touched_projects, assigned_users, changes):
+        """Bulk inserts bypass the session's flush events; bump caches and
+        publish change events by hand.
+        """
+        tables = {
+            "client": "clients", "project": "projects",
+            "instance": "odoo_instances", "assignment": "project_users",
+        }
+        changed = {tables[kind] for kind, count in created.items() if count}
+        if not changed:
+            return
+
+        change_versions.bump(changed)
+
+        tags = set()
+        if created["client"]:
+            tags.add("clients")
+        if created["project"] or created["assignment"]:
+            tags.add("projects")
+        if created["instance"]:
+            tags.add("instances")
+            tags.update(f"instances:{project_id}" for project_id in touched_projects)
+        response_cache.invalidate(tags)
+
+        if changes:
+            publish_changes(changes)
+
+        for user_id in assigned_users:
+            membership_cache.invalidate(user_id)
+
+
+def import_lines(db: Session, lines, fmt: str = "ndjson", chunk_size: int = IMPORT_CHUNK_SIZE) -> ImportSummary:
+    """Import from any iterable of text lines with their endings (a file, a
+    decoded request body, ...).
+    """
+    importer = Importer(db, chunk_size)
+
+    for number, record in read_records(lines, fmt):
+        if isinstance(record, RecordError):
+            importer.summary.error(number, str(record))
+        else:
+            importer.add(number, record)
+
+    return importer.finish()
+
+
+def _export_records(db: Session):
+    def stream(query):
+        return db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+    for client_id, name in stream(select(Client.id, Client.name).order_by(Client.id)):
+        yield {"type": "client", "ref": f"c{client_id}", "name": name}
+
+    for project_id, name, client_id in stream(
+        select(Project.id, Project.name, Project.client_id).order_by(Project.id)
+    ):
+        yield {"type": "project", "ref": f"p{project_id}", "name": name, "client": f"c{client_id}"}
+
+    for name, url, instance_type, is_active, project_id in stream(
+        select(
+            OdooInstance.name, OdooInstance.url, OdooInstance.instance_type,
+            OdooInstance.is_active, OdooInstance.project_id,
+        ).order_by(OdooInstance.id)
+    ):
+        yield {
+            "type": "instance", "name": name, "url": url,
+            "instance_type": instance_type.value, "is_active": bool(is_active),
+            "project": f"p{project_id}",
+        }
+
+    for project_id, email in stream(
+        select(ProjectUser.project_id, User.email)
+        .join(User, User.id == ProjectUser.user_id)
+        .order_by(ProjectUser.project_id, ProjectUser.user_id)
+    ):
+        yield {"type": "assignment", "project": f"p{project_id}", "user": email}
+
+
+def export_lines(db: Session, fmt: str = "ndjson"):
+    """Yield the whole dataset as NDJSON or CSV text, a batch of rows at a time.
+
+    The output can be imported again as is; refs tie projects to clients and
+    instances/assignments to projects, and users are matched by email.
+    """
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for count, record in enumerate(_export_records(db), start=1):
+            writer.writerow(record)
+            if count % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+        return
+
+    batch = []
+    for record in _export_records(db):
+        batch.append(json.dumps(record))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
@@ -1,12 +1,183 @@
-import libsql_client
 import os
-from contextlib import contextmanager
+import threading
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./client_infra.db")  # or libsql://client-infra-db...
+TURSO_AUTH_TOKEN = os.getenv("TURSO_AUTH_TOKEN")
+
+# "sync" (default) or "async"; async mode serves the routers from AsyncSessions
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+class PoolStats:
+    """Checkout counters shared by every pool the engine creates."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def record(self, wait: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": (self.total_wait / self.checkouts * 1000) if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+
+pool_stats = PoolStats()
+
+
+class _TimedCheckout:
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            pool_stats.record_timeout()
+            raise
+        pool_stats.record(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def _engine_args(url: str, is_async: bool = False):
+    """Translate DATABASE_URL into a SQLAlchemy URL plus engine options."""
+    connect_args = {}
+
+    parsed = make_url(url)
+
+    # Turso URLs (libsql://host) go through the sqlalchemy-libsql dialect,
+    # which reads the token and transport from the query string
+    if parsed.drivername == "libsql":
+        query = {}
+        if "secure" not in parsed.query:
+            query["secure"] = "true"
+        if TURSO_AUTH_TOKEN:
+            query["authToken"] = TURSO_AUTH_TOKEN
+        parsed = parsed.set(drivername="sqlite+libsql").update_query_dict(query)
+        url = parsed
+
+    if is_async and parsed.drivername in ("sqlite", "sqlite+pysqlite"):
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+        url = parsed
+
+    if parsed.get_backend_name() == "sqlite":
+        connect_args["check_same_thread"] = False
+
+        # An in-memory database only exists on its own connection
+        if parsed.database in (None, "", ":memory:") and parsed.host is None:
+            return url, {"connect_args": connect_args, "poolclass": StaticPool}
+
+    return url, {
+        "connect_args": connect_args,
+        "poolclass": TimedAsyncQueuePool if is_async else TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+_url, _options = _engine_args(DATABASE_URL)
+engine = create_engine(_url, **_options)
+
+SessionLocal = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+Base = declarative_base()
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_MODE == "async":
+    if ASYNC_DATABASE_URL:
+        _async_url, _async_options = _engine_args(ASYNC_DATABASE_URL, is_async=True)
+    elif make_url(_url).drivername in ("sqlite", "sqlite+pysqlite"):
+        _async_url, _async_options = _engine_args(DATABASE_URL, is_async=True)
+    else:
+        raise RuntimeError(
+            "DB_MODE=async needs an async driver; set ASYNC_DATABASE_URL for this database"
+        )
+
+    async_engine = create_async_engine(_async_url, **_async_options)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
 
-_client = libsql_client.create_client_sync(
-    url=os.getenv("DATABASE_URL"),  # libsql://client-infra-db...
-    auth_token=os.getenv("TURSO_AUTH_TOKEN")
-)
 
-@contextmanager
 def get_db():
-    yield _client
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _describe_pool(pool):
+    status = {"pool": type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "max_overflow": DB_MAX_OVERFLOW,
+        })
+
+    return status
+
+
+def get_pool_status():
+    status = {"mode": DB_MODE, **_describe_pool(engine.pool)}
+
+    if async_engine is not None:
+        status["async"] = _describe_pool(async_engine.pool)
+
+    status.update(pool_stats.snapshot())
+    return status
@@ -0,0 +1,262 @@
+import asyncio
+import itertools
+import json
+import os
+import threading
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .bus import bus
+from .membership_cache import membership_cache
+from .models import OdooInstance, ProjectUser, UserRole
+from .user_cache import user_cache
+
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+EVENTS_HISTORY_SIZE = int(os.getenv("EVENTS_HISTORY_SIZE", "1000"))
+
+INSTANCE_CREATED = "instance.created"
+INSTANCE_UPDATED = "instance.updated"
+INSTANCE_DELETED = "instance.deleted"
+USER_ASSIGNED = "project.user_assigned"
+USER_REMOVED = "project.user_removed"
+# Sent first when the events since Last-Event-ID cannot be replayed
+STREAM_RESET = "stream.reset"
+
+_PENDING_EVENTS = "pending_change_events"
+_BUS_BATCH_SIZE = 100
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    id: int
+    type: str
+    project_id: int
+    data: dict
+    # The broker that numbered it; ids are only meaningful to that worker
+    boot: str = ""
+
+    def encode(self) -> str:
+        """Server-Sent Events wire format."""
+        return f"id: {self.boot}-{self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n"
+
+
+@dataclass(eq=False)
+class Subscriber:
+    user_id: int
+    is_admin: bool
+    project_ids: set[int]
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(EVENTS_QUEUE_SIZE))
+    # Events up to this id were already in the history when subscribing
+    last_id: int = 0
+    # Set once the subscriber fell too far behind and was dropped
+    overflowed: bool = False
+    # Set when the events since its Last-Event-ID cannot be replayed
+    missed: bool = False
+
+    def can_see(self, change: ChangeEvent) -> bool:
+        # Assignment changes reach the affected user even though their project
+        # set is only updated as the event goes out
+        if change.type in (USER_ASSIGNED, USER_REMOVED) and change.data["user_id"] == self.user_id:
+            return True
+        return self.is_admin or change.project_id in self.project_ids
+
+    def track(self, change: ChangeEvent):
+        if change.type == USER_ASSIGNED and change.data["user_id"] == self.user_id:
+            self.project_ids.add(change.project_id)
+        elif change.type == USER_REMOVED and change.data["user_id"] == self.user_id:
+            self.project_ids.discard(change.project_id)
+
+
+class EventBroker:
+    """In-process fan-out of committed changes to streaming subscribers.
+
+    Publishing is thread-safe: sync handlers run in the threadpool, so events
+    are handed to the event loop, which owns every subscriber queue. Each
+    subscriber costs one bounded queue; one that stops reading is dropped
+    instead of buffering without limit.
+
+    Event ids carry a boot token, as each worker numbers the events it
+    sends, those relayed from other workers included. A Last-Event-ID from
+    another worker or a previous run, or older than the history, cannot be
+    replayed; the subscriber is marked as having missed events instead.
+
+    A subscriber's role and projects are checked when it subscribes. When
+    its user or memberships are invalidated, in this worker or another,
+    its stream is closed; the client reconnects and is authorized again,
+    so a demoted, unassigned, deleted or revoked user stops receiving
+    events.
+    """
+
+    def __init__(self, history_size: int = EVENTS_HISTORY_SIZE):
+        self._ids = itertools.count(1)
+        self.boot = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._history: deque[ChangeEvent] = deque(maxlen=history_size)
+        self._subscribers: set[Subscriber] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.published = 0
+        self.dropped = 0
+        self.revalidated = 0
+
+    def publish(self, changes: list[tuple[str, int, dict]]):
+        with self._lock:
+            events = [
+                ChangeEvent(id=next(self._ids), type=kind, project_id=project_id, data=data, boot=self.boot)
+                for kind, project_id, data in changes
+            ]
+            self._history.extend(events)
+            self.published += len(events)
+            loop = self._loop
+
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._fan_out, events)
+
+    def _fan_out(self, events: list[ChangeEvent]):
+        for subscriber in list(self._subscribers):
+            for change in events:
+                if change.id <= subscriber.last_id:
+                    continue
+                visible = subscriber.can_see(change)
+                subscriber.track(change)
+                if not visible:
+                    continue
+                try:
+                    subscriber.queue.put_nowait(change)
+                except asyncio.QueueFull:
+                    self._drop(subscriber)
+                    break
+
+    def _drop(self, subscriber: Subscriber):
+        subscriber.overflowed = True
+        self.dropped += 1
+        self._close(subscriber)
+
+    def _close(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+        # Wake the stream so it can close
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def revalidate(self, user_id: int | None):
+        """Close the streams of `user_id`, or every stream for None; thread-safe."""
+        with self._lock:
+            loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._revalidate, user_id)
+
+    def _revalidate(self, user_id: int | None):
+        for subscriber in list(self._subscribers):
+            if user_id is None or subscriber.user_id == user_id:
+                self.revalidated += 1
+                self._close(subscriber)
+
+    def _resume_after(self, last_event_id: str) -> int | None:
+        """The number in a Last-Event-ID this broker handed out, else None."""
+        boot, _, number = last_event_id.partition("-")
+        if boot != self.boot or not number.isdigit():
+            return None
+        return int(number)
+
+    def subscribe(self, user_id: int, role: UserRole, project_ids, last_event_id: str | None = None) -> Subscriber:
+        """Register a subscriber; must be called from the event loop."""
+        subscriber = Subscriber(
+            user_id=user_id,
+            is_admin=role == UserRole.ADMIN,
+            project_ids=set(project_ids),
+        )
+
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            missed = []
+            if last_event_id is not None:
+                after = self._resume_after(last_event_id)
+                if after is None or (self._history and self._history[0].id > after + 1):
+                    subscriber.missed = True
+                else:
+                    missed = [change for change in self._history if change.id > after]
+            if self._history:
+                subscriber.last_id = self._history[-1].id
+
+        # Replay what a reconnecting client missed, as far back as the history goes
+        for change in missed:
+            if subscriber.can_see(change) and not subscriber.queue.full():
+                subscriber.queue.put_nowait(change)
+
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    def stats(self):
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped_subscribers": self.dropped,
+            "revalidated_subscribers": self.revalidated,
+            "history": len(self._history),
+        }
+
+
+broker = EventBroker()
+# Changes committed by other workers reach this worker's subscribers too
+bus.on("events", broker.publish)
+user_cache.on_invalidate(broker.revalidate)
+membership_cache.on_invalidate(broker.revalidate)
+
+
+def instance_data(instance: OdooInstance) -> dict:
+    return {
+        "id": instance.id,
+        "name": instance.name,
+        "url": instance.url,
+        "instance_type": instance.instance_type.value if instance.instance_type else None,
+        "is_active": instance.is_active,
+        "project_id": instance.project_id,
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_events(session, flush_context):
+    pending = session.info.setdefault(_PENDING_EVENTS, [])
+
+    for obj in session.new:
+        if isinstance(obj, OdooInstance):
+            pending.append((INSTANCE_CREATED, obj.project_id, instance_data(obj)))
+        elif isinstance(obj, ProjectUser):
+            pending.append((USER_ASSIGNED, obj.project_id, {"project_id": obj.project_id, "user_id": obj.user_id}))
+
+    for obj in session.dirty:
+        if isinstance(obj, OdooInstance) and session.is_modified(obj):
+            pending.append((INSTANCE_UPDATED, obj.project_id, instance_data(obj)))
+
+    for obj in session.deleted:
+        if isinstance(obj, OdooInstance):
+            pending.append((INSTANCE_DELETED, obj.project_id, {"id": obj.id, "project_id": obj.project_id}))
+        elif isinstance(obj, ProjectUser):
+            pending.append((USER_REMOVED, obj.project_id, {"project_id": obj.project_id, "user_id": obj.user_id}))
+
+
+def publish_changes(changes: list[tuple[str, int, dict]]):
+    """Hands committed changes to this worker's subscribers and to the other workers."""
+    broker.publish(changes)
+    # Batches keep each bus message well under a datagram
+    for start in range(0, len(changes), _BUS_BATCH_SIZE):
+        bus.publish("events", changes[start:start + _BUS_BATCH_SIZE])
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_events(session):
+    pending = session.info.pop(_PENDING_EVENTS, None)
+    if pending:
+        publish_changes(pending)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_events(session):
+    session.info.pop(_PENDING_EVENTS, None)
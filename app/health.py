@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import aiohttp
+
+from .database import SessionLocal, engine
+from .metrics_store import append_samples, check_dialect, prune, prune_schedule
+from .models import InstanceHealth, OdooInstance
+
+HEALTHCHECK_ENABLED = os.getenv("HEALTHCHECK_ENABLED", "false").lower() in ("1", "true", "yes")
+HEALTHCHECK_INTERVAL_SECONDS = float(os.getenv("HEALTHCHECK_INTERVAL_SECONDS", "60"))
+HEALTHCHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTHCHECK_TIMEOUT_SECONDS", "5"))
+HEALTHCHECK_CONCURRENCY = int(os.getenv("HEALTHCHECK_CONCURRENCY", "100"))
+HEALTHCHECK_PER_HOST = int(os.getenv("HEALTHCHECK_PER_HOST", "4"))
+HEALTHCHECK_JITTER = float(os.getenv("HEALTHCHECK_JITTER", "0.1"))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProbeResult:
+    instance_id: int
+    ok: bool
+    checked_at: datetime
+    status_code: int | None = None
+    latency_ms: int | None = None
+    error: str | None = None
+
+
+async def _connection_ready(session, context, params):
+    if context.trace_request_ctx is not None:
+        # The first hop's connection; redirects are part of the latency
+        context.trace_request_ctx.setdefault("connected", time.perf_counter())
+
+
+def _trace_config() -> aiohttp.TraceConfig:
+    """Records when a probe got its connection, new or reused."""
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_end.append(_connection_ready)
+    trace_config.on_connection_reuseconn.append(_connection_ready)
+    return trace_config
+
+
+async def probe(session: aiohttp.ClientSession, instance_id: int, url: str, delay: float = 0.0) -> ProbeResult:
+    """Request `url` once; any status below 500 counts as the instance being up.
+
+    Latency runs from holding a connection to the response headers, so
+    time queued behind the connector's limits is not blamed on the instance.
+    """
+    if delay:
+        await asyncio.sleep(delay)
+
+    timing = {}
+    start = time.perf_counter()
+    try:
+        async with session.get(url, allow_redirects=True, trace_request_ctx=timing) as response:
+            latency = time.perf_counter() - timing.get("connected", start)
+            return ProbeResult(
+                instance_id=instance_id,
+                ok=response.status < 500,
+                checked_at=datetime.now(timezone.utc),
+                status_code=response.status,
+                latency_ms=round(latency * 1000),
+            )
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as exc:
+        return ProbeResult(
+            instance_id=instance_id,
+            ok=False,
+            checked_at=datetime.now(timezone.utc),
+            error=(type(exc).__name__ + (f": {exc}" if str(exc) else ""))[:200],
+        )
+
+
+async def probe_all(
+    targets: list[tuple[int, str]],
+    timeout: float = HEALTHCHECK_TIMEOUT_SECONDS,
+    concurrency: int = HEALTHCHECK_CONCURRENCY,
+    per_host: int = HEALTHCHECK_PER_HOST,
+    spread: float = 0.0,
+) -> list[ProbeResult]:
+    """Probe every (instance_id, url) concurrently.
+
+    The connector caps open connections both overall and per host, so many
+    instances on one server are not all hit at once. `spread` staggers start
+    times randomly over that many seconds. `timeout` bounds connecting and
+    each wait for data, not the whole request, so probes queued behind
+    those caps do not time out before they are sent.
+    """
+    if not targets:
+        return []
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host)
+    client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=client_timeout, trace_configs=[_trace_config()]
+    ) as session:
+        return await asyncio.gather(*(
+            probe(session, instance_id, url, random.uniform(0, spread) if spread else 0.0)
+            for instance_id, url in targets
+        ))
+
+
+def load_targets() -> list[tuple[int, str]]:
+    db = SessionLocal()
+    try:
+        return [
+            (instance_id, url)
+            for instance_id, url in db.query(OdooInstance.id, OdooInstance.url)
+            .filter(OdooInstance.is_active == True)
+            .order_by(OdooInstance.id)
+        ]
+    finally:
+        db.close()
+
+
+def store_results(results: list[ProbeResult]):
+    """Upsert one health row per result and append the samples, in a single transaction."""
+    if not results:
+        return
+
+    db = SessionLocal()
+    try:
+        by_id = {result.instance_id: result for result in results}
+        existing = {
+            row.instance_id: row
+            for row in db.query(InstanceHealth).filter(InstanceHealth.instance_id.in_(by_id))
+        }
+        # Instances deleted while their probe was running
+        live_ids = {
+            instance_id for (instance_id,) in db.query(OdooInstance.id).filter(OdooInstance.id.in_(by_id))
+        }
+
+        for instance_id, result in by_id.items():
+            if instance_id not in live_ids:
+                continue
+
+            row = existing.get(instance_id)
+            if row is None:
+                row = InstanceHealth(instance_id=instance_id)
+                db.add(row)
+
+            row.ok = result.ok
+            row.status_code = result.status_code
+            row.latency_ms = result.latency_ms
+            row.error = result.error
+            row.checked_at = result.checked_at
+            if result.ok:
+                row.last_seen_at = result.checked_at
+
+        append_samples(db, [
+            {
+                "instance_id": result.instance_id,
+                "ts": int(result.checked_at.timestamp()),
+                "ok": result.ok,
+                "status_code": result.status_code,
+                "latency_ms": result.latency_ms,
+            }
+            for result in by_id.values()
+            if result.instance_id in live_ids
+        ])
+
+        if prune_schedule.due():
+            prune(db)
+
+        db.commit()
+    finally:
+        db.close()
+
+
+class HealthChecker:
+    """Background loop probing every active instance once per interval."""
+
+    def __init__(self, interval: float = HEALTHCHECK_INTERVAL_SECONDS, jitter: float = HEALTHCHECK_JITTER):
+        self.interval = interval
+        self.jitter = jitter
+        self._task: asyncio.Task | None = None
+        self._round_lock = asyncio.Lock()
+        self.rounds = 0
+        self.last_round_at: datetime | None = None
+        self.last_round_seconds: float | None = None
+        self.last_round_checked = 0
+        self.last_round_failed = 0
+
+    async def run_once(self, spread: float = 0.0) -> list[ProbeResult]:
+        async with self._round_lock:
+            start = time.perf_counter()
+            targets = await asyncio.to_thread(load_targets)
+            results = await probe_all(targets, spread=spread)
+            await asyncio.to_thread(store_results, results)
+
+            self.rounds += 1
+            self.last_round_at = datetime.now(timezone.utc)
+            self.last_round_seconds = time.perf_counter() - start
+            self.last_round_checked = len(results)
+            self.last_round_failed = sum(1 for result in results if not result.ok)
+            return results
+
+    async def _loop(self):
+        # Start at a random point in the first interval so restarted workers
+        # do not probe in lockstep
+        await asyncio.sleep(random.uniform(0, self.interval * self.jitter))
+        while True:
+            try:
+                await self.run_once(spread=self.interval * self.jitter)
+            except Exception:
+                logger.exception("Instance health check round failed")
+            delay = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            await asyncio.sleep(delay)
+
+    def start(self):
+        check_dialect(engine)
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "enabled": HEALTHCHECK_ENABLED,
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "rounds": self.rounds,
+            "last_round_at": self.last_round_at,
+            "last_round_seconds": self.last_round_seconds,
+            "last_round_checked": self.last_round_checked,
+            "last_round_failed": self.last_round_failed,
+        }
+
+
+health_checker = HealthChecker()
@@ -0,0 +1,200 @@
+from dataclasses import dataclass, field
+
+from pydantic import ValidationError
+
+from .models import OdooInstance, OdooInstanceType
+from .schemas import (
+    BulkOperation,
+    InstanceBulkItem,
+    InstanceBulkResult,
+    InstanceCreate,
+    InstanceUpdate,
+)
+
+PRODUCTION_CONFLICT = "Conflict: Another active Production instance already exists for this project."
+NOT_APPLIED = "Not applied: another operation in this batch failed"
+
+
+@dataclass
+class PlannedOperation:
+    index: int
+    op: BulkOperation
+    instance: OdooInstance | None = None
+    values: dict = field(default_factory=dict)
+
+
+@dataclass
+class BulkPrefetch:
+    """Everything the validation pass needs, loaded up front in a fixed number of queries."""
+
+    instances: dict[int, OdooInstance]
+    project_ids: set[int]
+    # None for admins, who may touch any project
+    allowed_project_ids: set[int] | None
+    # project_id -> ids of its active PRODUCTION instances
+    active_production: dict[int, set]
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+def parse_operations(items: list[InstanceBulkItem]):
+    """Validate each item's payload against the single-item schemas.
+
+    Returns (parsed, errors): parsed maps item index to the InstanceCreate or
+    InstanceUpdate payload, errors maps item index to a failed result.
+    """
+    parsed = {}
+    errors = {}
+
+    for index, item in enumerate(items):
+        if item.op != BulkOperation.CREATE and item.id is None:
+            errors[index] = InstanceBulkResult(
+                index=index, op=item.op, status=422, detail="id is required"
+            )
+            continue
+
+        try:
+            if item.op == BulkOperation.CREATE:
+                parsed[index] = InstanceCreate(**item.data)
+            elif item.op == BulkOperation.UPDATE:
+                parsed[index] = InstanceUpdate(**item.data)
+        except ValidationError as exc:
+            errors[index] = InstanceBulkResult(
+                index=index, op=item.op, status=422, id=item.id,
+                detail=_validation_detail(exc)
+            )
+
+    return parsed, errors
+
+
+def referenced_ids(items: list[InstanceBulkItem], parsed: dict):
+    """Instance ids updated/deleted and project ids created into."""
+    instance_ids = {item.id for item in items if item.op != BulkOperation.CREATE and item.id is not None}
+    project_ids = {
+        data.project_id for data in parsed.values() if isinstance(data, InstanceCreate)
+    }
+    return instance_ids, project_ids
+
+
+def plan_operations(items: list[InstanceBulkItem], parsed: dict, errors: dict, prefetch: BulkPrefetch):
+    """Check every operation in order against an in-memory copy of the batch's state.
+
+    Operations see the effect of the ones before them, so demoting the current
+    PRODUCTION instance and promoting its replacement in the same batch is
+    allowed. Returns (planned, results); nothing should be applied unless every
+    result succeeded.
+    """
+    production = {
+        project_id: set(ids) for project_id, ids in prefetch.active_production.items()
+    }
+    deleted = set()
+    planned = []
+    results = []
+
+    def fail(index, item, status, detail):
+        results.append(InstanceBulkResult(
+            index=index, op=item.op, status=status, id=item.id, detail=detail
+        ))
+
+    def authorized(project_id):
+        return prefetch.allowed_project_ids is None or project_id in prefetch.allowed_project_ids
+
+    for index, item in enumerate(items):
+        if index in errors:
+            results.append(errors[index])
+            continue
+
+        if item.op == BulkOperation.CREATE:
+            data = parsed[index]
+
+            if data.project_id not in prefetch.project_ids:
+                fail(index, item, 404, "Project not found")
+                continue
+            if not authorized(data.project_id):
+                fail(index, item, 403, "Not authorized for this project")
+                continue
+
+            # SINGLE PRODUCTION RULE
+            if data.instance_type == OdooInstanceType.PRODUCTION and data.is_active:
+                if production.get(data.project_id):
+                    fail(index, item, 400, PRODUCTION_CONFLICT)
+                    continue
+                production.setdefault(data.project_id, set()).add(("new", index))
+
+            planned.append(PlannedOperation(index=index, op=item.op, values=data.model_dump()))
+            results.append(InstanceBulkResult(index=index, op=item.op, status=201))
+            continue
+
+        instance = prefetch.instances.get(item.id)
+        if instance is None or item.id in deleted:
+            fail(index, item, 404, "Instance not found")
+            continue
+        if not authorized(instance.project_id):
+            fail(index, item, 403, "Unauthorized access to this project")
+            continue
+
+        active_ids = production.setdefault(instance.project_id, set())
+
+        if item.op == BulkOperation.DELETE:
+            deleted.add(item.id)
+            active_ids.discard(item.id)
+            planned.append(PlannedOperation(index=index, op=item.op, instance=instance))
+            results.append(InstanceBulkResult(index=index, op=item.op, status=200, id=item.id))
+            continue
+
+        # Like PATCH /instances/{id}, project_id is not movable here
+        data = parsed[index]
+        values = {
+            name: value
+            for name, value in data.model_dump(exclude={"project_id"}).items()
+            if value is not None
+        }
+        planned_type = values.get("instance_type", instance.instance_type)
+        planned_active = values.get("is_active", instance.is_active)
+
+        if planned_type == OdooInstanceType.PRODUCTION and planned_active:
+            if active_ids - {item.id}:
+                fail(index, item, 400, PRODUCTION_CONFLICT)
+                continue
+            active_ids.add(item.id)
+        else:
+            active_ids.discard(item.id)
+
+        planned.append(PlannedOperation(index=index, op=item.op, instance=instance, values=values))
+        results.append(InstanceBulkResult(index=index, op=item.op, status=200, id=item.id))
+
+    if any(result.status >= 400 for result in results):
+        results = [
+            result if result.status >= 400
+            else result.model_copy(update={"status": 424, "detail": NOT_APPLIED})
+            for result in results
+        ]
+
+    return planned, results
+
+
+def conflict_results(results: list[InstanceBulkResult], index: int):
+    """Results for a batch rolled back because item `index` hit the PRODUCTION index."""
+    rolled_back = []
+    for result in results:
+        update = {"status": 424, "detail": NOT_APPLIED}
+        if result.index == index:
+            update = {"status": 400, "detail": PRODUCTION_CONFLICT}
+        # Ids assigned to created rows by the flush no longer exist
+        if result.op == BulkOperation.CREATE:
+            update["id"] = None
+        rolled_back.append(result.model_copy(update=update))
+    return rolled_back
+
+
+def index_production(rows):
+    """Group (project_id, instance_id) rows of active PRODUCTION instances by project."""
+    active_production = {}
+    for project_id, instance_id in rows:
+        active_production.setdefault(project_id, set()).add(instance_id)
+    return active_production
@@ -1,17 +1,38 @@
 import os
-from fastapi import FastAPI, Depends
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from .database import engine, Base
+from fastapi.responses import JSONResponse, PlainTextResponse
+from .database import engine, Base, get_pool_status, DB_MODE
 from . import models
-from .routers import auth, projects, clients, instances, users
+from .routers import auth, projects, clients, instances, users, dashboard, events, data, search
 
-from .auth import get_current_user
+from .auth import get_current_user, get_current_admin
+from .user_cache import user_cache
+from .membership_cache import membership_cache
+from .change_versions import change_versions
+from .response_cache import response_cache
+from .health import HEALTHCHECK_ENABLED, health_checker
+from .query_stats import QueryStatsMiddleware, query_stats
+from .rate_limit import rate_limit_store
+from .bus import bus
+from .metrics import CONTENT_TYPE, METRICS_ENABLED, METRICS_TOKEN, MetricsMiddleware, registry
 from .models import User
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in each worker after it started, so every worker gets its own receiver
+    bus.start()
+    if HEALTHCHECK_ENABLED:
+        health_checker.start()
+    yield
+    await health_checker.stop()
+    bus.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",
@@ -25,7 +46,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], 
     allow_headers=["*"], 
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
+app.add_middleware(QueryStatsMiddleware)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # Base.metadata.create_all(bind=engine)
 
@@ -49,8 +74,65 @@ def read_me(current_user: User = Depends(get_current_user)):
         "role": current_user.role
     }
 
+def read_metrics(authorization: str | None = Header(None)):
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+if METRICS_ENABLED:
+    app.add_api_route("/metrics", read_metrics, include_in_schema=False)
+
+@app.get("/cache/users")
+def read_user_cache_stats(current_admin: User = Depends(get_current_admin)):
+    return user_cache.stats()
+
+@app.get("/cache/memberships")
+def read_membership_cache_stats(current_admin: User = Depends(get_current_admin)):
+    return membership_cache.stats()
+
+@app.get("/cache/responses")
+def read_response_cache_stats(current_admin: User = Depends(get_current_admin)):
+    return response_cache.stats()
+
+@app.get("/cache/versions")
+def read_change_versions(current_admin: User = Depends(get_current_admin)):
+    return change_versions.snapshot()
+
+@app.get("/cache/rate-limits")
+def read_rate_limit_stats(current_admin: User = Depends(get_current_admin)):
+    return rate_limit_store.stats() if rate_limit_store is not None else {"backend": "off"}
+
+@app.get("/cache/bus")
+def read_bus_stats(current_admin: User = Depends(get_current_admin)):
+    return bus.stats()
+
+@app.get("/health/stats")
+def read_health_check_stats(current_admin: User = Depends(get_current_admin)):
+    return health_checker.stats()
+
+@app.get("/db/pool")
+def read_pool_status(current_admin: User = Depends(get_current_admin)):
+    return get_pool_status()
+
+@app.get("/db/queries")
+def read_query_stats(current_admin: User = Depends(get_current_admin)):
+    return query_stats.snapshot()
+
+@app.delete("/db/queries")
+def reset_query_stats(current_admin: User = Depends(get_current_admin)):
+    query_stats.reset()
+    return {"message": "Query statistics reset"}
+
+# DB_MODE=async serves the resource routers from AsyncSessions instead
+if DB_MODE == "async":
+    from .routers.aio import projects, clients, instances, users
+
 app.include_router(auth.router)
 app.include_router(projects.router)
 app.include_router(clients.router)
 app.include_router(instances.router)
 app.include_router(users.router)
+app.include_router(dashboard.router)
+app.include_router(events.router)
+app.include_router(data.router)
+app.include_router(search.router)
@@ -0,0 +1,131 @@
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .bus import bus
+from .models import ProjectUser
+
+MEMBERSHIP_CACHE_TTL_SECONDS = float(os.getenv("MEMBERSHIP_CACHE_TTL_SECONDS", "60"))
+MEMBERSHIP_CACHE_MAX_SIZE = int(os.getenv("MEMBERSHIP_CACHE_MAX_SIZE", "1024"))
+
+
+class MembershipCache:
+    """Bounded LRU cache of each user's assigned project ids.
+
+    Every invalidation bumps a generation counter. A set loaded from the
+    database is only stored if no invalidation happened while it was loading,
+    so a slow read can never put back a membership that was just removed.
+    """
+
+    def __init__(self, max_size: int = MEMBERSHIP_CACHE_MAX_SIZE, ttl: float = MEMBERSHIP_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, frozenset[int]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._listeners = []
+
+    def get(self, user_id: int) -> frozenset[int] | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, project_ids = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return project_ids
+
+    def set(self, user_id: int, project_ids, generation: int) -> frozenset[int]:
+        project_ids = frozenset(project_ids)
+        if self.max_size <= 0:
+            return project_ids
+
+        with self._lock:
+            if generation != self.generation:
+                return project_ids
+
+            self._entries[user_id] = (time.monotonic() + self.ttl, project_ids)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return project_ids
+
+    def on_invalidate(self, listener):
+        """Registers `listener(user_id)` for invalidations made here or in
+        another worker; None stands for every user.
+        """
+        self._listeners.append(listener)
+
+    def invalidate(self, user_id: int):
+        self._drop(user_id)
+        bus.publish("membership_cache", user_id)
+
+    def clear(self):
+        """Drop every entry, e.g. after projects are deleted."""
+        self._drop(None)
+        bus.publish("membership_cache", None)
+
+    def _drop(self, user_id: int | None):
+        # None drops every entry
+        with self._lock:
+            self.generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+        for listener in self._listeners:
+            listener(user_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+membership_cache = MembershipCache()
+bus.on("membership_cache", membership_cache._drop)
+bus.on_reset(functools.partial(membership_cache._drop, None))
+
+
+def _project_ids_query(user_id: int):
+    return select(ProjectUser.project_id).where(ProjectUser.user_id == user_id)
+
+
+def get_project_ids(db: Session, user_id: int) -> frozenset[int]:
+    """Ids of the projects `user_id` is assigned to."""
+    cached = membership_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    generation = membership_cache.generation
+    return membership_cache.set(user_id, db.scalars(_project_ids_query(user_id)), generation)
+
+
+async def get_project_ids_async(db: AsyncSession, user_id: int) -> frozenset[int]:
+    cached = membership_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    generation = membership_cache.generation
+    return membership_cache.set(user_id, await db.scalars(_project_ids_query(user_id)), generation)
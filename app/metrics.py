@@ -0,0 +1,272 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# When set, GET /metrics requires "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Shards:
+    """One dict of values per thread, merged only when scraped.
+
+    Writers never take a lock: the event loop and each threadpool worker
+    only ever touch their own dict.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all: list[dict] = []
+
+    def mine(self) -> dict:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._all.append(values)
+            return values
+
+    def shards(self) -> list[dict]:
+        with self._lock:
+            return list(self._all)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._shards = _Shards()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        values = self._shards.mine()
+        values[labels] = values.get(labels, 0) + amount
+
+    def collect(self) -> dict:
+        totals = {}
+        for shard in self._shards.shards():
+            for labels, value in list(shard.items()):
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def render(self) -> list[str]:
+        totals = self.collect()
+        if not totals and not self.labelnames:
+            totals = {(): 0}
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            for labels, value in sorted(totals.items())
+        ]
+
+
+class Gauge(Counter):
+    """Up/down values, e.g. requests in flight; shards hold deltas."""
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._shards = _Shards()
+
+    def observe(self, labels: tuple, value: float):
+        values = self._shards.mine()
+        # [count per bucket..., count above the last bucket, sum]
+        row = values.get(labels)
+        if row is None:
+            row = values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def render(self) -> list[str]:
+        totals = {}
+        for shard in self._shards.shards():
+            for labels, row in list(shard.items()):
+                total = totals.setdefault(labels, [0] * len(row))
+                for index, value in enumerate(row):
+                    total[index] += value
+
+        lines = []
+        for labels, row in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), row):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(row[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Callback:
+    """Values read from a callback at scrape time; `read` returns {labels: value}."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...], read, kind: str = "gauge"):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.read = read
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            for labels, value in sorted(self.read().items())
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+))
+http_request_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to handle a request, body included", ("method", "route")
+))
+http_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests being handled", ()
+))
+auth_failures = registry.register(Counter(
+    "auth_failures_total", "Rejected authentication (401) and authorization (403) checks", ("reason",)
+))
+rate_limited = registry.register(Counter(
+    "rate_limited_total", "Requests refused with a 429, by exhausted bucket", ("limit",)
+))
+
+
+def _pool_connections():
+    from .database import get_pool_status
+
+    status = get_pool_status()
+    values = {}
+    for name, pool in (("sync", status), ("async", status.get("async"))):
+        if not pool:
+            continue
+        for key in ("in_use", "idle", "overflow"):
+            if key in pool:
+                values[(name, key)] = pool[key]
+    return values
+
+
+def _pool_stat(key):
+    def read():
+        from .database import pool_stats
+        return {(): pool_stats.snapshot()[key]}
+    return read
+
+
+def _password_stat(*keys):
+    def read():
+        from .password_pool import password_pool
+        stats = password_pool.stats()
+        return {((key,) if len(keys) > 1 else ()): stats[key] for key in keys}
+    return read
+
+
+registry.register(Callback(
+    "db_pool_connections", "Database pool connections by state", ("pool", "state"), _pool_connections
+))
+registry.register(Callback(
+    "db_pool_checkouts_total", "Connections handed out by the pool", (), _pool_stat("checkouts"), "counter"
+))
+registry.register(Callback(
+    "db_pool_timeouts_total", "Checkouts that gave up waiting for a connection", (), _pool_stat("timeouts"), "counter"
+))
+registry.register(Callback(
+    "password_hash_jobs", "bcrypt jobs running or waiting for a worker", ("state",), _password_stat("in_flight", "queued")
+))
+registry.register(Callback(
+    "password_hash_rejected_total", "bcrypt jobs refused because the queue was full", (), _password_stat("rejected"), "counter"
+))
+
+
+def route_template(scope) -> str:
+    """The matched route's path template, so ids do not multiply the series."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if path is not None else "unmatched"
+
+
+class MetricsMiddleware:
+    """Counts requests and records their latency per route.
+
+    A plain ASGI middleware doing a few dict updates per request on the
+    current thread's shard, cheap enough to leave on.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_in_flight.dec()
+            route = route_template(scope)
+            http_requests.inc((scope["method"], route, str(status_code)))
+            http_request_seconds.observe((scope["method"], route), elapsed)
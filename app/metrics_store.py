@@ -0,0 +1,276 @@
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import InstanceMetricRollup, InstanceSample, OdooInstance
+
+MINUTE, HOUR, DAY = 60, 3600, 86400
+RESOLUTIONS = (MINUTE, HOUR, DAY)
+
+# How long each table keeps data, in seconds
+METRICS_RAW_RETENTION = int(os.getenv("METRICS_RAW_RETENTION_SECONDS", str(2 * DAY)))
+METRICS_RETENTION = {
+    MINUTE: int(os.getenv("METRICS_1M_RETENTION_SECONDS", str(14 * DAY))),
+    HOUR: int(os.getenv("METRICS_1H_RETENTION_SECONDS", str(180 * DAY))),
+    DAY: int(os.getenv("METRICS_1D_RETENTION_SECONDS", str(5 * 365 * DAY))),
+}
+METRICS_PRUNE_INTERVAL_SECONDS = int(os.getenv("METRICS_PRUNE_INTERVAL_SECONDS", "3600"))
+
+# Longest range served from each source; a chart gets at most a few
+# thousand points whichever range it asks for
+_SOURCES = (
+    (6 * HOUR, None),
+    (3 * DAY, MINUTE),
+    (120 * DAY, HOUR),
+)
+
+_RANGE = re.compile(r"^(\d+)([mhd])$")
+_UNITS = {"m": MINUTE, "h": HOUR, "d": DAY}
+
+_samples = InstanceSample.__table__
+_rollups = InstanceMetricRollup.__table__
+
+
+def parse_range(value: str) -> int:
+    match = _RANGE.match(value or "")
+    if not match or int(match.group(1)) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid range, expected e.g. 30m, 24h or 30d"
+        )
+    return int(match.group(1)) * _UNITS[match.group(2)]
+
+
+def source_for(range_seconds: int) -> int | None:
+    """Rollup resolution to read for a range; None means raw samples."""
+    for longest, resolution in _SOURCES:
+        if range_seconds <= longest and (
+            resolution is None and range_seconds <= METRICS_RAW_RETENTION
+            or resolution is not None and range_seconds <= METRICS_RETENTION[resolution]
+        ):
+            return resolution
+    return DAY
+
+
+_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def check_dialect(bind):
+    """Raise at start-up if the samples cannot be written to this database."""
+    name = bind.dialect.name
+    if name not in _INSERTS:
+        raise RuntimeError(
+            f"Instance metrics need PostgreSQL or SQLite, not {name}; set HEALTHCHECK_ENABLED=false"
+        )
+
+
+def _dialect_insert(db: Session, table):
+    bind = db.get_bind()
+    check_dialect(bind)
+    return _INSERTS[bind.dialect.name](table)
+
+
+def _rollup_rows(samples: list[dict]) -> list[dict]:
+    """Pre-aggregate a batch so each (instance, resolution, bucket) is written once."""
+    buckets = defaultdict(lambda: {
+        "samples": 0, "ok_samples": 0, "latency_samples": 0,
+        "latency_sum": 0, "latency_min": None, "latency_max": None,
+    })
+
+    for sample in samples:
+        for resolution in RESOLUTIONS:
+            row = buckets[(sample["instance_id"], resolution, sample["ts"] - sample["ts"] % resolution)]
+            row["samples"] += 1
+            row["ok_samples"] += 1 if sample["ok"] else 0
+
+            latency = sample["latency_ms"]
+            if latency is not None:
+                row["latency_samples"] += 1
+                row["latency_sum"] += latency
+                row["latency_min"] = latency if row["latency_min"] is None else min(row["latency_min"], latency)
+                row["latency_max"] = latency if row["latency_max"] is None else max(row["latency_max"], latency)
+
+    return [
+        {"instance_id": instance_id, "resolution": resolution, "bucket": bucket, **values}
+        for (instance_id, resolution, bucket), values in buckets.items()
+    ]
+
+
+def _keep_min(current, incoming):
+    return case(
+        (current.is_(None), incoming),
+        (incoming < current, incoming),
+        else_=current,
+    )
+
+
+def _keep_max(current, incoming):
+    return case(
+        (current.is_(None), incoming),
+        (incoming > current, incoming),
+        else_=current,
+    )
+
+
+def append_samples(db: Session, samples: list[dict]):
+    """Add raw samples and fold them into every rollup, in the caller's transaction.
+
+    `samples` are dicts with instance_id, ts (unix seconds), ok, status_code
+    and latency_ms. Each table gets one executemany statement. Samples
+    already stored, e.g. from two rounds within one second, are skipped
+    and left out of the rollups too.
+    """
+    if not samples:
+        return
+
+    insert_samples = _dialect_insert(db, _samples).on_conflict_do_nothing(
+        index_elements=["instance_id", "ts"]
+    ).returning(_samples.c.instance_id, _samples.c.ts)
+    inserted = set(db.execute(insert_samples, samples).tuples())
+
+    new_samples = []
+    for sample in samples:
+        key = (sample["instance_id"], sample["ts"])
+        # A key repeated within the batch was only inserted once
+        if key in inserted:
+            inserted.remove(key)
+            new_samples.append(sample)
+    if not new_samples:
+        return
+
+    insert_rollups = _dialect_insert(db, _rollups)
+    incoming = insert_rollups.excluded
+    db.execute(
+        insert_rollups.on_conflict_do_update(
+            index_elements=["instance_id", "resolution", "bucket"],
+            set_={
+                "samples": _rollups.c.samples + incoming.samples,
+                "ok_samples": _rollups.c.ok_samples + incoming.ok_samples,
+                "latency_samples": _rollups.c.latency_samples + incoming.latency_samples,
+                "latency_sum": _rollups.c.latency_sum + incoming.latency_sum,
+                "latency_min": _keep_min(_rollups.c.latency_min, incoming.latency_min),
+                "latency_max": _keep_max(_rollups.c.latency_max, incoming.latency_max),
+            },
+        ),
+        _rollup_rows(new_samples),
+    )
+
+
+def prune(db: Session, now: int | None = None):
+    """Apply the retention policies and drop data of deleted instances."""
+    now = int(now if now is not None else time.time())
+
+    db.execute(delete(_samples).where(_samples.c.ts < now - METRICS_RAW_RETENTION))
+    for resolution, retention in METRICS_RETENTION.items():
+        db.execute(
+            delete(_rollups).where(
+                _rollups.c.resolution == resolution,
+                _rollups.c.bucket < now - retention,
+            )
+        )
+
+    # SQLite does not enforce ON DELETE CASCADE unless foreign keys are enabled
+    live_ids = select(OdooInstance.id)
+    db.execute(delete(_samples).where(_samples.c.instance_id.not_in(live_ids)))
+    db.execute(delete(_rollups).where(_rollups.c.instance_id.not_in(live_ids)))
+
+
+class PruneSchedule:
+    """Tells callers when the next retention pass is due."""
+
+    def __init__(self, interval: int = METRICS_PRUNE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def due(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next:
+                return False
+            self._next = now + self.interval
+            return True
+
+
+prune_schedule = PruneSchedule()
+
+
+def series_query(instance_id: int, range_seconds: int, now: int | None = None):
+    """Statement returning (ts, samples, ok_samples, latency_avg, latency_min, latency_max) rows."""
+    now = int(now if now is not None else time.time())
+    start = now - range_seconds
+    resolution = source_for(range_seconds)
+
+    if resolution is None:
+        return resolution, (
+            select(
+                _samples.c.ts,
+                _samples.c.ok,
+                _samples.c.status_code,
+                _samples.c.latency_ms,
+            )
+            .where(_samples.c.instance_id == instance_id, _samples.c.ts >= start)
+            .order_by(_samples.c.ts)
+        )
+
+    return resolution, (
+        select(
+            _rollups.c.bucket,
+            _rollups.c.samples,
+            _rollups.c.ok_samples,
+            _rollups.c.latency_samples,
+            _rollups.c.latency_sum,
+            _rollups.c.latency_min,
+            _rollups.c.latency_max,
+        )
+        .where(
+            _rollups.c.instance_id == instance_id,
+            _rollups.c.resolution == resolution,
+            _rollups.c.bucket >= start - start % resolution,
+        )
+        .order_by(_rollups.c.bucket)
+    )
+
+
+def series_response(range_seconds: int, resolution: int | None, rows) -> dict:
+    if resolution is None:
+        points = [
+            {
+                "ts": ts,
+                "samples": 1,
+                "uptime": 1.0 if ok else 0.0,
+                "status_code": status_code,
+                "latency_avg_ms": latency,
+                "latency_min_ms": latency,
+                "latency_max_ms": latency,
+            }
+            for ts, ok, status_code, latency in rows
+        ]
+    else:
+        points = [
+            {
+                "ts": bucket,
+                "samples": samples,
+                "uptime": ok_samples / samples if samples else None,
+                "latency_avg_ms": latency_sum / latency_samples if latency_samples else None,
+                "latency_min_ms": latency_min,
+                "latency_max_ms": latency_max,
+            }
+            for bucket, samples, ok_samples, latency_samples, latency_sum, latency_min, latency_max in rows
+        ]
+
+    return {
+        "range_seconds": range_seconds,
+        "resolution": {None: "raw", MINUTE: "1m", HOUR: "1h", DAY: "1d"}[resolution],
+        "points": points,
+    }
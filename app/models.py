@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, Boolean
+from sqlalchemy import Column, Integer, SmallInteger, String, ForeignKey, Enum, Boolean, DateTime, Index, LargeBinary, text
 from sqlalchemy.orm import relationship
 from .database import Base
 import enum
@@ -14,6 +14,8 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     role = Column(Enum(UserRole), nullable=False, default=UserRole.STANDARD)
+    # Bumped when the role or password changes to revoke issued tokens
+    token_version = Column(Integer, nullable=False, default=0, server_default=text("0"))
     projects = relationship("Project", secondary="project_users", back_populates="users")
     
     def __repr__(self):
@@ -45,6 +47,8 @@ class OdooInstanceType(enum.Enum):
     STAGING = "STAGING"
     DEVELOPMENT = "DEVELOPMENT"
     
+PRODUCTION_INDEX = "uq_odoo_instances_active_production"
+
 class OdooInstance(Base):
     __tablename__ = 'odoo_instances'
     id = Column(Integer, primary_key=True, index=True)
@@ -54,9 +58,84 @@ class OdooInstance(Base):
     is_active = Column(Boolean, default=True)
     project_id = Column(Integer, ForeignKey('projects.id'), nullable=False)
     project = relationship("Project", back_populates="odoo_instances")
+    health = relationship("InstanceHealth", uselist=False, cascade="all, delete-orphan")
+
+    # SINGLE PRODUCTION RULE: at most one active PRODUCTION instance per project
+    __table_args__ = (
+        Index(
+            PRODUCTION_INDEX,
+            "project_id",
+            unique=True,
+            sqlite_where=text("instance_type = 'PRODUCTION' AND is_active"),
+            postgresql_where=text("instance_type = 'PRODUCTION' AND is_active"),
+        ),
+    )
+
+class InstanceHealth(Base):
+    """Latest probe of an instance's URL; one narrow row per instance."""
+    __tablename__ = 'instance_health'
+    instance_id = Column(Integer, ForeignKey('odoo_instances.id', ondelete='CASCADE'), primary_key=True)
+    # NULL when the request failed before any HTTP status came back
+    status_code = Column(SmallInteger, nullable=True)
+    ok = Column(Boolean, nullable=False)
+    latency_ms = Column(Integer, nullable=True)
+    error = Column(String(200), nullable=True)
+    checked_at = Column(DateTime(timezone=True), nullable=False)
+    last_seen_at = Column(DateTime(timezone=True), nullable=True)
+
+class InstanceSample(Base):
+    """Raw probe results, appended in batches and pruned after a short retention."""
+    __tablename__ = 'instance_samples'
+    instance_id = Column(Integer, ForeignKey('odoo_instances.id', ondelete='CASCADE'), primary_key=True)
+    # Unix seconds keep the row (and its index entries) small
+    ts = Column(Integer, primary_key=True, index=True)
+    ok = Column(Boolean, nullable=False)
+    status_code = Column(SmallInteger, nullable=True)
+    latency_ms = Column(Integer, nullable=True)
+
+class InstanceMetricRollup(Base):
+    """Per-bucket aggregates of instance_samples at 1m, 1h and 1d resolution."""
+    __tablename__ = 'instance_metric_rollups'
+    instance_id = Column(Integer, ForeignKey('odoo_instances.id', ondelete='CASCADE'), primary_key=True)
+    # Bucket width in seconds: 60, 3600 or 86400
+    resolution = Column(Integer, primary_key=True)
+    # Unix seconds at the start of the bucket
+    bucket = Column(Integer, primary_key=True)
+    samples = Column(Integer, nullable=False)
+    ok_samples = Column(Integer, nullable=False)
+    latency_samples = Column(Integer, nullable=False)
+    latency_sum = Column(Integer, nullable=False)
+    latency_min = Column(Integer, nullable=True)
+    latency_max = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_instance_metric_rollups_resolution_bucket", "resolution", "bucket"),
+    )
 
 class ProjectUser(Base):
     __tablename__ = 'project_users'
     project_id = Column(Integer, ForeignKey('projects.id', ondelete='CASCADE'), primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
 
+    # Backs the "which projects is this user in" lookup used for authorization
+    __table_args__ = (
+        Index("ix_project_users_user_id_project_id", "user_id", "project_id"),
+    )
+
+class RefreshSession(Base):
+    """One login's refresh token; only its SHA-256 digest is stored."""
+    __tablename__ = 'refresh_sessions'
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    # Replaced on every refresh, so a token works once
+    token_hash = Column(LargeBinary(32), nullable=False)
+    # Digest of the key every token of this session starts with; a token
+    # with the right key but not the current hash was already used
+    family_hash = Column(LargeBinary(32), nullable=False)
+    # Unix seconds
+    expires_at = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_refresh_sessions_token_hash", "token_hash", unique=True),
+        Index("ix_refresh_sessions_family_hash", "family_hash", unique=True),
+    )
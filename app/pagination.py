@@ -0,0 +1,191 @@
+import base64
+import json
+import os
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Query, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.orm import Query as OrmQuery
+
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+CARRIED_HEADERS = ("ETag", "Cache-Control", "Vary")
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+
+
+@dataclass
+class PageParams:
+    limit: int | None
+    after_id: int | None
+    fields: list[str] | None
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, value = base64.urlsafe_b64decode(padded).decode().split(":", 1)
+        if prefix != "id":
+            raise ValueError(cursor)
+        return int(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def page_params(
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = None,
+) -> PageParams:
+    """Shared query parameters for list endpoints.
+
+    Without `limit` the whole collection is returned, as before. With it, rows
+    come back in id order and the `X-Next-Cursor` header carries the cursor
+    for the following page (absent on the last page).
+    """
+    return PageParams(
+        limit=limit,
+        after_id=decode_cursor(cursor) if cursor else None,
+        fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+    )
+
+
+def resolve_fields(params: PageParams, allowed: dict) -> dict | None:
+    """Map requested field names to columns, always keeping `id` for the cursor."""
+    if params.fields is None:
+        return None
+
+    unknown = [name for name in params.fields if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+
+    names = ["id"] + [name for name in params.fields if name != "id"]
+    return {name: allowed[name] for name in names}
+
+
+def apply_page(query, id_column, params: PageParams, columns: dict | None = None):
+    """Restrict a Query or select() to one keyset page, optionally projected."""
+    if columns is not None:
+        if isinstance(query, OrmQuery):
+            query = query.with_entities(*columns.values())
+        else:
+            query = query.with_only_columns(*columns.values())
+
+    query = query.order_by(id_column)
+
+    if params.after_id is not None:
+        query = query.where(id_column > params.after_id)
+
+    # One extra row tells us whether another page exists
+    if params.limit is not None:
+        query = query.limit(params.limit + 1)
+
+    return query
+
+
+def page_response(rows, params: PageParams, response, columns: dict | None = None):
+    rows = list(rows)
+    next_cursor = None
+
+    if params.limit is not None and len(rows) > params.limit:
+        rows = rows[:params.limit]
+        next_cursor = encode_cursor(rows[-1].id)
+
+    if columns is None:
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return rows
+
+    # Projected rows bypass the endpoint's response_model, and the headers
+    # already set on `response` (e.g. ETag) with it
+    headers = _carried_headers(response)
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    items = [{name: getattr(row, name) for name in columns} for row in rows]
+    return JSONResponse(jsonable_encoder(items), headers=headers)
+
+
+def _carried_headers(response) -> dict:
+    return {
+        name: response.headers[name]
+        for name in CARRIED_HEADERS
+        if name in response.headers
+    }
+
+
+def wants_ndjson(request: Request) -> bool:
+    """True if the client opted into streaming with `Accept: application/x-ndjson`."""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _row_encoder(columns: dict | None, model):
+    if columns is not None:
+        return lambda row: jsonable_encoder({name: getattr(row, name) for name in columns})
+    if model is not None:
+        return lambda row: model.model_validate(row, from_attributes=True).model_dump(mode="json")
+    return jsonable_encoder
+
+
+def _ndjson_lines(rows, encode):
+    batch = []
+    for row in rows:
+        batch.append(json.dumps(encode(row)))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+async def _ndjson_lines_async(rows, encode):
+    batch = []
+    async for row in rows:
+        batch.append(json.dumps(encode(row)))
+        if len(batch) >= STREAM_BATCH_SIZE:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+def ndjson_response(rows, params: PageParams, response, columns: dict | None = None, model=None):
+    """Stream rows as newline-delimited JSON, one object per line, as they are read.
+
+    `rows` is a result iterated with `yield_per` (a sync iterable, or an async
+    one from `AsyncSession.stream`), so neither the rows nor the body are held
+    in memory at once. `model` is the endpoint's response_model item type, if
+    it has one.
+    """
+    headers = _carried_headers(response)
+    encode = _row_encoder(columns, model)
+
+    # A page is bounded: read it first so X-Next-Cursor can go in the headers
+    if params.limit is not None:
+        rows = list(rows)
+        if len(rows) > params.limit:
+            rows = rows[:params.limit]
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
+
+    lines = _ndjson_lines_async(rows, encode) if hasattr(rows, "__aiter__") else _ndjson_lines(rows, encode)
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
+async def stream_rows(db, query, params: PageParams, scalars: bool):
+    """Execute a select() on an AsyncSession for `ndjson_response`."""
+    if params.limit is not None:
+        result = await (db.scalars(query) if scalars else db.execute(query))
+        return result.all()
+
+    query = query.execution_options(yield_per=STREAM_BATCH_SIZE)
+    return await (db.stream_scalars(query) if scalars else db.stream(query))
@@ -0,0 +1,199 @@
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .metrics import route_template
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+# "off", "summary" (statement count and DB time) or "full" (plus the
+# slowest statements' SQL, which reveals the schema to clients)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "summary").lower()
+QUERY_STATS_TOP = int(os.getenv("QUERY_STATS_TOP", "3"))
+
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+_STARTED = "query_stats_started"
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\(\s*(?:\?|%s|:\w+|__\[POSTCOMPILE_\w+\])(?:\s*,\s*(?:\?|%s|:\w+))*\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+", re.IGNORECASE)
+
+
+def normalize_sql(statement: str) -> str:
+    """One line per statement shape: literals become ? and IN/VALUES lists collapse."""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _PARAM_LIST.sub("(...)", statement)
+    return _VALUES_LIST.sub(r"\1", statement)
+
+
+@dataclass
+class RequestQueries:
+    """Statements run while handling one request."""
+    count: int = 0
+    seconds: float = 0.0
+    # (seconds, normalised sql), slowest first, at most QUERY_STATS_TOP
+    slowest: list = field(default_factory=list)
+
+    def record(self, seconds: float, statement: str):
+        self.count += 1
+        self.seconds += seconds
+        if len(self.slowest) < QUERY_STATS_TOP or seconds > self.slowest[-1][0]:
+            self.slowest.append((seconds, normalize_sql(statement)))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[QUERY_STATS_TOP:]
+
+
+# Shared by every context copied from the request's (threadpool workers,
+# the greenlets behind AsyncSessions), so all of them add to one object
+_current: contextvars.ContextVar[RequestQueries | None] = contextvars.ContextVar("request_queries", default=None)
+_current_path: contextvars.ContextVar[str | None] = contextvars.ContextVar("request_path", default=None)
+
+
+# Registered on the Engine class so the sync engine and the one behind
+# AsyncEngine are both covered
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_STARTED, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get(_STARTED)
+    if not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+
+    queries = _current.get()
+    if queries is not None:
+        queries.record(seconds, statement)
+
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        slow_query_logger.warning(json.dumps({
+            "event": "slow_query",
+            "duration_ms": round(seconds * 1000, 2),
+            "path": _current_path.get(),
+            "executemany": executemany,
+            "statement": normalize_sql(statement),
+        }))
+
+
+@dataclass
+class RouteStats:
+    requests: int = 0
+    queries: int = 0
+    db_seconds: float = 0.0
+    max_queries: int = 0
+    max_db_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: str | None = None
+
+
+class QueryStats:
+    """Per-route totals of the statements their requests ran."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: dict[str, RouteStats] = {}
+
+    def add(self, route: str, queries: RequestQueries):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = RouteStats()
+            stats.requests += 1
+            stats.queries += queries.count
+            stats.db_seconds += queries.seconds
+            stats.max_queries = max(stats.max_queries, queries.count)
+            stats.max_db_seconds = max(stats.max_db_seconds, queries.seconds)
+            if queries.slowest and queries.slowest[0][0] > stats.slowest_seconds:
+                stats.slowest_seconds, stats.slowest_statement = queries.slowest[0]
+
+    def snapshot(self):
+        with self._lock:
+            routes = sorted(self._routes.items(), key=lambda item: item[1].db_seconds, reverse=True)
+            return {
+                "slow_query_ms": SLOW_QUERY_MS,
+                "routes": [
+                    {
+                        "route": route,
+                        "requests": stats.requests,
+                        "avg_queries": stats.queries / stats.requests,
+                        "max_queries": stats.max_queries,
+                        "avg_db_ms": stats.db_seconds / stats.requests * 1000,
+                        "max_db_ms": stats.max_db_seconds * 1000,
+                        "total_db_ms": stats.db_seconds * 1000,
+                        "slowest_ms": stats.slowest_seconds * 1000,
+                        "slowest_statement": stats.slowest_statement,
+                    }
+                    for route, stats in routes
+                ],
+            }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+query_stats = QueryStats()
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def server_timing(queries: RequestQueries) -> str:
+    entries = [f'db;dur={queries.seconds * 1000:.2f};desc="{queries.count} queries"']
+    if SERVER_TIMING == "full":
+        entries += [
+            f"sql-{rank};dur={seconds * 1000:.2f};desc={_quote(statement[:120])}"
+            for rank, (seconds, statement) in enumerate(queries.slowest, start=1)
+        ]
+    return ", ".join(entries)
+
+
+class QueryStatsMiddleware:
+    """Collects each request's statements, adds a Server-Timing header and
+    feeds the route totals.
+
+    A plain ASGI middleware, so streamed responses pass through untouched.
+    The header covers the work done before the response starts; statements
+    run while a body streams still count towards the route totals.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        queries = RequestQueries()
+        token = _current.set(queries)
+        path_token = _current_path.set(scope.get("path"))
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and SERVER_TIMING != "off":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"server-timing", server_timing(queries).encode("latin-1", "replace")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            _current_path.reset(path_token)
+            query_stats.add(f"{scope['method']} {route_template(scope)}", queries)
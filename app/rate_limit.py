@@ -0,0 +1,221 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+
+from .metrics import rate_limited
+
+# "memory" (default, per process), "redis" (shared by all workers) or "off"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_SHARDS = int(os.getenv("RATE_LIMIT_SHARDS", "16"))
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Limit:
+    """A token bucket holding up to `burst` tokens, refilled at `per_minute`."""
+    burst: int
+    per_minute: float
+
+    @property
+    def per_second(self) -> float:
+        return self.per_minute / 60
+
+
+# Every login attempt from an address costs a token
+LOGIN_IP_LIMIT = Limit(
+    int(os.getenv("LOGIN_IP_BURST", "20")),
+    float(os.getenv("LOGIN_IP_PER_MINUTE", "10")),
+)
+# Every attempt takes a token before the password is checked and a successful
+# one gives it back, so only failures use the bucket up and guessing cannot
+# lock the owner out for longer than it takes to refill
+LOGIN_ACCOUNT_LIMIT = Limit(
+    int(os.getenv("LOGIN_ACCOUNT_BURST", "5")),
+    float(os.getenv("LOGIN_ACCOUNT_PER_MINUTE", "1")),
+)
+
+
+def _refill(tokens: float, updated_at: float, now: float, limit: Limit) -> float:
+    return min(limit.burst, tokens + (now - updated_at) * limit.per_second)
+
+
+class MemoryStore:
+    """Token buckets in process memory, split over independently locked shards.
+
+    Each shard is an LRU bounded to its share of `max_keys`; a bucket
+    evicted early merely starts over full.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, shards: int = RATE_LIMIT_SHARDS):
+        self.max_keys = max_keys
+        self._per_shard = max(1, max_keys // shards)
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(shards)]
+        self.evictions = 0
+
+    def take(self, key: str, limit: Limit, cost: int) -> float:
+        """Spends `cost` tokens if that many are left.
+
+        Returns 0 when allowed, otherwise the seconds until it would be;
+        a negative cost gives tokens back, up to the burst.
+        """
+        lock, buckets = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with lock:
+            state = buckets.get(key)
+            tokens = limit.burst if state is None else _refill(state[0], state[1], now, limit)
+            if tokens < cost:
+                return (cost - tokens) / limit.per_second
+            buckets[key] = (min(limit.burst, tokens - cost), now)
+            buckets.move_to_end(key)
+            while len(buckets) > self._per_shard:
+                buckets.popitem(last=False)
+                self.evictions += 1
+            return 0.0
+
+    def clear(self):
+        for lock, buckets in self._shards:
+            with lock:
+                buckets.clear()
+
+    def stats(self):
+        size = 0
+        for lock, buckets in self._shards:
+            with lock:
+                size += len(buckets)
+        return {"backend": self.name, "keys": size, "max_keys": self.max_keys, "evictions": self.evictions}
+
+
+# Same algorithm as MemoryStore.take, run atomically on the server
+_TAKE_SCRIPT = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = burst
+if state[1] then
+  tokens = math.min(burst, tonumber(state[1]) + (now - tonumber(state[2])) * rate)
+end
+if tokens < cost then
+  return tostring((cost - tokens) / rate)
+end
+tokens = math.min(burst, tokens - cost)
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return '0'
+"""
+
+
+class RedisStore:
+    """Token buckets in a Redis-compatible server shared by all workers.
+
+    Keys expire once their bucket would be full again. When the server is
+    unreachable requests are let through rather than locking everyone out.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, prefix: str = "cim:ratelimit:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the redis package installed")
+
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+        self._prefix = prefix
+        self.errors = 0
+
+    def take(self, key: str, limit: Limit, cost: int) -> float:
+        try:
+            return float(self._take(keys=[self._prefix + key], args=[limit.burst, limit.per_second, cost]))
+        except Exception:
+            self.errors += 1
+            logger.warning("Rate limit store unavailable, allowing request", exc_info=True)
+            return 0.0
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self._prefix + "*"):
+            self._client.delete(key)
+
+    def stats(self):
+        return {"backend": self.name, "errors": self.errors}
+
+
+def _make_store():
+    if RATE_LIMIT_BACKEND == "off":
+        return None
+    if RATE_LIMIT_BACKEND == "redis":
+        return RedisStore()
+    return MemoryStore()
+
+
+rate_limit_store = _make_store()
+
+
+def _reject(name: str, retry_after: float):
+    rate_limited.inc((name,))
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many attempts, please retry later",
+        headers={"Retry-After": str(max(1, round(retry_after)))},
+    )
+
+
+def client_address(request: Request) -> str:
+    # Behind a proxy, run uvicorn with --proxy-headers so this is the real client
+    return request.client.host if request.client else "unknown"
+
+
+class LoginAttempt:
+    """Handed to the login route; report a correct password with succeeded()."""
+
+    def __init__(self, account_key: str | None = None):
+        self._account_key = account_key
+
+    def succeeded(self):
+        if self._account_key is not None:
+            rate_limit_store.take(self._account_key, LOGIN_ACCOUNT_LIMIT, -1)
+
+
+def login_throttle(request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> LoginAttempt:
+    """Refuses a login with a 429 before it reaches the database or bcrypt.
+
+    Shares the parsed form with the route, which FastAPI resolves once.
+    The account token is taken here rather than after a failure, so
+    concurrent guesses cannot all pass the check before any is counted.
+    """
+    if rate_limit_store is None:
+        return LoginAttempt()
+
+    retry_after = rate_limit_store.take(f"ip:{client_address(request)}", LOGIN_IP_LIMIT, 1)
+    if retry_after:
+        raise _reject("ip", retry_after)
+
+    account_key = f"account:{form_data.username.strip().lower()}"
+    retry_after = rate_limit_store.take(account_key, LOGIN_ACCOUNT_LIMIT, 1)
+    if retry_after:
+        raise _reject("account", retry_after)
+
+    return LoginAttempt(account_key)
+
+
+def ip_throttle(request: Request):
+    """The login per-address bucket, for other anonymous endpoints that hash passwords."""
+    if rate_limit_store is None:
+        return
+    retry_after = rate_limit_store.take(f"ip:{client_address(request)}", LOGIN_IP_LIMIT, 1)
+    if retry_after:
+        raise _reject("ip", retry_after)
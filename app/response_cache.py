@@ -0,0 +1,332 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .bus import bus
+from .models import Client, OdooInstance, Project, ProjectUser, User, UserRole
+from .pagination import CARRIED_HEADERS, NEXT_CURSOR_HEADER
+
+# "memory" (default), "redis" or "off"
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+_INVALIDATED_TAGS = "invalidated_response_tags"
+
+
+class CachedBody:
+    __slots__ = ("body", "next_cursor")
+
+    def __init__(self, body: bytes, next_cursor: str | None = None):
+        self.body = body
+        self.next_cursor = next_cursor
+
+    def to_response(self, response: Response) -> Response:
+        headers = {name: response.headers[name] for name in CARRIED_HEADERS if name in response.headers}
+        if self.next_cursor:
+            headers[NEXT_CURSOR_HEADER] = self.next_cursor
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+class MemoryBackend:
+    """LRU of serialised bodies bounded by their total size in bytes."""
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CachedBody] = OrderedDict()
+        self._tags: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+    def get(self, key: str) -> CachedBody | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CachedBody, ttl: int):
+        # Entries go stale through tag versions in their key, not through a TTL
+        size = len(entry.body)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous.body)
+
+            self._entries[key] = entry
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted.body)
+
+    def tag_versions(self, tags) -> list[int]:
+        with self._lock:
+            return [self._tags.get(tag, 0) for tag in tags]
+
+    def bump_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._tags[tag] = self._tags.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class RedisBackend:
+    """Bodies and tag versions kept in a Redis-compatible server shared by all workers.
+
+    A sorted set indexes the entries by expiry time, so counting them does
+    not walk the keyspace.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = RESPONSE_CACHE_REDIS_URL, prefix: str = "cim:responses:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis needs the redis package installed")
+
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self._index = f"{prefix}index"
+
+    def get(self, key: str) -> CachedBody | None:
+        raw = self._client.get(self._prefix + key)
+        if raw is None:
+            return None
+        cursor, _, body = raw.partition(b"\n")
+        return CachedBody(body, cursor.decode() or None)
+
+    def set(self, key: str, entry: CachedBody, ttl: int):
+        # Old tag versions are never read again; the TTL reclaims their entries
+        raw = (entry.next_cursor or "").encode() + b"\n" + entry.body
+        now = time.time()
+        pipe = self._client.pipeline(transaction=False)
+        pipe.set(self._prefix + key, raw, ex=ttl)
+        pipe.zadd(self._index, {key: now + ttl})
+        pipe.zremrangebyscore(self._index, "-inf", now)
+        pipe.execute()
+
+    def tag_versions(self, tags) -> list[int]:
+        values = self._client.mget([f"{self._prefix}tag:{tag}" for tag in tags])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump_tags(self, tags):
+        pipe = self._client.pipeline(transaction=False)
+        for tag in tags:
+            pipe.incr(f"{self._prefix}tag:{tag}")
+        pipe.execute()
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self._prefix + "*"):
+            self._client.delete(key)
+
+    def stats(self):
+        memory = self._client.info("memory")
+        # Entries evicted under maxmemory are counted until their TTL would end
+        return {
+            "entries": self._client.zcount(self._index, time.time(), "+inf"),
+            "bytes": memory.get("used_memory"),
+            "max_bytes": memory.get("maxmemory") or None,
+        }
+
+
+class ResponseCache:
+    """Serialised responses for read endpoints, keyed by endpoint, query and visibility.
+
+    Each entry's key embeds the current version of the tags it depends on
+    (e.g. "projects", "instances:12"). Writes bump those versions on commit,
+    so stale entries can no longer be addressed and age out of the backend.
+    """
+
+    def __init__(self, backend, ttl: int = RESPONSE_CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def key(self, request: Request, tags: tuple[str, ...], scope: str) -> str | None:
+        if not self.enabled:
+            return None
+
+        versions = ",".join(
+            f"{tag}={version}" for tag, version in zip(tags, self.backend.tag_versions(tags))
+        )
+        raw = f"{request.url.path}?{request.url.query}|{scope}|{versions}"
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+    def get(self, key: str | None, response: Response) -> Response | None:
+        if key is None:
+            return None
+
+        entry = self.backend.get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry.to_response(response) if entry is not None else None
+
+    def put(self, key: str | None, result, response: Response, response_model=None):
+        """Serialise a handler's result as FastAPI would, store it and return it as a Response."""
+        if key is None:
+            return result
+
+        if isinstance(result, Response):
+            entry = CachedBody(result.body, result.headers.get(NEXT_CURSOR_HEADER))
+        else:
+            if response_model is not None:
+                adapter = TypeAdapter(response_model)
+                body = adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+            else:
+                body = json.dumps(jsonable_encoder(result), separators=(",", ":")).encode()
+            entry = CachedBody(body, response.headers.get(NEXT_CURSOR_HEADER))
+
+        self.backend.set(key, entry, self.ttl)
+        return entry.to_response(response)
+
+    def invalidate(self, tags):
+        if self.enabled and tags:
+            self.backend.bump_tags(tags)
+            # A shared backend already reached every worker
+            if self.backend.name == "memory":
+                bus.publish("response_cache", sorted(tags))
+
+    def _invalidate_local(self, tags):
+        if self.enabled:
+            self.backend.bump_tags(tags)
+
+    def _reset_local(self):
+        # A shared backend saw every invalidation
+        if self.enabled and self.backend.name == "memory":
+            self.backend.clear()
+
+    def clear(self):
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+
+        stats = {
+            "backend": self.backend.name if self.enabled else "off",
+            "ttl_seconds": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+        }
+        if self.enabled:
+            stats.update(self.backend.stats())
+        return stats
+
+
+def _make_backend():
+    if RESPONSE_CACHE_BACKEND == "off":
+        return None
+    if RESPONSE_CACHE_BACKEND == "redis":
+        return RedisBackend()
+    return MemoryBackend()
+
+
+response_cache = ResponseCache(_make_backend())
+bus.on("response_cache", response_cache._invalidate_local)
+bus.on_reset(response_cache._reset_local)
+
+
+def visibility_scope(current_user, project_ids=None) -> str:
+    """Admins share entries; other users share them with anyone assigned to the same projects."""
+    if current_user.role == UserRole.ADMIN:
+        return "admin"
+    digest = hashlib.blake2b(",".join(map(str, sorted(project_ids))).encode(), digest_size=8)
+    return f"projects:{digest.hexdigest()}"
+
+
+def instance_tags(project_id: int | None) -> tuple[str, ...]:
+    return (f"instances:{project_id}",) if project_id else ("instances",)
+
+
+def _tags_for(obj, deleted: bool = False) -> set:
+    if isinstance(obj, OdooInstance):
+        return {"instances", f"instances:{obj.project_id}"}
+
+    if isinstance(obj, Project):
+        tags = {"projects"}
+        if deleted:
+            tags.update({"instances", f"instances:{obj.id}"})
+        return tags
+
+    if isinstance(obj, Client):
+        tags = {"clients"}
+        if deleted:
+            tags.update({"projects", "instances"})
+        return tags
+
+    # ProjectResponse lists each project's users by email
+    if isinstance(obj, ProjectUser):
+        return {"projects"}
+
+    if isinstance(obj, User) and (deleted or inspect(obj).attrs.email.history.has_changes()):
+        return {"projects"}
+
+    return set()
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_tags(session, flush_context):
+    tags = session.info.setdefault(_INVALIDATED_TAGS, set())
+
+    for obj in session.new:
+        if not isinstance(obj, User):
+            tags.update(_tags_for(obj))
+
+    for obj in session.dirty:
+        if session.is_modified(obj):
+            tags.update(_tags_for(obj))
+
+    for obj in session.deleted:
+        tags.update(_tags_for(obj, deleted=True))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_tags(session):
+    tags = session.info.pop(_INVALIDATED_TAGS, None)
+    if tags:
+        response_cache.invalidate(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_tags(session):
+    session.info.pop(_INVALIDATED_TAGS, None)
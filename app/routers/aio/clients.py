@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...database import get_async_db
+from ...models import Client
+from ...auth import get_current_admin_async
+from ...membership_cache import membership_cache
+from ...schemas import ClientResponse, ClientUpdate
+from ...pagination import (
+    PageParams, page_params, resolve_fields, apply_page, page_response, wants_ndjson, ndjson_response, stream_rows
+)
+from ...change_versions import list_etag
+from ...response_cache import response_cache
+from ..clients import CLIENT_FIELDS
+
+router = APIRouter(prefix="/clients", tags=["Clients"])
+
+clients_etag = list_etag(("clients",), get_current_admin_async)
+
+@router.post("/")
+async def create_client(
+    name: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin = Depends(get_current_admin_async)
+):
+    client = Client(name=name)
+    db.add(client)
+    await db.commit()
+    await db.refresh(client)
+    return client
+
+@router.get("/")
+async def get_clients(
+    request: Request,
+    response: Response,
+    etag: str = Depends(clients_etag),
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    current_admin = Depends(get_current_admin_async)
+):
+    columns = resolve_fields(page, CLIENT_FIELDS)
+
+    streaming = wants_ndjson(request)
+    cache_key = None if streaming else response_cache.key(request, ("clients",), "admin")
+    cached = response_cache.get(cache_key, response)
+    if cached is not None:
+        return cached
+
+    query = apply_page(select(Client), Client.id, page, columns)
+    if streaming:
+        rows = await stream_rows(db, query, page, scalars=not columns)
+        return ndjson_response(rows, page, response, columns, ClientResponse)
+
+    rows = await db.execute(query) if columns else await db.scalars(query)
+    return response_cache.put(cache_key, page_response(rows.all(), page, response, columns), response)
+
+@router.patch("/{client_id}")
+async def update_client(
+    client_id: int,
+    client_data: ClientUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin = Depends(get_current_admin_async)
+):
+    client = await db.get(Client, client_id)
+
+    if not client:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Client not found"
+        )
+
+    if client_data.name is not None:
+        client.name = client_data.name
+
+    await db.commit()
+    await db.refresh(client)
+
+    return client
+
+@router.delete("/{client_id}")
+async def delete_client(
+    client_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin = Depends(get_current_admin_async)
+):
+    client = await db.get(Client, client_id)
+
+    if not client:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Client not found"
+        )
+
+    await db.delete(client)
+    await db.commit()
+    # Deleting a client cascades to its projects
+    membership_cache.clear()
+
+    return {"message": "Client deleted successfully"}
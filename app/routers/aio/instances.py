@@ -0,0 +1,369 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...database import get_async_db
+from ...models import InstanceHealth, OdooInstance, OdooInstanceType, Project, UserRole
+from ...auth import get_current_user_async, get_current_admin_async
+from ...health import health_checker
+from ...metrics_store import parse_range, series_query, series_response
+from ...membership_cache import get_project_ids_async
+
+from ... import schemas
+from ...instance_bulk import (
+    BulkPrefetch, PlannedOperation, conflict_results, index_production, parse_operations, plan_operations,
+    referenced_ids
+)
+from ...pagination import (
+    PageParams, page_params, resolve_fields, apply_page, page_response, wants_ndjson, ndjson_response, stream_rows
+)
+from ...change_versions import list_etag
+from ...response_cache import instance_tags, response_cache, visibility_scope
+from ..instances import INSTANCE_FIELDS, is_production_conflict
+
+router = APIRouter(prefix="/instances", tags=["Instances"])
+
+instances_etag = list_etag(("odoo_instances", "projects", "project_users"), get_current_user_async)
+
+async def _is_assigned(db: AsyncSession, project_id: int, user_id: int):
+    return project_id in await get_project_ids_async(db, user_id)
+
+@router.get("/")
+async def get_instances(
+    request: Request,
+    response: Response,
+    project_id: int = None, 
+    etag: str = Depends(instances_etag),
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db), 
+    current_user = Depends(get_current_user_async)
+):
+    query = select(OdooInstance)
+    project_ids = None
+    columns = resolve_fields(page, INSTANCE_FIELDS)
+
+    # Security Check: Only allow if Admin or assigned to the project
+    if current_user.role != UserRole.ADMIN:
+        project_ids = await get_project_ids_async(db, current_user.id)
+        if project_id and project_id not in project_ids:
+            raise HTTPException(status_code=404, detail="Not found")
+
+    # A cached entry for project_id implies the project still exists: deleting
+    # it invalidates the entry. Streamed responses are never cached
+    streaming = wants_ndjson(request)
+    cache_key = None if streaming else response_cache.key(
+        request, instance_tags(project_id), visibility_scope(current_user, project_ids)
+    )
+    cached = response_cache.get(cache_key, response)
+    if cached is not None:
+        return cached
+
+    # 1. If project_id is provided, filter by it
+    if project_id:
+        project = await db.get(Project, project_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="Not found")
+        
+        query = query.where(OdooInstance.project_id == project_id)
+    
+    # 2. If no project_id, non-admins should only see instances of projects they belong to
+    elif current_user.role != UserRole.ADMIN:
+        query = query.where(OdooInstance.project_id.in_(project_ids))
+
+    query = apply_page(query, OdooInstance.id, page, columns)
+    if streaming:
+        rows = await stream_rows(db, query, page, scalars=not columns)
+        return ndjson_response(rows, page, response, columns, schemas.InstanceResponse)
+
+    rows = await db.execute(query) if columns else await db.scalars(query)
+    return response_cache.put(cache_key, page_response(rows.all(), page, response, columns), response)
+
+# Declared before /{instance_id} so "health" is not parsed as an id
+@router.get("/health", response_model=list[schemas.InstanceHealthResponse])
+async def get_instances_health(
+    project_id: int = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    query = select(InstanceHealth).join(OdooInstance)
+
+    if project_id:
+        query = query.where(OdooInstance.project_id == project_id)
+
+    if current_user.role != UserRole.ADMIN:
+        query = query.where(OdooInstance.project_id.in_(await get_project_ids_async(db, current_user.id)))
+
+    return (await db.scalars(query.order_by(InstanceHealth.instance_id))).all()
+
+@router.post("/health/check")
+async def run_health_check(current_admin = Depends(get_current_admin_async)):
+    results = await health_checker.run_once()
+    return {
+        "checked": len(results),
+        "failed": sum(1 for result in results if not result.ok),
+    }
+
+@router.get("/{instance_id}/health", response_model=schemas.InstanceHealthResponse)
+async def get_instance_health(
+    instance_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    instance = await db.get(OdooInstance, instance_id)
+
+    if not instance:
+        raise HTTPException(status_code=404, detail="Instance not found")
+
+    if current_user.role != UserRole.ADMIN:
+        if not await _is_assigned(db, instance.project_id, current_user.id):
+            raise HTTPException(status_code=403, detail="Unauthorized")
+
+    health = await db.get(InstanceHealth, instance_id)
+
+    if not health:
+        raise HTTPException(status_code=404, detail="Instance has not been checked yet")
+
+    return health
+
+@router.get("/{instance_id}/metrics")
+async def get_instance_metrics(
+    instance_id: int,
+    range: str = "24h",
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    range_seconds = parse_range(range)
+    instance = await db.get(OdooInstance, instance_id)
+
+    if not instance:
+        raise HTTPException(status_code=404, detail="Instance not found")
+
+    if current_user.role != UserRole.ADMIN:
+        if not await _is_assigned(db, instance.project_id, current_user.id):
+            raise HTTPException(status_code=403, detail="Unauthorized")
+
+    # Read from the coarsest rollup that still gives the range enough points
+    resolution, query = series_query(instance_id, range_seconds)
+    return series_response(range_seconds, resolution, (await db.execute(query)).all())
+
+@router.get("/{instance_id}")
+async def get_instance(
+    instance_id: int, 
+    db: AsyncSession = Depends(get_async_db), 
+    current_user = Depends(get_current_user_async)
+):
+    instance = await db.get(OdooInstance, instance_id)
+    
+    if not instance:
+        raise HTTPException(status_code=404, detail="Instance not found")
+
+    # Security Check
+    if current_user.role != UserRole.ADMIN:
+        if not await _is_assigned(db, instance.project_id, current_user.id):
+            raise HTTPException(status_code=403, detail="Unauthorized")
+
+    return instance
+
+@router.post("/")
+async def create_instance(
+    data: schemas.InstanceCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    project = await db.get(Project, data.project_id)
+
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # Project isolation enforcement
+    if current_user.role != UserRole.ADMIN:
+        if not await _is_assigned(db, data.project_id, current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not authorized for this project"
+            )
+
+    instance = OdooInstance(
+        name=data.name,
+        url=data.url,
+        instance_type=data.instance_type,
+        is_active=data.is_active,
+        project_id=data.project_id
+    )
+
+    db.add(instance)
+
+    # SINGLE PRODUCTION RULE, enforced by uq_odoo_instances_active_production
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if is_production_conflict(exc):
+            raise HTTPException(
+                status_code=400,
+                detail="Conflict: This project already has an active Production instance"
+            )
+        raise
+    await db.refresh(instance)
+
+    return instance
+
+async def _apply_planned(db: AsyncSession, operation: PlannedOperation):
+    if operation.op == schemas.BulkOperation.CREATE:
+        instance = OdooInstance(**operation.values)
+        db.add(instance)
+    elif operation.op == schemas.BulkOperation.UPDATE:
+        instance = operation.instance
+        for name, value in operation.values.items():
+            setattr(instance, name, value)
+    else:
+        instance = operation.instance
+        await db.delete(instance)
+
+    # Flush in batch order so the database sees the same sequence we validated
+    await db.flush()
+    return instance
+
+@router.post("/bulk", response_model=schemas.InstanceBulkResponse)
+async def bulk_instances(
+    data: schemas.InstanceBulkRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    parsed, errors = parse_operations(data.operations)
+    instance_ids, project_ids = referenced_ids(data.operations, parsed)
+
+    instances = {}
+    if instance_ids:
+        instances = {
+            instance.id: instance
+            for instance in await db.scalars(
+                select(OdooInstance).where(OdooInstance.id.in_(instance_ids))
+            )
+        }
+    project_ids |= {instance.project_id for instance in instances.values()}
+
+    existing_project_ids = set()
+    allowed_project_ids = None
+    active_production = {}
+
+    if project_ids:
+        existing_project_ids = set(
+            await db.scalars(select(Project.id).where(Project.id.in_(project_ids)))
+        )
+
+        if current_user.role != UserRole.ADMIN:
+            allowed_project_ids = await get_project_ids_async(db, current_user.id)
+
+        active_production = index_production(
+            await db.execute(
+                select(OdooInstance.project_id, OdooInstance.id).where(
+                    OdooInstance.project_id.in_(project_ids),
+                    OdooInstance.instance_type == OdooInstanceType.PRODUCTION,
+                    OdooInstance.is_active == True
+                )
+            )
+        )
+
+    planned, results = plan_operations(
+        data.operations, parsed, errors,
+        BulkPrefetch(
+            instances=instances,
+            project_ids=existing_project_ids,
+            allowed_project_ids=allowed_project_ids,
+            active_production=active_production,
+        )
+    )
+
+    if any(result.status >= 400 for result in results):
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        return {"applied": False, "results": results}
+
+    # Everything is applied in one transaction, or nothing is
+    try:
+        for operation in planned:
+            try:
+                instance = await _apply_planned(db, operation)
+            except IntegrityError as exc:
+                if not is_production_conflict(exc):
+                    raise
+                # Another request took the PRODUCTION slot after our prefetch
+                await db.rollback()
+                response.status_code = status.HTTP_400_BAD_REQUEST
+                return {"applied": False, "results": conflict_results(results, operation.index)}
+            results[operation.index].id = instance.id
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    return {"applied": True, "results": results}
+
+@router.patch("/{instance_id}")
+async def update_instance(
+    instance_id: int,
+    data: schemas.InstanceUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+
+    # 1. Fetch the existing record
+    instance = await db.get(OdooInstance, instance_id)
+    
+    if not instance:
+        raise HTTPException(status_code=404, detail="Instance not found")
+
+    # 2. Project Isolation (Security Check)
+    if current_user.role != UserRole.ADMIN:
+        if not await _is_assigned(db, instance.project_id, current_user.id):
+            raise HTTPException(status_code=403, detail="Unauthorized access to this project")
+
+    # 3. Apply the updates only if they were provided
+    if data.name is not None:
+        instance.name = data.name
+    if data.url is not None:
+        instance.url = data.url
+    if data.instance_type is not None:
+        instance.instance_type = data.instance_type
+    if data.is_active is not None:
+        instance.is_active = data.is_active
+
+    # 4. THE SINGLE PRODUCTION RULE, enforced by uq_odoo_instances_active_production
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if is_production_conflict(exc):
+            raise HTTPException(
+                status_code=400, 
+                detail="Conflict: Another active Production instance already exists for this project."
+            )
+        raise
+    await db.refresh(instance)
+    return instance
+
+@router.delete("/{instance_id}")
+async def delete_instance(
+    instance_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_user_async)
+):
+    instance = await db.get(OdooInstance, instance_id)
+
+    if not instance:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Instance not found"
+        )
+
+    # Security Check
+    if current_user.role != UserRole.ADMIN:
+        if not await _is_assigned(db, instance.project_id, current_user.id):
+            raise HTTPException(status_code=403, detail="Unauthorized")
+
+    await db.delete(instance)
+    await db.commit()
+
+    return {"message": "Instance deleted successfully"}
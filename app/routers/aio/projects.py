@@ -0,0 +1,207 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from ...database import get_async_db
+from ...models import Project, ProjectUser, User, UserRole, Client
+from ...auth import get_current_user_async, get_current_admin_async
+from ...membership_cache import get_project_ids_async, membership_cache
+from ... import schemas
+from ...schemas import ProjectResponse
+from ...pagination import (
+    PageParams, page_params, resolve_fields, apply_page, page_response, wants_ndjson, ndjson_response, stream_rows
+)
+from ...change_versions import list_etag
+from ...response_cache import response_cache, visibility_scope
+from ..projects import PROJECT_FIELDS
+
+
+router = APIRouter(prefix="/projects", tags=["Projects"])
+
+projects_etag = list_etag(("projects", "project_users", "users"), get_current_user_async)
+
+async def _get_assignment(db: AsyncSession, project_id: int, user_id: int):
+    return await db.get(ProjectUser, (project_id, user_id))
+
+@router.get("/", response_model=list[ProjectResponse])
+async def get_projects(
+    request: Request,
+    response: Response,
+    etag: str = Depends(projects_etag),
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    query = select(Project)
+    project_ids = None
+
+    if current_user.role != UserRole.ADMIN:
+        project_ids = await get_project_ids_async(db, current_user.id)
+        query = query.where(Project.id.in_(project_ids))
+
+    columns = resolve_fields(page, PROJECT_FIELDS)
+
+    streaming = wants_ndjson(request)
+    cache_key = None if streaming else response_cache.key(
+        request, ("projects",), visibility_scope(current_user, project_ids)
+    )
+    cached = response_cache.get(cache_key, response)
+    if cached is not None:
+        return cached
+
+    query = apply_page(query, Project.id, page, columns)
+
+    if columns:
+        if streaming:
+            return ndjson_response(await stream_rows(db, query, page, scalars=False), page, response, columns)
+        result = page_response((await db.execute(query)).all(), page, response, columns)
+        return response_cache.put(cache_key, result, response)
+
+    # Async sessions cannot lazy load, so users are fetched up front
+    query = query.options(selectinload(Project.users))
+    if streaming:
+        rows = await stream_rows(db, query, page, scalars=True)
+        return ndjson_response(rows, page, response, model=ProjectResponse)
+
+    result = page_response((await db.scalars(query)).all(), page, response)
+    return response_cache.put(cache_key, result, response, list[ProjectResponse])
+
+
+@router.delete("/{project_id}")
+async def delete_project(
+    project_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin = Depends(get_current_admin_async)
+):
+    project = await db.get(Project, project_id)
+
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+
+    await db.delete(project)
+    await db.commit()
+    # Project ids can be reused once deleted, so no cached membership may outlive it
+    membership_cache.clear()
+
+    return {"message": "Project deleted successfully"}
+
+
+@router.delete("/{project_id}/assign/{user_id}")
+async def remove_user_from_project(
+    project_id: int,
+    user_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin = Depends(get_current_admin_async)
+):
+    assignment = await _get_assignment(db, project_id, user_id)
+
+    if not assignment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Assignment not found"
+        )
+
+    await db.delete(assignment)
+    await db.commit()
+    membership_cache.invalidate(user_id)
+
+    return {"message": "User removed from project"}
+
+
+
+@router.get("/{project_id}")
+async def get_project(
+    project_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    project = await db.get(Project, project_id)
+
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if current_user.role == UserRole.ADMIN:
+        return project
+
+    if project_id not in await get_project_ids_async(db, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this project"
+        )
+
+    return project
+
+@router.post("/")
+async def create_project(
+    project_data: schemas.ProjectCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin = Depends(get_current_admin_async)
+):
+    client = await db.get(Client, project_data.client_id)
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    project = Project(name=project_data.name, client_id=project_data.client_id)
+    db.add(project)
+    await db.commit()
+    await db.refresh(project)
+
+    return project
+
+@router.post("/{project_id}/assign/{user_id}")
+async def assign_user_to_project(
+    project_id: int,
+    user_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin = Depends(get_current_admin_async)
+):
+    existing = await _get_assignment(db, project_id, user_id)
+
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User already assigned to project"
+        )
+
+    assignment = ProjectUser(
+        project_id=project_id,
+        user_id=user_id
+    )
+
+    db.add(assignment)
+    await db.commit()
+    membership_cache.invalidate(user_id)
+
+    return {"message": "User assigned to project"}
+
+@router.patch("/{project_id}", response_model=ProjectResponse)
+async def update_project(
+    project_id: int,
+    project_data: schemas.ProjectUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin=Depends(get_current_admin_async),
+):
+    project = await db.get(Project, project_id)
+
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Project not found"
+        )
+
+    if project_data.client_id is not None:
+        client = await db.get(Client, project_data.client_id)
+        if not client:
+            raise HTTPException(status_code=404, detail="Client not found")
+        project.client_id = project_data.client_id
+
+    if project_data.name is not None:
+        project.name = project_data.name
+
+    await db.commit()
+    await db.refresh(project, attribute_names=["name", "client_id", "users"])
+
+    return project
@@ -0,0 +1,186 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from ...database import get_async_db
+from ...models import User, UserRole
+from ...schemas import UserCreate, UserResponse, UserWithProjects, UserUpdate
+from ...auth import get_current_admin_async, hash_password_async, revoke_tokens
+from ...user_cache import user_cache
+from ...sessions import revoke_user_sessions_async
+from ...membership_cache import membership_cache
+from ...pagination import (
+    PageParams, page_params, resolve_fields, apply_page, page_response, wants_ndjson, ndjson_response, stream_rows
+)
+from ...change_versions import list_etag
+from ..users import USER_FIELDS
+
+router = APIRouter(prefix="/users", tags=["Users"])
+
+users_etag = list_etag(("users",), get_current_admin_async)
+users_with_projects_etag = list_etag(("users", "project_users", "projects"), get_current_admin_async)
+
+@router.get("/with-projects", response_model=list[UserWithProjects])
+async def get_users_with_projects(
+    request: Request,
+    response: Response,
+    etag: str = Depends(users_with_projects_etag),
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    current_admin: User = Depends(get_current_admin_async)
+):
+    columns = resolve_fields(page, USER_FIELDS)
+    query = apply_page(select(User), User.id, page, columns)
+
+    streaming = wants_ndjson(request)
+
+    if columns:
+        if streaming:
+            return ndjson_response(await stream_rows(db, query, page, scalars=False), page, response, columns)
+        return page_response((await db.execute(query)).all(), page, response, columns)
+
+    query = query.options(selectinload(User.projects))
+    if streaming:
+        rows = await stream_rows(db, query, page, scalars=True)
+        return ndjson_response(rows, page, response, model=UserWithProjects)
+    return page_response((await db.scalars(query)).all(), page, response)
+
+
+@router.get("/", response_model=list[UserResponse])
+async def get_users(
+    request: Request,
+    response: Response,
+    etag: str = Depends(users_etag),
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_async_db),
+    current_admin: User = Depends(get_current_admin_async)
+):
+    columns = resolve_fields(page, USER_FIELDS)
+    query = apply_page(select(User), User.id, page, columns)
+    if wants_ndjson(request):
+        rows = await stream_rows(db, query, page, scalars=not columns)
+        return ndjson_response(rows, page, response, columns, UserResponse)
+
+    rows = await db.execute(query) if columns else await db.scalars(query)
+    return page_response(rows.all(), page, response, columns)
+
+
+@router.post("/", response_model=UserResponse)
+async def create_user(
+    user_data: UserCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin: User = Depends(get_current_admin_async)
+):
+    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
+    if existing_user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
+
+    hashed_password = await hash_password_async(user_data.password)
+
+    new_user = User(
+        email=user_data.email,
+        hashed_password=hashed_password,
+        role=user_data.role
+    )
+
+    db.add(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+
+    return new_user
+
+@router.patch("/{user_id}", response_model=UserResponse)
+async def update_user(
+    user_id: int,
+    user_data: UserUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin: User = Depends(get_current_admin_async)
+):
+    user_to_update = await db.get(User, user_id)
+
+    if not user_to_update:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+    if user_data.email and user_data.email != user_to_update.email:
+        existing_user = await db.scalar(select(User).where(User.email == user_data.email))
+        if existing_user:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered"
+            )
+        user_to_update.email = user_data.email
+
+    if user_data.password:
+        user_to_update.hashed_password = await hash_password_async(user_data.password)
+        revoke_tokens(user_to_update)
+        await revoke_user_sessions_async(db, user_to_update.id)
+
+    if user_data.role is not None and user_data.role.value != user_to_update.role.value:
+        user_to_update.role = user_data.role
+        revoke_tokens(user_to_update)
+
+    await db.commit()
+    await db.refresh(user_to_update)
+    user_cache.invalidate(user_to_update.id)
+
+    return user_to_update
+
+
+@router.delete("/{user_id}/sessions")
+async def revoke_sessions(
+    user_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin: User = Depends(get_current_admin_async)
+):
+    """Signs the user out everywhere: ends their refresh sessions and
+    revokes the access tokens already issued."""
+    user = await db.get(User, user_id)
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+    revoked = await revoke_user_sessions_async(db, user_id)
+    revoke_tokens(user)
+    await db.commit()
+    user_cache.invalidate(user_id)
+
+    return {"revoked_sessions": revoked}
+
+
+@router.delete("/{user_id}")
+async def delete_user(
+    user_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_admin: User = Depends(get_current_admin_async)
+):
+    if current_admin.id == user_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Admins cannot delete their own account."
+        )
+
+    user_to_delete = await db.get(User, user_id)
+
+    if not user_to_delete:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+    await revoke_user_sessions_async(db, user_id)
+    await db.delete(user_to_delete)
+    await db.commit()
+    user_cache.invalidate(user_id)
+    membership_cache.invalidate(user_id)
+
+    return {"message": "User deleted successfully"}
@@ -1,46 +1,103 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
 
 from ..repositories.user_repo import get_user_by_email
 from ..database import get_db
 from ..models import User
-from ..auth import verify_password, hash_password, create_access_token
+from ..auth import verify_and_update_password_async, hash_password_async, create_user_token
+from ..metrics import auth_failures
+from ..schemas import RefreshRequest
+from ..rate_limit import LoginAttempt, ip_throttle, login_throttle
+from ..sessions import create_refresh_token, revoke_refresh_token, rotate_refresh_token
 
 router = APIRouter(tags=["Auth"])
 
-@router.post("/register")
-def register(email: str, password: str, db: Session = Depends(get_db)):
+# The password routes are async so bcrypt runs on the password pool without
+# also holding a threadpool worker; their database work goes to the
+# threadpool in short steps instead.
+
+def _add_user(db: Session, email: str, hashed_password: str):
     existing_user = db.query(User).filter(User.email == email).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     user = User(
         email=email,
-        hashed_password=hash_password(password)
+        hashed_password=hashed_password
     )
 
     db.add(user)
     db.commit()
-    db.refresh(user)
+
+@router.post("/register", dependencies=[Depends(ip_throttle)])
+async def register(email: str, password: str, db: Session = Depends(get_db)):
+    hashed_password = await hash_password_async(password)
+    await run_in_threadpool(_add_user, db, email, hashed_password)
 
     return {"message": "User created successfully"}
 
+def _start_session(db: Session, user: User, new_hash: str | None) -> str:
+    # Transparently upgrade hashes made with an outdated cost factor
+    if new_hash:
+        user.hashed_password = new_hash
+
+    refresh_token = create_refresh_token(db, user.id)
+    db.commit()
+    return refresh_token
+
 @router.post("/login")
-def login(
+async def login(
+    attempt: LoginAttempt = Depends(login_throttle),
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    user = get_user_by_email(db, form_data.username)
+    user = await run_in_threadpool(get_user_by_email, db, form_data.username)
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
 
-    access_token = create_access_token(
-        data={"sub": str(user.id)}
-    )
+    valid, new_hash = await verify_and_update_password_async(form_data.password, user.hashed_password)
+
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password"
+        )
+
+    attempt.succeeded()
+
+    access_token = create_user_token(user)
+    refresh_token = await run_in_threadpool(_start_session, db, user, new_hash)
+
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/token/refresh")
+def refresh(body: RefreshRequest, db: Session = Depends(get_db)):
+    """New access and refresh tokens for a refresh token, which is used up."""
+    rotated = rotate_refresh_token(db, body.refresh_token)
+
+    if rotated is None:
+        # Keeps the end of a session whose token was reused
+        db.commit()
+        auth_failures.inc(("invalid_refresh_token",))
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token"
+        )
+
+    user, refresh_token = rotated
+    db.commit()
+
+    return {"access_token": create_user_token(user), "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/logout")
+def logout(body: RefreshRequest, db: Session = Depends(get_db)):
+    revoke_refresh_token(db, body.refresh_token)
+    db.commit()
 
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {"message": "Logged out"}
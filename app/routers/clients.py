@@ -1,13 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 
 from ..database import get_db
 from ..models import Client
 from ..auth import get_current_admin
-from ..schemas import ClientUpdate
+from ..membership_cache import membership_cache
+from ..schemas import ClientResponse, ClientUpdate
+from ..pagination import (
+    PageParams, page_params, resolve_fields, apply_page, page_response, wants_ndjson, ndjson_response, STREAM_BATCH_SIZE
+)
+from ..change_versions import list_etag
+from ..response_cache import response_cache
 
 router = APIRouter(prefix="/clients", tags=["Clients"])
 
+clients_etag = list_etag(("clients",), get_current_admin)
+
+CLIENT_FIELDS = {"id": Client.id, "name": Client.name}
+
 @router.post("/")
 def create_client(
     name: str,
@@ -22,10 +32,25 @@ def create_client(
 
 @router.get("/")
 def get_clients(
+    request: Request,
+    response: Response,
+    etag: str = Depends(clients_etag),
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_admin = Depends(get_current_admin)
 ):
-    return db.query(Client).all()
+    columns = resolve_fields(page, CLIENT_FIELDS)
+
+    streaming = wants_ndjson(request)
+    cache_key = None if streaming else response_cache.key(request, ("clients",), "admin")
+    cached = response_cache.get(cache_key, response)
+    if cached is not None:
+        return cached
+
+    query = apply_page(db.query(Client), Client.id, page, columns)
+    if streaming:
+        return ndjson_response(query.yield_per(STREAM_BATCH_SIZE), page, response, columns, ClientResponse)
+    return response_cache.put(cache_key, page_response(query.all(), page, response, columns), response)
 
 @router.patch("/{client_id}")
 def update_client(
@@ -66,5 +91,7 @@ def delete_client(
 
     db.delete(client)
     db.commit()
+    # Deleting a client cascades to its projects
+    membership_cache.clear()
 
     return {"message": "Client deleted successfully"}
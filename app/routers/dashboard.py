@@ -0,0 +1,62 @@
+from collections import defaultdict
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session, selectinload
+
+from ..database import get_db
+from ..models import Client, OdooInstance, Project, User, UserRole
+from ..auth import get_current_user
+from ..membership_cache import get_project_ids
+from ..schemas import DashboardResponse
+from ..change_versions import list_etag
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+dashboard_etag = list_etag(
+    ("clients", "projects", "project_users", "users", "odoo_instances"), get_current_user
+)
+
+@router.get("/", response_model=DashboardResponse)
+def get_dashboard(
+    etag: str = Depends(dashboard_etag),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Everything the dashboard needs in a fixed number of queries, instead of
+    # one /instances call per project.
+    projects_query = db.query(Project).options(selectinload(Project.users))
+    instances_query = db.query(OdooInstance)
+    clients_query = db.query(Client)
+
+    # Non-admins only see projects they are assigned to (and their clients)
+    if current_user.role != UserRole.ADMIN:
+        visible_project_ids = get_project_ids(db, current_user.id)
+        projects_query = projects_query.filter(Project.id.in_(visible_project_ids))
+        instances_query = instances_query.filter(
+            OdooInstance.project_id.in_(visible_project_ids)
+        )
+        clients_query = clients_query.filter(
+            Client.id.in_(
+                db.query(Project.client_id).filter(Project.id.in_(visible_project_ids))
+            )
+        )
+
+    instances_by_project = defaultdict(list)
+    for instance in instances_query.order_by(OdooInstance.id).all():
+        instances_by_project[instance.project_id].append(instance)
+
+    projects = [
+        {
+            "id": project.id,
+            "name": project.name,
+            "client_id": project.client_id,
+            "users": project.users,
+            "instances": instances_by_project[project.id],
+        }
+        for project in projects_query.order_by(Project.client_id, Project.name).all()
+    ]
+
+    return {
+        "clients": clients_query.order_by(Client.id).all(),
+        "projects": projects,
+    }
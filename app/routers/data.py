@@ -0,0 +1,75 @@
+import codecs
+from typing import Literal
+
+from anyio import from_thread
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from ..database import SessionLocal
+from ..auth import get_current_admin
+from ..data_transfer import IMPORT_CHUNK_SIZE, export_lines, import_lines
+
+router = APIRouter(prefix="/data", tags=["Data"])
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _request_lines(request: Request):
+    """Decode the body as it arrives and yield it line by line, endings kept.
+
+    Iterated from a worker thread; each chunk is awaited on the event loop.
+    """
+    chunks = request.stream()
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    while True:
+        try:
+            chunk = from_thread.run(chunks.__anext__)
+        except StopAsyncIteration:
+            break
+        text = tail + decoder.decode(chunk)
+        *lines, tail = text.split("\n")
+        for line in lines:
+            yield line + "\n"
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+@router.post("/import")
+async def import_data(
+    request: Request,
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=50000),
+    current_admin = Depends(get_current_admin)
+):
+    # The body is read while earlier chunks are written, so only one chunk
+    # of records is held in memory at a time
+    db = SessionLocal()
+    try:
+        summary = await run_in_threadpool(import_lines, db, _request_lines(request), format, chunk_size)
+    finally:
+        await run_in_threadpool(db.close)
+
+    return summary.as_dict()
+
+
+@router.get("/export")
+def export_data(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    current_admin = Depends(get_current_admin)
+):
+    def lines():
+        # Own session: the response outlives the request's dependencies
+        db = SessionLocal()
+        try:
+            yield from export_lines(db, format)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        lines(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="export.{format}"'},
+    )
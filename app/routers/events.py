@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import os
+import re
+
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+
+from ..database import SessionLocal
+from ..auth import get_current_user, get_current_admin
+from ..events import STREAM_RESET, broker
+from ..membership_cache import get_project_ids
+from ..models import UserRole
+
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+# EventSource cannot send headers, so the token may also come as ?token=
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
+
+_TOKEN_PARAM = re.compile(r"([?&]token=)[^&\s]*")
+
+
+class _HideTokens(logging.Filter):
+    """Masks ?token= in access log lines, as it is a live bearer token."""
+
+    def filter(self, record):
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                _TOKEN_PARAM.sub(r"\1***", arg) if isinstance(arg, str) else arg for arg in record.args
+            )
+        return True
+
+
+# uvicorn writes the access log, under gunicorn too
+logging.getLogger("uvicorn.access").addFilter(_HideTokens())
+
+
+def _load_subscriber(token: str):
+    # A short-lived session: the stream itself never touches the database
+    db = SessionLocal()
+    try:
+        user = get_current_user(token=token, db=db)
+        project_ids = () if user.role == UserRole.ADMIN else get_project_ids(db, user.id)
+        return user, project_ids
+    finally:
+        db.close()
+
+
+@router.get("/")
+async def stream_events(
+    request: Request,
+    token: str | None = Query(None),
+    bearer: str | None = Depends(optional_oauth2_scheme),
+    last_event_id: str | None = Header(None),
+):
+    user, project_ids = await run_in_threadpool(_load_subscriber, bearer or token or "")
+
+    async def stream():
+        subscriber = broker.subscribe(user.id, user.role, project_ids, last_event_id)
+        try:
+            yield "retry: 3000\n\n"
+            if subscriber.missed:
+                # Reload rather than trust a partial replay
+                yield f"event: {STREAM_RESET}\ndata: {{}}\n\n"
+            while True:
+                try:
+                    change = await asyncio.wait_for(subscriber.queue.get(), EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # Comment line; keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+
+                # None means the broker dropped us for falling behind or
+                # because the user's access changed; the client reconnects,
+                # is authorized again and catches up with Last-Event-ID
+                if change is None:
+                    return
+                yield change.encode()
+        finally:
+            broker.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stats")
+def read_event_stats(current_admin = Depends(get_current_admin)):
+    return broker.stats()
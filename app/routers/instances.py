@@ -1,44 +1,158 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from ..database import get_db
-from ..models import OdooInstance, OdooInstanceType, Project, UserRole, ProjectUser
-from ..auth import get_current_user
+from ..models import InstanceHealth, OdooInstance, OdooInstanceType, Project, UserRole, PRODUCTION_INDEX
+from ..auth import get_current_user, get_current_admin
+from ..health import health_checker
+from ..metrics_store import parse_range, series_query, series_response
+from ..membership_cache import get_project_ids
 
 from .. import schemas
+from ..instance_bulk import (
+    BulkPrefetch, PlannedOperation, conflict_results, index_production, parse_operations, plan_operations,
+    referenced_ids
+)
+from ..pagination import (
+    PageParams, page_params, resolve_fields, apply_page, page_response, wants_ndjson, ndjson_response, STREAM_BATCH_SIZE
+)
+from ..change_versions import list_etag
+from ..response_cache import instance_tags, response_cache, visibility_scope
 
 router = APIRouter(prefix="/instances", tags=["Instances"])
 
+instances_etag = list_etag(("odoo_instances", "projects", "project_users"), get_current_user)
+
+INSTANCE_FIELDS = {
+    "id": OdooInstance.id,
+    "name": OdooInstance.name,
+    "url": OdooInstance.url,
+    "instance_type": OdooInstance.instance_type,
+    "is_active": OdooInstance.is_active,
+    "project_id": OdooInstance.project_id,
+}
+
+def is_production_conflict(exc: IntegrityError) -> bool:
+    """True if `exc` was raised by the single-active-PRODUCTION unique index."""
+    message = str(exc.orig)
+    # Postgres names the index, SQLite names the indexed column
+    return PRODUCTION_INDEX in message or "odoo_instances.project_id" in message
+
 @router.get("/")
 def get_instances(
+    request: Request,
+    response: Response,
     project_id: int = None, 
+    etag: str = Depends(instances_etag),
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db), 
     current_user = Depends(get_current_user)
 ):
     query = db.query(OdooInstance)
-    
+    project_ids = None
+    columns = resolve_fields(page, INSTANCE_FIELDS)
+
+    # Security Check: Only allow if Admin or assigned to the project
+    if current_user.role != UserRole.ADMIN:
+        project_ids = get_project_ids(db, current_user.id)
+        if project_id and project_id not in project_ids:
+            raise HTTPException(status_code=404, detail="Not found")
+
+    # A cached entry for project_id implies the project still exists: deleting
+    # it invalidates the entry. Streamed responses are never cached
+    streaming = wants_ndjson(request)
+    cache_key = None if streaming else response_cache.key(
+        request, instance_tags(project_id), visibility_scope(current_user, project_ids)
+    )
+    cached = response_cache.get(cache_key, response)
+    if cached is not None:
+        return cached
+
     # 1. If project_id is provided, filter by it
     if project_id:
         project = db.query(Project).filter(Project.id == project_id).first()
         if not project:
             raise HTTPException(status_code=404, detail="Not found")
-
-        # 2. Security Check: Only allow if Admin or assigned to the project
-        if current_user.role != UserRole.ADMIN:
-            assigned = db.query(ProjectUser).filter(
-                ProjectUser.project_id == project_id,
-                ProjectUser.user_id == current_user.id
-            ).first()
-            if not assigned:
-                raise HTTPException(status_code=404, detail="Not found")
         
         query = query.filter(OdooInstance.project_id == project_id)
     
-    # 3. If no project_id, non-admins should only see instances of projects they belong to
+    # 2. If no project_id, non-admins should only see instances of projects they belong to
     elif current_user.role != UserRole.ADMIN:
-        query = query.join(Project).join(ProjectUser).filter(ProjectUser.user_id == current_user.id)
+        query = query.filter(OdooInstance.project_id.in_(project_ids))
+
+    query = apply_page(query, OdooInstance.id, page, columns)
+    if streaming:
+        return ndjson_response(query.yield_per(STREAM_BATCH_SIZE), page, response, columns, schemas.InstanceResponse)
+    return response_cache.put(cache_key, page_response(query.all(), page, response, columns), response)
+
+# Declared before /{instance_id} so "health" is not parsed as an id
+@router.get("/health", response_model=list[schemas.InstanceHealthResponse])
+def get_instances_health(
+    project_id: int = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    query = db.query(InstanceHealth).join(OdooInstance)
+
+    if project_id:
+        query = query.filter(OdooInstance.project_id == project_id)
+
+    if current_user.role != UserRole.ADMIN:
+        query = query.filter(OdooInstance.project_id.in_(get_project_ids(db, current_user.id)))
+
+    return query.order_by(InstanceHealth.instance_id).all()
+
+@router.post("/health/check")
+async def run_health_check(current_admin = Depends(get_current_admin)):
+    results = await health_checker.run_once()
+    return {
+        "checked": len(results),
+        "failed": sum(1 for result in results if not result.ok),
+    }
+
+@router.get("/{instance_id}/health", response_model=schemas.InstanceHealthResponse)
+def get_instance_health(
+    instance_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    instance = db.query(OdooInstance).filter(OdooInstance.id == instance_id).first()
+
+    if not instance:
+        raise HTTPException(status_code=404, detail="Instance not found")
+
+    if current_user.role != UserRole.ADMIN:
+        if instance.project_id not in get_project_ids(db, current_user.id):
+            raise HTTPException(status_code=403, detail="Unauthorized")
+
+    health = db.query(InstanceHealth).filter(InstanceHealth.instance_id == instance_id).first()
+
+    if not health:
+        raise HTTPException(status_code=404, detail="Instance has not been checked yet")
 
-    return query.all()
+    return health
+
+@router.get("/{instance_id}/metrics")
+def get_instance_metrics(
+    instance_id: int,
+    range: str = "24h",
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    range_seconds = parse_range(range)
+    instance = db.query(OdooInstance).filter(OdooInstance.id == instance_id).first()
+
+    if not instance:
+        raise HTTPException(status_code=404, detail="Instance not found")
+
+    if current_user.role != UserRole.ADMIN:
+        if instance.project_id not in get_project_ids(db, current_user.id):
+            raise HTTPException(status_code=403, detail="Unauthorized")
+
+    # Read from the coarsest rollup that still gives the range enough points
+    resolution, query = series_query(instance_id, range_seconds)
+    return series_response(range_seconds, resolution, db.execute(query).all())
 
 @router.get("/{instance_id}")
 def get_instance(
@@ -53,11 +167,7 @@ def get_instance(
 
     # Security Check
     if current_user.role != UserRole.ADMIN:
-        assigned = db.query(ProjectUser).filter(
-            ProjectUser.project_id == instance.project_id,
-            ProjectUser.user_id == current_user.id
-        ).first()
-        if not assigned:
+        if instance.project_id not in get_project_ids(db, current_user.id):
             raise HTTPException(status_code=403, detail="Unauthorized")
 
     return instance
@@ -75,31 +185,12 @@ def create_instance(
 
     # Project isolation enforcement
     if current_user.role != UserRole.ADMIN:
-        assigned = any(user.id == current_user.id for user in project.users)
-        if not assigned:
+        if data.project_id not in get_project_ids(db, current_user.id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized for this project"
             )
 
-    # SINGLE PRODUCTION RULE
-    if data.instance_type == OdooInstanceType.PRODUCTION and data.is_active:
-        existing_production = (
-            db.query(OdooInstance)
-            .filter(
-                OdooInstance.project_id == data.project_id,
-                OdooInstance.instance_type == OdooInstanceType.PRODUCTION,
-                OdooInstance.is_active == True
-            )
-            .first()
-        )
-
-        if existing_production:
-            raise HTTPException(
-                status_code=400,
-                detail="Conflict: This project already has an active Production instance"
-            )
-
     instance = OdooInstance(
         name=data.name,
         url=data.url,
@@ -109,11 +200,110 @@ def create_instance(
     )
 
     db.add(instance)
-    db.commit()
+
+    # SINGLE PRODUCTION RULE, enforced by uq_odoo_instances_active_production
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        if is_production_conflict(exc):
+            raise HTTPException(
+                status_code=400,
+                detail="Conflict: This project already has an active Production instance"
+            )
+        raise
     db.refresh(instance)
 
     return instance
 
+def _apply_planned(db: Session, operation: PlannedOperation):
+    if operation.op == schemas.BulkOperation.CREATE:
+        instance = OdooInstance(**operation.values)
+        db.add(instance)
+    elif operation.op == schemas.BulkOperation.UPDATE:
+        instance = operation.instance
+        for name, value in operation.values.items():
+            setattr(instance, name, value)
+    else:
+        instance = operation.instance
+        db.delete(instance)
+
+    # Flush in batch order so the database sees the same sequence we validated
+    db.flush()
+    return instance
+
+@router.post("/bulk", response_model=schemas.InstanceBulkResponse)
+def bulk_instances(
+    data: schemas.InstanceBulkRequest,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    parsed, errors = parse_operations(data.operations)
+    instance_ids, project_ids = referenced_ids(data.operations, parsed)
+
+    instances = {}
+    if instance_ids:
+        instances = {
+            instance.id: instance
+            for instance in db.query(OdooInstance).filter(OdooInstance.id.in_(instance_ids))
+        }
+    project_ids |= {instance.project_id for instance in instances.values()}
+
+    existing_project_ids = set()
+    allowed_project_ids = None
+    active_production = {}
+
+    if project_ids:
+        existing_project_ids = {
+            project_id for (project_id,) in db.query(Project.id).filter(Project.id.in_(project_ids))
+        }
+
+        if current_user.role != UserRole.ADMIN:
+            allowed_project_ids = get_project_ids(db, current_user.id)
+
+        active_production = index_production(
+            db.query(OdooInstance.project_id, OdooInstance.id).filter(
+                OdooInstance.project_id.in_(project_ids),
+                OdooInstance.instance_type == OdooInstanceType.PRODUCTION,
+                OdooInstance.is_active == True
+            )
+        )
+
+    planned, results = plan_operations(
+        data.operations, parsed, errors,
+        BulkPrefetch(
+            instances=instances,
+            project_ids=existing_project_ids,
+            allowed_project_ids=allowed_project_ids,
+            active_production=active_production,
+        )
+    )
+
+    if any(result.status >= 400 for result in results):
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        return {"applied": False, "results": results}
+
+    # Everything is applied in one transaction, or nothing is
+    try:
+        for operation in planned:
+            try:
+                instance = _apply_planned(db, operation)
+            except IntegrityError as exc:
+                if not is_production_conflict(exc):
+                    raise
+                # Another request took the PRODUCTION slot after our prefetch
+                db.rollback()
+                response.status_code = status.HTTP_400_BAD_REQUEST
+                return {"applied": False, "results": conflict_results(results, operation.index)}
+            results[operation.index].id = instance.id
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return {"applied": True, "results": results}
+
 @router.patch("/{instance_id}")
 def update_instance(
     instance_id: int,
@@ -131,35 +321,10 @@ def update_instance(
     # 2. Project Isolation (Security Check)
     if current_user.role != UserRole.ADMIN:
         # We check the project associated with THIS specific instance
-        is_assigned = db.query(ProjectUser).filter(
-            ProjectUser.project_id == instance.project_id,
-            ProjectUser.user_id == current_user.id
-        ).first()
-        
-        if not is_assigned:
+        if instance.project_id not in get_project_ids(db, current_user.id):
             raise HTTPException(status_code=403, detail="Unauthorized access to this project")
 
-    # 3. THE SINGLE PRODUCTION RULE (Validation)
-    # We check if the NEW state being requested would violate the rule
-    target_type = data.instance_type if data.instance_type is not None else instance.instance_type
-    target_active = data.is_active if data.is_active is not None else instance.is_active
-
-
-    if target_type == OdooInstanceType.PRODUCTION and target_active:
-        conflict = db.query(OdooInstance).filter(
-            OdooInstance.project_id == instance.project_id,
-            OdooInstance.instance_type == OdooInstanceType.PRODUCTION,
-            OdooInstance.is_active == True,
-            OdooInstance.id != instance_id  # EXCLUDE the record we are currently updating
-        ).first()
-
-        if conflict:
-            raise HTTPException(
-                status_code=400, 
-                detail="Conflict: Another active Production instance already exists for this project."
-            )
-
-    # 4. Apply the updates only if they were provided
+    # 3. Apply the updates only if they were provided
     if data.name is not None:
         instance.name = data.name
     if data.url is not None:
@@ -169,8 +334,17 @@ def update_instance(
     if data.is_active is not None:
         instance.is_active = data.is_active
 
-
-    db.commit()
+    # 4. THE SINGLE PRODUCTION RULE, enforced by uq_odoo_instances_active_production
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        if is_production_conflict(exc):
+            raise HTTPException(
+                status_code=400, 
+                detail="Conflict: Another active Production instance already exists for this project."
+            )
+        raise
     db.refresh(instance)
     return instance
 
@@ -190,11 +364,7 @@ def delete_instance(
 
     # Security Check
     if current_user.role != UserRole.ADMIN:
-        assigned = db.query(ProjectUser).filter(
-            ProjectUser.project_id == instance.project_id,
-            ProjectUser.user_id == current_user.id
-        ).first()
-        if not assigned:
+        if instance.project_id not in get_project_ids(db, current_user.id):
             raise HTTPException(status_code=403, detail="Unauthorized")
 
     db.delete(instance)
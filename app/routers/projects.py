@@ -1,29 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session, selectinload
 
 from ..database import get_db
 from ..models import Project, ProjectUser, User, UserRole, Client
 from ..auth import get_current_user, get_current_admin
+from ..membership_cache import get_project_ids, membership_cache
 from .. import schemas
 from ..schemas import ProjectResponse
+from ..pagination import (
+    PageParams, page_params, resolve_fields, apply_page, page_response, wants_ndjson, ndjson_response, STREAM_BATCH_SIZE
+)
+from ..change_versions import list_etag
+from ..response_cache import response_cache, visibility_scope
 
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
 
+projects_etag = list_etag(("projects", "project_users", "users"), get_current_user)
+
+PROJECT_FIELDS = {"id": Project.id, "name": Project.name, "client_id": Project.client_id}
+
 @router.get("/", response_model=list[ProjectResponse])
 def get_projects(
+    request: Request,
+    response: Response,
+    etag: str = Depends(projects_etag),
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    if current_user.role == UserRole.ADMIN:
-        return db.query(Project).all()
+    query = db.query(Project)
+    project_ids = None
 
-    return (
-        db.query(Project)
-        .join(Project.users)
-        .filter(User.id == current_user.id)
-        .all()
+    if current_user.role != UserRole.ADMIN:
+        project_ids = get_project_ids(db, current_user.id)
+        query = query.filter(Project.id.in_(project_ids))
+
+    columns = resolve_fields(page, PROJECT_FIELDS)
+
+    streaming = wants_ndjson(request)
+    cache_key = None if streaming else response_cache.key(
+        request, ("projects",), visibility_scope(current_user, project_ids)
     )
+    cached = response_cache.get(cache_key, response)
+    if cached is not None:
+        return cached
+
+    # ProjectResponse serialises project.users; load them all in one extra query
+    if columns is None:
+        query = query.options(selectinload(Project.users))
+
+    query = apply_page(query, Project.id, page, columns)
+    if streaming:
+        # selectinload runs once per yield_per batch
+        return ndjson_response(query.yield_per(STREAM_BATCH_SIZE), page, response, columns, ProjectResponse)
+
+    result = page_response(query.all(), page, response, columns)
+    return response_cache.put(cache_key, result, response, list[ProjectResponse])
     
 
 @router.delete("/{project_id}")
@@ -42,6 +75,8 @@ def delete_project(
 
     db.delete(project)
     db.commit()
+    # Project ids can be reused once deleted, so no cached membership may outlive it
+    membership_cache.clear()
 
     return {"message": "Project deleted successfully"}
 
@@ -70,6 +105,7 @@ def remove_user_from_project(
 
     db.delete(assignment)
     db.commit()
+    membership_cache.invalidate(user_id)
 
     return {"message": "User removed from project"}
 
@@ -89,16 +125,7 @@ def get_project(
     if current_user.role == UserRole.ADMIN:
         return project
 
-    assignment = (
-        db.query(ProjectUser)
-        .filter(
-            ProjectUser.project_id == project_id,
-            ProjectUser.user_id == current_user.id
-        )
-        .first()
-    )
-
-    if not assignment:
+    if project_id not in get_project_ids(db, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this project"
@@ -152,6 +179,7 @@ def assign_user_to_project(
 
     db.add(assignment)
     db.commit()
+    membership_cache.invalidate(user_id)
 
     return {"message": "User assigned to project"}
 
@@ -162,7 +190,12 @@ def update_project(
     db: Session = Depends(get_db),
     current_admin=Depends(get_current_admin),
 ):
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = (
+        db.query(Project)
+        .options(selectinload(Project.users))
+        .filter(Project.id == project_id)
+        .first()
+    )
 
     if not project:
         raise HTTPException(
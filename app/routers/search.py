@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..models import User, UserRole
+from ..auth import get_current_user
+from ..membership_cache import get_project_ids
+from ..search import KIND_CODES, SEARCH_MAX_RESULTS, search
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+@router.get("/")
+def search_everything(
+    q: str = Query(..., min_length=1, max_length=100),
+    types: str | None = Query(None, description=f"Comma-separated subset of {', '.join(KIND_CODES)}"),
+    limit: int = Query(20, ge=1, le=SEARCH_MAX_RESULTS),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    q = q.strip()
+    kinds = [kind.strip() for kind in types.split(",")] if types else None
+    project_ids = None
+
+    if not q:
+        return {"query": q, "hits": []}
+
+    if current_user.role != UserRole.ADMIN:
+        project_ids = get_project_ids(db, current_user.id)
+
+    return {"query": q, "hits": search(db, q, current_user, project_ids, kinds, limit)}
@@ -1,41 +1,71 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from ..database import get_db
 from ..models import User, UserRole
 from ..schemas import UserCreate, UserResponse, UserWithProjects, UserUpdate
-from ..auth import get_current_admin, hash_password
+from ..auth import get_current_admin, hash_password_async, revoke_tokens
+from ..user_cache import user_cache
+from ..sessions import revoke_user_sessions
+from ..membership_cache import membership_cache
+from ..pagination import (
+    PageParams, page_params, resolve_fields, apply_page, page_response, wants_ndjson, ndjson_response, STREAM_BATCH_SIZE
+)
+from ..change_versions import list_etag
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-from sqlalchemy.orm import joinedload
+users_etag = list_etag(("users",), get_current_admin)
+users_with_projects_etag = list_etag(("users", "project_users", "projects"), get_current_admin)
+
+USER_FIELDS = {"id": User.id, "email": User.email, "role": User.role}
+
+from sqlalchemy.orm import selectinload
 
 @router.get("/with-projects", response_model=list[UserWithProjects])
 def get_users_with_projects(
+    request: Request,
+    response: Response,
+    etag: str = Depends(users_with_projects_etag),
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_admin: User = Depends(get_current_admin)
 ):
-    return (
-        db.query(User)
-        .options(joinedload(User.projects))
-        .all()
-    )
+    columns = resolve_fields(page, USER_FIELDS)
+    query = db.query(User)
+
+    # selectinload keeps one row per user instead of one per assignment
+    if columns is None:
+        query = query.options(selectinload(User.projects))
+
+    query = apply_page(query, User.id, page, columns)
+    if wants_ndjson(request):
+        return ndjson_response(query.yield_per(STREAM_BATCH_SIZE), page, response, columns, UserWithProjects)
+    return page_response(query.all(), page, response, columns)
 
 
 @router.get("/", response_model=list[UserResponse])
 def get_users(
+    request: Request,
+    response: Response,
+    etag: str = Depends(users_etag),
+    page: PageParams = Depends(page_params),
     db: Session = Depends(get_db),
     current_admin: User = Depends(get_current_admin)
 ):
-    return db.query(User).all()
+    columns = resolve_fields(page, USER_FIELDS)
+    query = apply_page(db.query(User), User.id, page, columns)
+    if wants_ndjson(request):
+        return ndjson_response(query.yield_per(STREAM_BATCH_SIZE), page, response, columns, UserResponse)
+    return page_response(query.all(), page, response, columns)
 
 
-@router.post("/", response_model=UserResponse)
-def create_user(
-    user_data: UserCreate,
-    db: Session = Depends(get_db),
-    current_admin: User = Depends(get_current_admin)
-):
+# Routes that hash passwords are async: bcrypt runs on the password pool
+# without holding a threadpool worker, the database work runs in the
+# threadpool as usual
+
+def _create_user(db: Session, user_data: UserCreate, hashed_password: str):
     existing_user = db.query(User).filter(User.email == user_data.email).first()
     if existing_user:
         raise HTTPException(
@@ -43,8 +73,6 @@ def create_user(
             detail="Email already registered"
         )
 
-    hashed_password = hash_password(user_data.password)
-
     new_user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -57,13 +85,16 @@ def create_user(
 
     return new_user
 
-@router.patch("/{user_id}", response_model=UserResponse)
-def update_user(
-    user_id: int,
-    user_data: UserUpdate,
+@router.post("/", response_model=UserResponse)
+async def create_user(
+    user_data: UserCreate,
     db: Session = Depends(get_db),
     current_admin: User = Depends(get_current_admin)
 ):
+    hashed_password = await hash_password_async(user_data.password)
+    return await run_in_threadpool(_create_user, db, user_data, hashed_password)
+
+def _update_user(db: Session, user_id: int, user_data: UserUpdate, hashed_password: str | None):
     user_to_update = db.query(User).filter(User.id == user_id).first()
 
     if not user_to_update:
@@ -81,17 +112,55 @@ def update_user(
             )
         user_to_update.email = user_data.email
 
-    if user_data.password:
-        user_to_update.hashed_password = hash_password(user_data.password)
+    if hashed_password:
+        user_to_update.hashed_password = hashed_password
+        revoke_tokens(user_to_update)
+        revoke_user_sessions(db, user_to_update.id)
 
-    if user_data.role is not None:
+    if user_data.role is not None and user_data.role.value != user_to_update.role.value:
         user_to_update.role = user_data.role
+        revoke_tokens(user_to_update)
 
     db.commit()
     db.refresh(user_to_update)
+    user_cache.invalidate(user_to_update.id)
 
     return user_to_update
 
+@router.patch("/{user_id}", response_model=UserResponse)
+async def update_user(
+    user_id: int,
+    user_data: UserUpdate,
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(get_current_admin)
+):
+    hashed_password = await hash_password_async(user_data.password) if user_data.password else None
+    return await run_in_threadpool(_update_user, db, user_id, user_data, hashed_password)
+
+
+@router.delete("/{user_id}/sessions")
+def revoke_sessions(
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_admin: User = Depends(get_current_admin)
+):
+    """Signs the user out everywhere: ends their refresh sessions and
+    revokes the access tokens already issued."""
+    user = db.query(User).filter(User.id == user_id).first()
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+    revoked = revoke_user_sessions(db, user_id)
+    revoke_tokens(user)
+    db.commit()
+    user_cache.invalidate(user_id)
+
+    return {"revoked_sessions": revoked}
+
 
 @router.delete("/{user_id}")
 def delete_user(
@@ -113,7 +182,10 @@ def delete_user(
             detail="User not found"
         )
 
+    revoke_user_sessions(db, user_id)
     db.delete(user_to_delete)
     db.commit()
+    user_cache.invalidate(user_id)
+    membership_cache.invalidate(user_id)
 
     return {"message": "User deleted successfully"}
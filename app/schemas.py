@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from datetime import datetime
+
+from pydantic import BaseModel, Field
 from .models import OdooInstanceType
 from enum import Enum
 
@@ -86,3 +88,78 @@ class UserWithProjects(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class ClientResponse(BaseModel):
+    id: int
+    name: str
+
+    class Config:
+        orm_mode = True
+
+
+class InstanceResponse(BaseModel):
+    id: int
+    name: str
+    url: str
+    instance_type: OdooInstanceType
+    is_active: bool
+    project_id: int
+
+    class Config:
+        orm_mode = True
+
+
+class InstanceHealthResponse(BaseModel):
+    instance_id: int
+    ok: bool
+    status_code: int | None = None
+    latency_ms: int | None = None
+    error: str | None = None
+    checked_at: datetime
+    last_seen_at: datetime | None = None
+
+    class Config:
+        orm_mode = True
+
+
+class DashboardProject(ProjectResponse):
+    instances: list[InstanceResponse] = []
+
+
+class DashboardResponse(BaseModel):
+    clients: list[ClientResponse] = []
+    projects: list[DashboardProject] = []
+
+
+class BulkOperation(str, Enum):
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
+class InstanceBulkItem(BaseModel):
+    op: BulkOperation
+    id: int | None = None
+    data: dict = Field(default_factory=dict)
+
+
+class InstanceBulkRequest(BaseModel):
+    operations: list[InstanceBulkItem] = Field(..., min_length=1, max_length=500)
+
+
+class InstanceBulkResult(BaseModel):
+    index: int
+    op: BulkOperation
+    status: int
+    id: int | None = None
+    detail: str | None = None
+
+
+class InstanceBulkResponse(BaseModel):
+    applied: bool
+    results: list[InstanceBulkResult]
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
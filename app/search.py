@@ -0,0 +1,146 @@
+import os
+
+from sqlalchemy import bindparam, func, literal, null, or_, select, text, union_all
+from sqlalchemy.orm import Session
+
+from .models import Client, OdooInstance, Project, User, UserRole
+
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "50"))
+# Best-scored matches re-ranked with prefix matches first; re-ranking every
+# match of a term found in most rows would cost a second full sort
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", "2000"))
+
+# The SQLite index is one FTS5 table kept in sync by triggers (see migration
+# 0005). Each row's rowid packs the source row: id * 4 + kind code, so the
+# triggers update and delete by rowid instead of scanning.
+SEARCH_TABLE = "search_index"
+KIND_CODES = {"client": 0, "project": 1, "instance": 2, "user": 3}
+KINDS = {code: kind for kind, code in KIND_CODES.items()}
+
+# The trigram tokenizer can only MATCH terms of at least three characters
+_MIN_MATCH_LENGTH = 3
+
+
+def _like_pattern(q: str, prefix: bool = False) -> str:
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%" if prefix else f"%{escaped}%"
+
+
+def visible_client_ids(db: Session, project_ids) -> list[int]:
+    """Clients a non-admin sees: those of their projects, as on the dashboard."""
+    if not project_ids:
+        return []
+    return list(db.scalars(
+        select(Project.client_id).where(Project.id.in_(project_ids)).distinct()
+    ))
+
+
+def _fts_search(db: Session, q: str, kinds, project_ids, client_ids, limit: int):
+    conditions = []
+    params = {
+        "prefix": _like_pattern(q, prefix=True),
+        "candidates": SEARCH_CANDIDATES,
+        "limit": limit,
+        "kinds": [KIND_CODES[kind] for kind in kinds],
+    }
+    expanding = ["kinds"]
+
+    if len(q) >= _MIN_MATCH_LENGTH:
+        # A quoted phrase: trigram matching turns it into a substring search
+        conditions.append(f"{SEARCH_TABLE} MATCH :match")
+        params["match"] = '"' + q.replace('"', '""') + '"'
+        score = f"bm25({SEARCH_TABLE}, 0.0, 10.0, 1.0)"
+    else:
+        conditions.append("(name LIKE :pattern ESCAPE '\\' OR detail LIKE :pattern ESCAPE '\\')")
+        params["pattern"] = _like_pattern(q)
+        score = "length(name)"
+
+    conditions.append("rowid % 4 IN :kinds")
+
+    if project_ids is not None:
+        conditions.append(
+            "(project_id IN :project_ids OR (rowid % 4 = 0 AND rowid / 4 IN :client_ids))"
+        )
+        params["project_ids"] = list(project_ids) or [-1]
+        params["client_ids"] = list(client_ids) or [-1]
+        expanding += ["project_ids", "client_ids"]
+
+    statement = text(f"""
+        SELECT kind, id, project_id, name, detail FROM (
+            SELECT rowid % 4 AS kind, rowid / 4 AS id, project_id, name, detail, {score} AS score
+            FROM {SEARCH_TABLE}
+            WHERE {" AND ".join(conditions)}
+            ORDER BY score
+            LIMIT :candidates
+        )
+        ORDER BY name LIKE :prefix ESCAPE '\\' DESC, score
+        LIMIT :limit
+    """).bindparams(*(bindparam(name, expanding=True) for name in expanding))
+
+    return [
+        {"type": KINDS[kind], "id": row_id, "name": name, "detail": detail, "project_id": project_id}
+        for kind, row_id, project_id, name, detail in db.execute(statement, params)
+    ]
+
+
+def _like_search(db: Session, q: str, kinds, project_ids, client_ids, limit: int):
+    """Other databases search the base tables; Postgres indexes them with pg_trgm."""
+    pattern = _like_pattern(q)
+    sources = {
+        "client": select(
+            literal("client").label("type"), Client.id, null().label("project_id"),
+            Client.name, null().label("detail"),
+        ).where(Client.name.ilike(pattern, escape="\\")),
+        "project": select(
+            literal("project").label("type"), Project.id, Project.id.label("project_id"),
+            Project.name, null().label("detail"),
+        ).where(Project.name.ilike(pattern, escape="\\")),
+        "instance": select(
+            literal("instance").label("type"), OdooInstance.id, OdooInstance.project_id,
+            OdooInstance.name, OdooInstance.url.label("detail"),
+        ).where(or_(OdooInstance.name.ilike(pattern, escape="\\"), OdooInstance.url.ilike(pattern, escape="\\"))),
+        "user": select(
+            literal("user").label("type"), User.id, null().label("project_id"),
+            User.email.label("name"), null().label("detail"),
+        ).where(User.email.ilike(pattern, escape="\\")),
+    }
+
+    if project_ids is not None:
+        sources["client"] = sources["client"].where(Client.id.in_(client_ids))
+        sources["project"] = sources["project"].where(Project.id.in_(project_ids))
+        sources["instance"] = sources["instance"].where(OdooInstance.project_id.in_(project_ids))
+
+    hits = union_all(*(sources[kind] for kind in kinds)).subquery()
+    statement = (
+        select(hits)
+        .order_by(hits.c.name.ilike(_like_pattern(q, prefix=True), escape="\\").desc(), func.length(hits.c.name))
+        .limit(limit)
+    )
+    return [dict(row._mapping) for row in db.execute(statement)]
+
+
+def search(db: Session, q: str, current_user, project_ids=None, kinds=None, limit: int = SEARCH_MAX_RESULTS):
+    """Ranked matches for `q` across clients, projects, instances and users.
+
+    Names starting with `q` come first. Non-admins only get the projects they
+    are assigned to (`project_ids`), their instances and clients; users are
+    admin-only.
+    """
+    kinds = [kind for kind in (kinds or KIND_CODES) if kind in KIND_CODES]
+    client_ids = None
+
+    if current_user.role != UserRole.ADMIN:
+        kinds = [kind for kind in kinds if kind != "user"]
+        project_ids = list(project_ids or ())
+        if not project_ids:
+            return []
+        client_ids = visible_client_ids(db, project_ids)
+    else:
+        project_ids = None
+
+    if not kinds:
+        return []
+
+    if db.get_bind().dialect.name == "sqlite":
+        return _fts_search(db, q, kinds, project_ids, client_ids, limit)
+    return _like_search(db, q, kinds, project_ids, client_ids, limit)
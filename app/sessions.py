@@ -0,0 +1,110 @@
+import hashlib
+import logging
+import os
+import secrets
+import time
+
+from sqlalchemy import delete, insert, or_, select, update
+
+from .models import RefreshSession, User
+
+REFRESH_TOKEN_EXPIRE_DAYS = float(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(token: str) -> bytes:
+    # The tokens are random, so a plain hash is enough to keep them out of the table
+    return hashlib.sha256(token.encode()).digest()
+
+
+def _new_token(family: str) -> str:
+    # Every token of a session starts with the session's family key
+    return f"{family}.{secrets.token_urlsafe(32)}"
+
+
+def create_refresh_token(db, user_id: int) -> str:
+    """Starts a session for `user_id` and returns its refresh token; commit to apply.
+
+    The user's expired sessions are dropped on the way so the table only
+    holds live ones.
+    """
+    family = secrets.token_urlsafe(16)
+    token = _new_token(family)
+    now = int(time.time())
+    db.execute(
+        delete(RefreshSession)
+        .where(RefreshSession.user_id == user_id, RefreshSession.expires_at < now)
+    )
+    db.execute(insert(RefreshSession).values(
+        user_id=user_id,
+        token_hash=_digest(token),
+        family_hash=_digest(family),
+        expires_at=now + int(REFRESH_TOKEN_EXPIRE_DAYS * 86400),
+    ))
+    return token
+
+
+def rotate_refresh_token(db, token: str):
+    """Swaps a live refresh token for a new one; commit to apply.
+
+    Returns (user, new token), where user has the id, role and
+    token_version an access token needs, or None when the token is
+    unknown, expired or was already used. The session keeps its original
+    expiry, so a login lasts at most REFRESH_TOKEN_EXPIRE_DAYS.
+
+    A token that was already swapped means two parties hold the session's
+    tokens, one of them a thief, so the whole session is ended.
+    """
+    digest = _digest(token)
+    family, separator, _ = token.partition(".")
+    conditions = [RefreshSession.token_hash == digest]
+    if separator:
+        conditions.append(RefreshSession.family_hash == _digest(family))
+
+    row = db.execute(
+        select(
+            RefreshSession.id.label("session_id"), RefreshSession.token_hash, RefreshSession.expires_at,
+            User.id, User.role, User.token_version,
+        )
+        .join(User, User.id == RefreshSession.user_id)
+        .where(or_(*conditions))
+    ).first()
+    if row is None or row.expires_at < int(time.time()):
+        return None
+    if row.token_hash != digest:
+        _end_reused_session(db, row)
+        return None
+
+    new_token = _new_token(family)
+    # Matching the old hash too means only one of two concurrent refreshes wins
+    result = db.execute(
+        update(RefreshSession)
+        .where(RefreshSession.id == row.session_id, RefreshSession.token_hash == digest)
+        .values(token_hash=_digest(new_token))
+    )
+    if result.rowcount != 1:
+        # The same token presented twice at once is reuse too
+        _end_reused_session(db, row)
+        return None
+    return row, new_token
+
+
+def _end_reused_session(db, row):
+    logger.warning("Refresh token of session %s reused; ending the session of user %s", row.session_id, row.id)
+    db.execute(delete(RefreshSession).where(RefreshSession.id == row.session_id))
+
+
+def revoke_refresh_token(db, token: str) -> bool:
+    result = db.execute(delete(RefreshSession).where(RefreshSession.token_hash == _digest(token)))
+    return result.rowcount > 0
+
+
+def revoke_user_sessions(db, user_id: int) -> int:
+    """Ends every session of `user_id`; commit to apply."""
+    return db.execute(delete(RefreshSession).where(RefreshSession.user_id == user_id)).rowcount
+
+
+async def revoke_user_sessions_async(db, user_id: int) -> int:
+    result = await db.execute(delete(RefreshSession).where(RefreshSession.user_id == user_id))
+    return result.rowcount
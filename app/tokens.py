@@ -0,0 +1,91 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+from jose import JWTError, jwk, jwt
+
+_HMAC_DIGESTS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+# Distinct header segments remembered; tokens from one issuer share a handful
+_MAX_HEADERS = 16
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+class TokenVerifier:
+    """Decodes access tokens with a key and algorithm prepared once.
+
+    HMAC tokens skip python-jose: the keyed hash is built at start-up and
+    copied per token, and header segments already seen are not parsed
+    again. Other algorithms go through jose with a pre-constructed key.
+    Tokens without an `exp` claim are refused. Failures raise jose's
+    JWTError either way.
+    """
+
+    def __init__(self, secret: str, algorithm: str):
+        self.algorithm = algorithm
+        digest = _HMAC_DIGESTS.get(algorithm)
+        self._mac = hmac.new(secret.encode(), digestmod=digest) if digest else None
+        self._key = None if digest else jwk.construct(secret, algorithm)
+        self._headers: dict[str, bool] = {}
+
+    def decode(self, token: str) -> dict:
+        if self._mac is None:
+            return jwt.decode(token, self._key, algorithms=[self.algorithm], options={"require_exp": True})
+
+        try:
+            header, payload, signature = token.split(".")
+        except ValueError:
+            raise JWTError("Not enough segments")
+
+        if not self._header_ok(header):
+            raise JWTError("Unexpected token header")
+
+        mac = self._mac.copy()
+        mac.update(f"{header}.{payload}".encode("ascii", "replace"))
+        if not hmac.compare_digest(_b64encode(mac.digest()), signature):
+            raise JWTError("Signature verification failed")
+
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            raise JWTError("Invalid payload")
+        if not isinstance(claims, dict):
+            raise JWTError("Invalid payload")
+
+        now = time.time()
+        exp = claims.get("exp")
+        if exp is None:
+            raise JWTError('Token is missing the "exp" claim')
+        if not isinstance(exp, (int, float)) or exp < now:
+            raise JWTError("Signature has expired")
+        nbf = claims.get("nbf")
+        if nbf is not None and (not isinstance(nbf, (int, float)) or nbf > now):
+            raise JWTError("The token is not yet valid")
+        return claims
+
+    def _header_ok(self, segment: str) -> bool:
+        known = self._headers.get(segment)
+        if known is not None:
+            return known
+
+        try:
+            header = json.loads(_b64decode(segment))
+            ok = isinstance(header, dict) and header.get("alg") == self.algorithm and "crit" not in header
+        except ValueError:
+            ok = False
+        if len(self._headers) < _MAX_HEADERS:
+            self._headers[segment] = ok
+        return ok
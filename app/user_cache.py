@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from .bus import bus
+from .models import UserRole
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "1024"))
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    id: int
+    email: str
+    role: UserRole
+    # Tokens carrying another version were revoked
+    token_version: int = 0
+
+
+class UserCache:
+    """Bounded LRU cache of authenticated users, keyed by user id.
+
+    Like MembershipCache, every invalidation bumps a generation counter and
+    a user loaded from the database is only stored if none happened while
+    it was loading, so a slow read cannot put back a revoked token version.
+    """
+
+    def __init__(self, max_size: int = USER_CACHE_MAX_SIZE, ttl: float = USER_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, CachedUser]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._listeners = []
+
+    def get(self, user_id: int) -> CachedUser | None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return user
+
+    def set(self, user, generation: int) -> CachedUser:
+        cached = CachedUser(id=user.id, email=user.email, role=user.role, token_version=user.token_version)
+        if self.max_size <= 0:
+            return cached
+
+        with self._lock:
+            if generation != self.generation:
+                return cached
+
+            self._entries[cached.id] = (time.monotonic() + self.ttl, cached)
+            self._entries.move_to_end(cached.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return cached
+
+    def on_invalidate(self, listener):
+        """Registers `listener(user_id)` for invalidations made here or in
+        another worker; None stands for every user.
+        """
+        self._listeners.append(listener)
+
+    def invalidate(self, user_id: int):
+        self._drop(user_id)
+        bus.publish("user_cache", user_id)
+
+    def _drop(self, user_id: int):
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(user_id, None)
+        for listener in self._listeners:
+            listener(user_id)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+        for listener in self._listeners:
+            listener(None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+user_cache = UserCache()
+bus.on("user_cache", user_cache._drop)
+bus.on_reset(user_cache.clear)
@@ -0,0 +1,147 @@
+"""Benchmark the API hot paths against a synthetic SQLite dataset.
+
+    python -m bench --instances-per-project 20 --save baseline.json
+    python -m bench --baseline baseline.json
+
+Requests go straight to the ASGI app in-process, so the numbers cover the
+application and the database, not a server or the network.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+from .dataset import DatasetSize
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__.split("\n")[0])
+    defaults = DatasetSize()
+    parser.add_argument("--clients", type=int, default=defaults.clients)
+    parser.add_argument("--projects-per-client", type=int, default=defaults.projects_per_client)
+    parser.add_argument("--instances-per-project", type=int, default=defaults.instances_per_project)
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--projects-per-user", type=int, default=defaults.projects_per_user)
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--scenarios", help="comma-separated subset to run")
+    parser.add_argument("--db-mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--database", help="SQLite file to create (default: a temporary file)")
+    parser.add_argument("--no-response-cache", action="store_true", help="measure list endpoints without the response cache")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results saved earlier")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed p95 growth against the baseline")
+    return parser.parse_args()
+
+
+def configure_environment(args, database: Path):
+    # app.database reads these at import time
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    os.environ["DB_MODE"] = args.db_mode
+    os.environ["HEALTHCHECK_ENABLED"] = "false"
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+    # The login scenario would otherwise measure 429s from one client address
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "off")
+    if args.no_response_cache:
+        os.environ["RESPONSE_CACHE_BACKEND"] = "off"
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args, size: DatasetSize) -> dict:
+    from app.main import app
+    from .dataset import create_schema, seed
+    from .runner import build_scenarios, install_query_counter, run_scenario
+
+    start = time.perf_counter()
+    create_schema()
+    dataset = seed(size, args.seed)
+    print(f"Seeded {len(dataset.project_ids)} projects in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    install_query_counter()
+    scenarios = await build_scenarios(app, dataset)
+    if args.scenarios:
+        wanted = {name.strip() for name in args.scenarios.split(",")}
+        scenarios = [scenario for scenario in scenarios if scenario.name in wanted]
+
+    results = {}
+    for scenario in scenarios:
+        results[scenario.name] = await run_scenario(app, scenario, args.requests, args.concurrency, args.warmup)
+        stats = results[scenario.name]
+        print(
+            f"{scenario.name:28} {stats['throughput_rps']:8.1f} req/s"
+            f"  p50 {stats['p50_ms']:7.2f}  p95 {stats['p95_ms']:7.2f}  p99 {stats['p99_ms']:7.2f} ms"
+            f"  {stats['queries_per_request']:5.1f} queries  {stats['errors']} errors"
+        )
+    return results
+
+
+def main():
+    args = parse_args()
+    size = DatasetSize(
+        clients=args.clients,
+        projects_per_client=args.projects_per_client,
+        instances_per_project=args.instances_per_project,
+        users=args.users,
+        projects_per_user=args.projects_per_user,
+    )
+
+    workdir = tempfile.TemporaryDirectory(prefix="bench-")
+    database = Path(args.database) if args.database else Path(workdir.name) / "bench.db"
+    if database.exists():
+        database.unlink()
+    configure_environment(args, database)
+
+    try:
+        scenarios = asyncio.run(run(args, size))
+    finally:
+        workdir.cleanup()
+
+    results = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "db_mode": args.db_mode,
+        "response_cache": not args.no_response_cache,
+        "dataset": asdict(size),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "scenarios": scenarios,
+    }
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        from .runner import compare
+
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline.get("dataset") != results["dataset"] or baseline.get("concurrency") != results["concurrency"]:
+            print("Warning: the baseline used a different dataset or concurrency", file=sys.stderr)
+        lines, regressed = compare(results, baseline, args.threshold)
+        print(f"\nAgainst {args.baseline} (revision {baseline.get('revision')}):")
+        print("\n".join(lines))
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from sqlalchemy import insert
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Migrations create_all cannot reproduce because app.models does not
+# describe them (the search index); they run on top of it
+NON_MODEL_REVISIONS = ("0005",)
+
+BENCH_PASSWORD = "bench-password"
+ADMIN_EMAIL = "admin@bench.local"
+
+
+@dataclass
+class DatasetSize:
+    clients: int = 20
+    projects_per_client: int = 5
+    instances_per_project: int = 10
+    users: int = 100
+    projects_per_user: int = 5
+
+
+@dataclass
+class Dataset:
+    admin_email: str
+    user_emails: list[str]
+    project_ids: list[int]
+    # Projects each standard user is assigned to, by email
+    assignments: dict[str, list[int]] = field(default_factory=dict)
+    instance_ids: list[int] = field(default_factory=list)
+
+
+def create_schema():
+    from alembic import command
+    from alembic.config import Config
+    from alembic.operations import Operations
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    from app.database import Base, engine
+    from app import models  # noqa: F401
+
+    Base.metadata.create_all(engine)
+
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    script = ScriptDirectory.from_config(config)
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            for revision in NON_MODEL_REVISIONS:
+                script.get_revision(revision).module.upgrade()
+    command.stamp(config, "head")
+
+
+def seed(size: DatasetSize, seed: int = 1) -> Dataset:
+    """Fill an empty database with a deterministic synthetic dataset.
+
+    Every project gets one active PRODUCTION instance; the rest alternate
+    between STAGING and DEVELOPMENT. All users share one password so the
+    bcrypt hash is computed once.
+    """
+    from app.auth import hash_password
+    from app.database import SessionLocal
+    from app.models import Client, OdooInstance, OdooInstanceType, Project, ProjectUser, User, UserRole
+
+    rng = random.Random(seed)
+    hashed = hash_password(BENCH_PASSWORD)
+    db = SessionLocal()
+    try:
+        db.execute(insert(Client.__table__), [
+            {"id": client_id, "name": f"Client {client_id:05d}"}
+            for client_id in range(1, size.clients + 1)
+        ])
+
+        project_ids = list(range(1, size.clients * size.projects_per_client + 1))
+        db.execute(insert(Project.__table__), [
+            {"id": project_id, "name": f"Project {project_id:06d}", "client_id": (project_id - 1) // size.projects_per_client + 1}
+            for project_id in project_ids
+        ])
+
+        instances = []
+        for project_id in project_ids:
+            for index in range(size.instances_per_project):
+                instance_type = (
+                    OdooInstanceType.PRODUCTION if index == 0
+                    else (OdooInstanceType.STAGING, OdooInstanceType.DEVELOPMENT)[index % 2]
+                )
+                instances.append({
+                    "id": len(instances) + 1,
+                    "name": f"p{project_id}-{instance_type.value.lower()}-{index}",
+                    "url": f"https://p{project_id}-{index}.bench.local",
+                    "instance_type": instance_type,
+                    "is_active": True,
+                    "project_id": project_id,
+                })
+        if instances:
+            db.execute(insert(OdooInstance.__table__), instances)
+
+        user_emails = [f"user{number:05d}@bench.local" for number in range(1, size.users + 1)]
+        db.execute(insert(User.__table__), [
+            {"email": ADMIN_EMAIL, "hashed_password": hashed, "role": UserRole.ADMIN},
+            *({"email": email, "hashed_password": hashed, "role": UserRole.STANDARD} for email in user_emails),
+        ])
+        user_ids = dict(db.query(User.email, User.id))
+
+        assignments = {
+            email: sorted(rng.sample(project_ids, min(size.projects_per_user, len(project_ids))))
+            for email in user_emails
+        }
+        rows = [
+            {"project_id": project_id, "user_id": user_ids[email]}
+            for email, assigned in assignments.items()
+            for project_id in assigned
+        ]
+        if rows:
+            db.execute(insert(ProjectUser.__table__), rows)
+
+        db.commit()
+    finally:
+        db.close()
+
+    return Dataset(
+        admin_email=ADMIN_EMAIL,
+        user_emails=user_emails,
+        project_ids=project_ids,
+        assignments=assignments,
+        instance_ids=[row["id"] for row in instances if row["instance_type"] != OdooInstanceType.PRODUCTION],
+    )
@@ -0,0 +1,171 @@
+import asyncio
+import contextvars
+import itertools
+import json
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable
+from urllib.parse import urlencode
+
+from .asgi import call
+from .dataset import BENCH_PASSWORD, Dataset
+
+# Queries issued while handling the current request; the list is shared by
+# every context copied from it (threadpool workers, async greenlets)
+_queries: contextvars.ContextVar[list | None] = contextvars.ContextVar("bench_queries", default=None)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def install_query_counter():
+    from sqlalchemy import event
+
+    from app.database import async_engine, engine
+
+    event.listen(engine, "before_cursor_execute", _count_query)
+    if async_engine is not None:
+        event.listen(async_engine.sync_engine, "before_cursor_execute", _count_query)
+
+
+@dataclass
+class Scenario:
+    name: str
+    # Builds (method, url, headers, body) for the i-th request
+    build: Callable[[int], tuple[str, str, dict, bytes]]
+
+
+def _form(data: dict) -> tuple[dict, bytes]:
+    return {"content-type": "application/x-www-form-urlencoded"}, urlencode(data).encode()
+
+
+def _json(data: dict) -> tuple[dict, bytes]:
+    return {"content-type": "application/json"}, json.dumps(data).encode()
+
+
+async def login(app, email: str) -> str:
+    headers, body = _form({"username": email, "password": BENCH_PASSWORD})
+    reply = await call(app, "POST", "/login", headers, body)
+    if reply.status != 200:
+        raise RuntimeError(f"login failed for {email}: {reply.status} {reply.body[:200]!r}")
+    return json.loads(reply.body)["access_token"]
+
+
+async def build_scenarios(app, dataset: Dataset) -> list[Scenario]:
+    admin = {"authorization": f"Bearer {await login(app, dataset.admin_email)}"}
+    member_email = dataset.user_emails[0]
+    member = {"authorization": f"Bearer {await login(app, member_email)}"}
+    member_projects = dataset.assignments[member_email]
+    instance_ids = dataset.instance_ids or [0]
+
+    def login_request(i):
+        headers, body = _form({"username": dataset.user_emails[i % len(dataset.user_emails)], "password": BENCH_PASSWORD})
+        return "POST", "/login", headers, body
+
+    def create_request(i):
+        headers, body = _json({
+            "name": f"bench-created-{i}",
+            "url": f"https://created-{i}.bench.local",
+            "instance_type": "DEVELOPMENT",
+            "is_active": True,
+            "project_id": dataset.project_ids[i % len(dataset.project_ids)],
+        })
+        return "POST", "/instances/", {**admin, **headers}, body
+
+    def update_request(i):
+        headers, body = _json({"name": f"bench-updated-{i}"})
+        return "PATCH", f"/instances/{instance_ids[i % len(instance_ids)]}", {**admin, **headers}, body
+
+    return [
+        Scenario("login", login_request),
+        Scenario("me", lambda i: ("GET", "/me", member, b"")),
+        Scenario("projects_admin", lambda i: ("GET", "/projects/", admin, b"")),
+        Scenario("projects_member", lambda i: ("GET", "/projects/", member, b"")),
+        Scenario("instances_admin", lambda i: ("GET", "/instances/", admin, b"")),
+        Scenario("instances_member_project", lambda i: (
+            "GET", f"/instances/?project_id={member_projects[i % len(member_projects)]}", member, b""
+        )),
+        Scenario("instance_create", create_request),
+        Scenario("instance_update", update_request),
+    ]
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest rank
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+async def run_scenario(app, scenario: Scenario, requests: int, concurrency: int, warmup: int) -> dict:
+    for i in range(warmup):
+        await call(app, *scenario.build(i))
+
+    counter = itertools.count(warmup)
+    latencies, queries, errors = [], [], 0
+    statuses = {}
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < warmup + requests:
+            request = scenario.build(i)
+            count = [0]
+            token = _queries.set(count)
+            start = time.perf_counter()
+            try:
+                reply = await call(app, *request)
+            finally:
+                _queries.reset(token)
+            latencies.append(time.perf_counter() - start)
+            queries.append(count[0])
+            statuses[reply.status] = statuses.get(reply.status, 0) + 1
+            if reply.status >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+        "queries_per_request": sum(queries) / len(queries) if queries else 0.0,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> tuple[list[str], bool]:
+    """Lines describing each scenario against the baseline, and whether any regressed.
+
+    A scenario regresses when its p95 latency grew by more than `threshold`
+    (a fraction) or it issues more queries per request.
+    """
+    lines, regressed = [], False
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            lines.append(f"{name:28} new")
+            continue
+
+        change = (current["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] if previous["p95_ms"] else 0.0
+        more_queries = current["queries_per_request"] > previous["queries_per_request"] + 0.01
+        flag = ""
+        if change > threshold or more_queries:
+            regressed = True
+            flag = "  REGRESSION"
+        lines.append(
+            f"{name:28} p95 {previous['p95_ms']:8.2f} -> {current['p95_ms']:8.2f} ms ({change:+.0%})"
+            f"  queries {previous['queries_per_request']:.1f} -> {current['queries_per_request']:.1f}{flag}"
+        )
+    return lines, regressed
@@ -0,0 +1,34 @@
+"""Multi-worker deployment: gunicorn managing uvicorn workers.
+
+    BUS_BACKEND=socket gunicorn app.main:app -c gunicorn.conf.py
+
+Every worker is a separate process with its own caches, so set BUS_BACKEND
+(and RATE_LIMIT_BACKEND=redis) as described in the README.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count() * 2, 8))))
+
+# Import the app in each worker, after the fork: database engines, the bus
+# receiver and the password hashing pool must not be shared across processes
+preload_app = False
+
+# Seconds a worker may stop answering gunicorn's heartbeat before it is restarted
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then, staggered so they do not restart together
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+
+# Behind a reverse proxy on this host: trust its X-Forwarded-* headers so
+# per-address login limits see the real client
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+# The uvicorn workers write these lines; ?token= is masked in them (see
+# app/routers/events.py)
+accesslog = "-"
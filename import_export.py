@@ -0,0 +1,57 @@
+import argparse
+import json
+import sys
+import time
+
+from app.database import SessionLocal
+from app.data_transfer import IMPORT_CHUNK_SIZE, export_lines, import_lines
+
+
+def run_import(args):
+    db = SessionLocal()
+    start = time.perf_counter()
+    try:
+        with open(args.file, encoding="utf-8-sig", newline="") as source:
+            summary = import_lines(db, source, args.format, args.chunk_size)
+    finally:
+        db.close()
+
+    print(json.dumps(summary.as_dict(), indent=2))
+    print(f"⏱️ Imported in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return 1 if summary.failed else 0
+
+
+def run_export(args):
+    db = SessionLocal()
+    try:
+        target = open(args.file, "w", encoding="utf-8", newline="") if args.file != "-" else sys.stdout
+        try:
+            for text in export_lines(db, args.format):
+                target.write(text)
+        finally:
+            if target is not sys.stdout:
+                target.close()
+    finally:
+        db.close()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export of clients, projects, instances and assignments")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    import_parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+
+    export_parser = commands.add_parser("export")
+    export_parser.add_argument("file", nargs="?", default="-")
+    export_parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+
+    args = parser.parse_args()
+    return run_import(args) if args.command == "import" else run_export(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import axios from "axios";
+import type { AxiosError, InternalAxiosRequestConfig } from "axios";
 
 const api = axios.create({
   baseURL: import.meta.env.VITE_API_URL || "http://localhost:8000",
@@ -12,4 +13,52 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+export const storeTokens = (data: { access_token: string; refresh_token?: string }) => {
+  localStorage.setItem("token", data.access_token);
+  if (data.refresh_token) {
+    localStorage.setItem("refreshToken", data.refresh_token);
+  }
+};
+
+export const clearTokens = () => {
+  localStorage.removeItem("token");
+  localStorage.removeItem("refreshToken");
+};
+
+// Refresh tokens work once, so concurrent 401s share a single refresh
+let refreshing: Promise<boolean> | null = null;
+
+const refreshTokens = async () => {
+  const refreshToken = localStorage.getItem("refreshToken");
+  if (!refreshToken) return false;
+
+  try {
+    const response = await axios.post(`${api.defaults.baseURL}/token/refresh`, {
+      refresh_token: refreshToken,
+    });
+    storeTokens(response.data);
+    return true;
+  } catch {
+    clearTokens();
+    return false;
+  }
+};
+
+api.interceptors.response.use(undefined, async (error: AxiosError) => {
+  const config = error.config as (InternalAxiosRequestConfig & { _retried?: boolean }) | undefined;
+  if (error.response?.status !== 401 || !config || config._retried || config.url === "/login") {
+    return Promise.reject(error);
+  }
+
+  refreshing ??= refreshTokens().finally(() => {
+    refreshing = null;
+  });
+  if (!(await refreshing)) {
+    return Promise.reject(error);
+  }
+
+  config._retried = true;
+  return api(config);
+});
+
 export default api;
@@ -1,6 +1,6 @@
 import { useState, useEffect } from "react";
 import type { ReactNode } from "react";
-import api from "../api/axios";
+import api, { clearTokens, storeTokens } from "../api/axios";
 import type { User } from "../types/user";
 import { AuthContext } from "./AuthContext.ts";
 
@@ -19,7 +19,7 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
       const response = await api.get("/me");
       setUser(response.data);
     } catch (error) {
-      localStorage.removeItem("token");
+      clearTokens();
       console.error(error);
       setUser(null);
     } finally {
@@ -44,7 +44,7 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
       },
     });
 
-    localStorage.setItem("token", response.data.access_token);
+    storeTokens(response.data);
 
     // 3. Make sure this endpoint matches your main.py!
     // In your main.py it was just "/me", not "/users/me"
@@ -53,7 +53,11 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
   };
 
   const logout = () => {
-    localStorage.removeItem("token");
+    const refreshToken = localStorage.getItem("refreshToken");
+    if (refreshToken) {
+      api.post("/logout", { refresh_token: refreshToken }).catch(() => {});
+    }
+    clearTokens();
     setUser(null);
   };
 
@@ -3,6 +3,7 @@ import axios from "axios";
 import api from "../api/axios";
 import type { Instance, OdooInstanceType } from "../types/instance";
 import type { Project } from "../types/project";
+import type { DashboardData } from "../types/dashboard";
 import { AppLayout } from "../components/AppLayout";
 import ErrorDialog from "../components/ErrorDialog";
 import {
@@ -86,29 +87,16 @@ export default function AdminInstances() {
     setLoading(true);
     setError("");
     try {
-      const projRes = await api.get("/projects");
-      const projectsData: Project[] = projRes.data;
-      setProjects(projectsData);
-
-      const instancePromises = projectsData.map((p: Project) =>
-        api.get(`/instances?project_id=${p.id}`)
-      );
-
-      const instanceResults = await Promise.allSettled(instancePromises);
+      const res = await api.get("/dashboard");
+      const { projects: projectsData }: DashboardData = res.data;
 
       const instancesMap: Record<string, Instance[]> = {};
-      projectsData.forEach((p: Project, index: number) => {
-        const result = instanceResults[index];
-        if (result.status === "fulfilled") {
-          instancesMap[p.id] = result.value.data;
-        } else {
-          console.error(
-            `Failed to load instances for project ${p.name}`,
-            result.reason
-          );
-          instancesMap[p.id] = [];
-        }
-      });
+      setProjects(
+        projectsData.map(({ instances, ...project }) => {
+          instancesMap[project.id] = instances;
+          return project;
+        })
+      );
       setInstancesByProject(instancesMap);
     } catch {
       setError("Failed to load data");
@@ -2,7 +2,7 @@ import { useEffect, useState } from "react";
 import { Link } from "react-router-dom";
 import api from "../api/axios";
 import type { Project } from "../types/project";
-import type { Client } from "../types/client";
+import type { DashboardData } from "../types/dashboard";
 import type { Instance } from "../types/instance";
 import { useAuth } from "../context/useAuth";
 import { AppLayout } from "../components/AppLayout";
@@ -40,23 +40,13 @@ export default function Dashboard() {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const projectsRes = await api.get("/projects");
-        const projects: Project[] = projectsRes.data;
+        const res = await api.get("/dashboard");
+        const { clients, projects }: DashboardData = res.data;
 
-        let clients: Client[] = [];
-        if (user?.role === "ADMIN") {
-          const clientsRes = await api.get("/clients");
-          clients = clientsRes.data;
-        }
         const clientMap = new Map<number, string>();
         clients.forEach((c) => clientMap.set(c.id, c.name));
 
-        const instanceResults = await Promise.all(
-          projects.map((p) => api.get(`/instances?project_id=${p.id}`))
-        );
-
-        const built: ProjectRow[] = projects.map((project, idx) => {
-          const instances: Instance[] = instanceResults[idx].data;
+        const built: ProjectRow[] = projects.map(({ instances, ...project }) => {
           const counts = { PRODUCTION: 0, STAGING: 0, DEVELOPMENT: 0 };
           instances.forEach((inst) => {
             if (inst.instance_type in counts) {
@@ -1,8 +1,9 @@
 import axios from "axios";
 import { useParams } from "react-router-dom";
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import api from "../api/axios";
 import type { Instance, OdooInstanceType } from "../types/instance";
+import type { InstanceDeletedData, InstanceEventData } from "../types/event";
 import { AppLayout } from "../components/AppLayout";
 import ErrorDialog from "../components/ErrorDialog";
 import {
@@ -123,6 +124,57 @@ export default function ProjectDetails() {
     };
   }, [id]);
 
+  // While the change feed is connected, mutations show up through it and
+  // the list does not need to be downloaded again
+  const streamOpen = useRef(false);
+
+  useEffect(() => {
+    const token = localStorage.getItem("token");
+    if (!id || !token) return;
+
+    const projectId = Number(id);
+    const source = new EventSource(
+      `${api.defaults.baseURL}/events?token=${encodeURIComponent(token)}`
+    );
+
+    const upsert = (event: MessageEvent) => {
+      const data: InstanceEventData = JSON.parse(event.data);
+      if (data.project_id !== projectId) return;
+      setInstances((current) =>
+        current.some((i) => i.id === data.id)
+          ? current.map((i) => (i.id === data.id ? data : i))
+          : [...current, data]
+      );
+    };
+
+    const remove = (event: MessageEvent) => {
+      const data: InstanceDeletedData = JSON.parse(event.data);
+      if (data.project_id !== projectId) return;
+      setInstances((current) => current.filter((i) => i.id !== data.id));
+    };
+
+    source.onopen = () => {
+      streamOpen.current = true;
+    };
+    source.onerror = () => {
+      streamOpen.current = false;
+    };
+    source.addEventListener("instance.created", upsert);
+    source.addEventListener("instance.updated", upsert);
+    source.addEventListener("instance.deleted", remove);
+    // Changes were missed while disconnected and cannot be replayed
+    source.addEventListener("stream.reset", () => refreshData());
+
+    return () => {
+      streamOpen.current = false;
+      source.close();
+    };
+  }, [id]);
+
+  const refreshIfOffline = () => {
+    if (!streamOpen.current) refreshData();
+  };
+
   const handleCreate = async () => {
     setLoading(true);
     setError("");
@@ -141,7 +193,7 @@ export default function ProjectDetails() {
       setInstanceType("STAGING");
       setIsActive(true);
       setCreateOpen(false);
-      refreshData();
+      refreshIfOffline();
     } catch (err) {
       if (axios.isAxiosError(err)) {
         const detail = err.response?.data?.detail;
@@ -187,7 +239,7 @@ export default function ProjectDetails() {
       setSuccess("Instance updated successfully!");
       setEditOpen(false);
       setEditingId(null);
-      refreshData();
+      refreshIfOffline();
     } catch (err) {
       if (axios.isAxiosError(err)) {
         const detail = err.response?.data?.detail;
@@ -222,7 +274,7 @@ export default function ProjectDetails() {
     try {
       await api.delete(`/instances/${instanceId}`);
       setSuccess("Instance deleted successfully!");
-      refreshData();
+      refreshIfOffline();
     } catch (err) {
       if (axios.isAxiosError(err)) {
         setError(err.response?.data?.detail || "Failed to delete instance");
@@ -244,7 +296,7 @@ export default function ProjectDetails() {
       setSuccess(
         `Instance ${!instance.is_active ? "activated" : "deactivated"} successfully!`
       );
-      refreshData();
+      refreshIfOffline();
     } catch (err) {
       if (axios.isAxiosError(err)) {
         const detail = err.response?.data?.detail;
@@ -0,0 +1,12 @@
+import type { Client } from "./client";
+import type { Instance } from "./instance";
+import type { Project } from "./project";
+
+export interface DashboardProject extends Project {
+  instances: Instance[];
+}
+
+export interface DashboardData {
+  clients: Client[];
+  projects: DashboardProject[];
+}
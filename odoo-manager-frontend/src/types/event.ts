@@ -0,0 +1,13 @@
+import type { Instance } from "./instance";
+
+export type InstanceEventData = Instance & { project_id: number };
+
+export interface InstanceDeletedData {
+  id: number;
+  project_id: number;
+}
+
+export interface AssignmentEventData {
+  project_id: number;
+  user_id: number;
+}
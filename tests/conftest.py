@@ -0,0 +1,167 @@
+import importlib.util
+import os
+import tempfile
+from pathlib import Path
+
+# The app reads its settings at import time
+_db_dir = tempfile.mkdtemp(prefix="cim-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+# Creates the async engine too; each test picks its routers below
+os.environ["DB_MODE"] = "async"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ["PASSWORD_HASH_ROUNDS"] = "4"
+os.environ["HEALTHCHECK_ENABLED"] = "false"
+os.environ["RATE_LIMIT_BACKEND"] = "memory"
+os.environ["BUS_BACKEND"] = "off"
+os.environ["METRICS_ENABLED"] = "false"
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import main, models
+from app.auth import create_user_token, hash_password
+from app.database import Base, SessionLocal, async_engine, engine
+from app.membership_cache import membership_cache
+from app.query_stats import QueryStatsMiddleware
+from app.rate_limit import rate_limit_store
+from app.response_cache import response_cache
+from app.routers import auth, clients, dashboard, instances, projects, search, users
+from app.routers.aio import (
+    clients as aio_clients,
+    instances as aio_instances,
+    projects as aio_projects,
+    users as aio_users,
+)
+from app.user_cache import user_cache
+
+ROUTERS = {
+    "sync": (projects, clients, instances, users),
+    "async": (aio_projects, aio_clients, aio_instances, aio_users),
+}
+
+_PASSWORD_HASH = hash_password("secret")
+
+
+def build_app(mode: str) -> FastAPI:
+    """The resource routers app.main serves under DB_MODE=`mode`."""
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+    app.include_router(auth.router)
+    for module in ROUTERS[mode]:
+        app.include_router(module.router)
+    # Served from sync sessions in both modes
+    app.include_router(dashboard.router)
+    app.include_router(search.router)
+    app.add_api_route("/db/queries", main.read_query_stats)
+    return app
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    user_cache.clear()
+    membership_cache.clear()
+    response_cache.clear()
+    if rate_limit_store is not None:
+        rate_limit_store.clear()
+    yield
+
+
+def _run_migration(name: str, step: str):
+    path = Path(__file__).parent.parent / "alembic" / "versions" / f"{name}.py"
+    spec = importlib.util.spec_from_file_location(name, path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with engine.begin() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            getattr(migration, step)()
+
+
+@pytest.fixture
+def search_index():
+    """The FTS table and triggers of migration 0005, which create_all leaves out."""
+    _run_migration("0005_search_index", "upgrade")
+    yield
+    _run_migration("0005_search_index", "downgrade")
+
+
+@pytest.fixture(params=["sync", "async"])
+def db_mode(request):
+    return request.param
+
+
+@pytest.fixture
+def client(db_mode):
+    with TestClient(build_app(db_mode)) as client:
+        yield client
+        # aiosqlite connections belong to the portal's event loop
+        client.portal.call(async_engine.dispose)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def make_user(db, email: str, role=models.UserRole.STANDARD) -> models.User:
+    """Adds a user whose password is "secret"."""
+    user = models.User(email=email, hashed_password=_PASSWORD_HASH, role=role)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def auth_headers(user) -> dict:
+    return {"Authorization": f"Bearer {create_user_token(user)}"}
+
+
+@pytest.fixture
+def admin(db):
+    return make_user(db, "admin@example.com", models.UserRole.ADMIN)
+
+
+@pytest.fixture
+def member(db):
+    return make_user(db, "member@example.com")
+
+
+@pytest.fixture
+def admin_headers(admin):
+    return auth_headers(admin)
+
+
+@pytest.fixture
+def member_headers(member):
+    return auth_headers(member)
+
+
+def make_project(db, name: str = "Project", members=()) -> models.Project:
+    """Adds a project under a new client, assigned to `members`."""
+    project = models.Project(name=name, client=models.Client(name=f"{name} client"))
+    project.users.extend(members)
+    db.add(project)
+    db.commit()
+    return project
+
+
+def make_instance(db, project, name: str = "Instance", instance_type=models.OdooInstanceType.STAGING):
+    instance = models.OdooInstance(
+        name=name,
+        url=f"https://{name.lower().replace(' ', '-')}.example.com",
+        instance_type=instance_type,
+        is_active=True,
+        project_id=project.id,
+    )
+    db.add(instance)
+    db.commit()
+    return instance
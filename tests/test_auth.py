@@ -0,0 +1,127 @@
+import time
+
+import pytest
+from jose import JWTError, jwt
+
+from app import models
+from app.auth import ALGORITHM, SECRET_KEY, create_access_token, token_verifier
+
+from .conftest import auth_headers, make_user
+
+
+def _token(claims):
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def test_verifier_requires_exp():
+    with pytest.raises(JWTError, match="exp"):
+        token_verifier.decode(_token({"sub": "1"}))
+
+
+def test_verifier_refuses_expired_tokens():
+    with pytest.raises(JWTError, match="expired"):
+        token_verifier.decode(_token({"sub": "1", "exp": int(time.time()) - 10}))
+
+
+def test_verifier_accepts_its_own_tokens():
+    claims = token_verifier.decode(create_access_token({"sub": "1", "ver": 2}))
+
+    assert claims["sub"] == "1" and claims["ver"] == 2
+
+
+def test_token_without_exp_is_unauthorized(client, admin):
+    headers = {"Authorization": f"Bearer {_token({'sub': str(admin.id), 'role': 'ADMIN', 'ver': 0})}"}
+
+    assert client.get("/clients/", headers=headers).status_code == 401
+
+
+def test_admin_check_uses_the_role_claim(client, admin):
+    standard_claim = create_access_token({"sub": str(admin.id), "role": "STANDARD", "ver": admin.token_version})
+
+    response = client.get("/clients/", headers={"Authorization": f"Bearer {standard_claim}"})
+
+    assert response.status_code == 403
+
+
+def test_demotion_revokes_the_admin_token(client, db, admin_headers):
+    second = make_user(db, "second@example.com", models.UserRole.ADMIN)
+    headers = auth_headers(second)
+    assert client.get("/clients/", headers=headers).status_code == 200
+
+    assert client.patch(f"/users/{second.id}", json={"role": "STANDARD"}, headers=admin_headers).status_code == 200
+
+    assert client.get("/clients/", headers=headers).status_code == 401
+
+
+def _login(client, user):
+    response = client.post("/login", data={"username": user.email, "password": "secret"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _refresh(client, refresh_token):
+    return client.post("/token/refresh", json={"refresh_token": refresh_token})
+
+
+def test_refresh_rotates_the_token(client, member):
+    tokens = _login(client, member)
+
+    rotated = _refresh(client, tokens["refresh_token"])
+    assert rotated.status_code == 200
+    new_tokens = rotated.json()
+    assert new_tokens["refresh_token"] != tokens["refresh_token"]
+
+    headers = {"Authorization": f"Bearer {new_tokens['access_token']}"}
+    assert client.get("/projects/", headers=headers).status_code == 200
+    assert _refresh(client, new_tokens["refresh_token"]).status_code == 200
+
+
+def test_reused_refresh_token_ends_the_session(client, member):
+    stolen = _login(client, member)["refresh_token"]
+    current = _refresh(client, stolen).json()["refresh_token"]
+
+    # Whoever presents the old token second, the session is over for both
+    assert _refresh(client, stolen).status_code == 401
+    assert _refresh(client, current).status_code == 401
+
+
+def test_reuse_leaves_other_sessions_alone(client, member):
+    stolen = _login(client, member)["refresh_token"]
+    other = _login(client, member)["refresh_token"]
+    _refresh(client, stolen)
+
+    assert _refresh(client, stolen).status_code == 401
+    assert _refresh(client, other).status_code == 200
+
+
+def test_unknown_refresh_token_is_refused(client, member):
+    token = _login(client, member)["refresh_token"]
+    family = token.split(".")[0]
+
+    assert _refresh(client, "not-a-token").status_code == 401
+    assert _refresh(client, "guess.123").status_code == 401
+    assert _refresh(client, f"{family}x.123").status_code == 401
+
+    # Ending a session takes a token that carries its key
+    assert _refresh(client, token).status_code == 200
+
+
+def test_logout_ends_the_session(client, member):
+    tokens = _login(client, member)
+
+    assert client.post("/logout", json={"refresh_token": tokens["refresh_token"]}).status_code == 200
+
+    assert _refresh(client, tokens["refresh_token"]).status_code == 401
+
+
+def test_admin_signs_a_user_out_everywhere(client, member, admin_headers):
+    first, second = _login(client, member), _login(client, member)
+
+    response = client.delete(f"/users/{member.id}/sessions", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json() == {"revoked_sessions": 2}
+
+    assert _refresh(client, first["refresh_token"]).status_code == 401
+    assert _refresh(client, second["refresh_token"]).status_code == 401
+    headers = {"Authorization": f"Bearer {first['access_token']}"}
+    assert client.get("/projects/", headers=headers).status_code == 401
@@ -0,0 +1,185 @@
+import json
+import queue
+import sys
+import time
+import types
+
+import pytest
+
+from app.bus import InvalidationBus, RedisBackend, SocketBackend, bus
+from app.change_versions import change_versions
+from app.membership_cache import membership_cache
+from app.user_cache import user_cache
+
+
+class FakePubSub:
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+
+    def subscribe(self, channel):
+        if self.server.down:
+            raise ConnectionError("server down")
+
+    def get_message(self, timeout):
+        if self.closed or self.server.down:
+            raise ConnectionError("connection lost")
+        try:
+            return {"data": self.server.messages.get(timeout=min(timeout, 0.05))}
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.closed = True
+
+
+class FakeRedis:
+    """Just enough of a redis client for RedisBackend."""
+
+    def __init__(self):
+        self.messages = queue.Queue()
+        self.down = False
+
+    def pubsub(self, ignore_subscribe_messages):
+        return FakePubSub(self)
+
+    def publish(self, channel, raw):
+        self.messages.put(raw)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    server = FakeRedis()
+    module = types.ModuleType("redis")
+    module.Redis = types.SimpleNamespace(from_url=lambda url: server)
+    monkeypatch.setitem(sys.modules, "redis", module)
+    return server
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+def _message(channel, payload):
+    return json.dumps({"o": "another-worker", "c": channel, "p": payload}).encode()
+
+
+def test_redis_bus_reconnects_and_resets(fake_redis):
+    received, resets = [], []
+    redis_bus = InvalidationBus(RedisBackend(retry_max=0.05))
+    redis_bus.on("user_cache", received.append)
+    redis_bus.on_reset(lambda: resets.append(fake_redis.down))
+    redis_bus.start()
+    try:
+        fake_redis.publish("cim:bus", _message("user_cache", 1))
+        _wait_for(lambda: received == [1])
+
+        fake_redis.down = True
+        # Once when the connection drops
+        _wait_for(lambda: resets == [True])
+        time.sleep(0.2)
+        assert resets == [True]
+        assert redis_bus.stats()["running"]
+
+        fake_redis.down = False
+        # And once more when subscribed again
+        _wait_for(lambda: resets == [True, False])
+
+        fake_redis.publish("cim:bus", _message("user_cache", 2))
+        _wait_for(lambda: received == [1, 2])
+        assert redis_bus.stats()["resets"] == 2
+    finally:
+        redis_bus.stop()
+
+    assert not redis_bus.stats()["running"]
+
+
+def test_stats_report_a_dead_receiver():
+    class BrokenBackend:
+        name = "broken"
+
+        def open(self):
+            pass
+
+        def receive(self):
+            raise RuntimeError("boom")
+            yield
+
+        def close(self):
+            pass
+
+    broken_bus = InvalidationBus(BrokenBackend())
+    broken_bus.start()
+    broken_bus._thread.join(timeout=2)
+
+    assert not broken_bus.stats()["running"]
+
+
+def test_reset_clears_user_and_membership_caches():
+    user = types.SimpleNamespace(id=1, email="a@example.com", role="ADMIN", token_version=0)
+    user_cache.set(user, user_cache.generation)
+    membership_cache.set(1, {7}, membership_cache.generation)
+    assert user_cache.stats()["size"] == 1
+    assert membership_cache.stats()["size"] == 1
+    boot = change_versions.boot
+
+    bus._reset()
+
+    assert user_cache.stats()["size"] == 0
+    assert membership_cache.stats()["size"] == 0
+    # ETags handed out before no longer match
+    assert change_versions.boot != boot
+
+
+class FlakyBackend:
+    """Records what is sent; the first `drops` sends miss a receiver."""
+
+    name = "flaky"
+
+    def __init__(self, drops):
+        self.drops = drops
+        self.channels = []
+
+    def send(self, raw):
+        self.channels.append(json.loads(raw)["c"])
+        self.drops -= 1
+        return self.drops < 0
+
+
+def test_socket_backend_reports_a_full_receiver(tmp_path):
+    receiver = SocketBackend(str(tmp_path))
+    receiver.open()
+    sender = SocketBackend(str(tmp_path))
+    try:
+        # Nobody reads, so the receiver's buffer fills up
+        results = [sender.send(b"x" * 1024) for _ in range(10000)]
+    finally:
+        receiver.close()
+
+    assert results[0] and not results[-1]
+
+
+def test_dropped_message_resets_the_other_workers():
+    flaky_bus = InvalidationBus(FlakyBackend(drops=2), reset_retry=0.01)
+
+    flaky_bus.publish("user_cache", 1)
+
+    # The reset is retried until it gets through
+    _wait_for(lambda: flaky_bus.backend.channels == ["user_cache", "bus.reset", "bus.reset"])
+    time.sleep(0.05)
+    assert flaky_bus.backend.channels == ["user_cache", "bus.reset", "bus.reset"]
+    assert flaky_bus.stats()["dropped"] == 2
+
+
+def test_reset_message_runs_the_reset_handlers():
+    resets = []
+    receiving_bus = InvalidationBus(None)
+    receiving_bus.on_reset(lambda: resets.append(True))
+
+    receiving_bus._deliver(_message("bus.reset", None))
+
+    assert resets == [True]
@@ -0,0 +1,106 @@
+import io
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import models
+from app.data_transfer import RecordError, export_lines, read_records
+from app.events import INSTANCE_CREATED, USER_ASSIGNED, broker
+from app.routers import data
+
+CSV = (
+    "type,ref,name,client\r\n"
+    'client,c1,"Acme, Inc.",\r\n'
+    "\r\n"
+    'project,p1,"Line one\r\nline two",c1\r\n'
+    "client,c2,Globex,\r\n"
+)
+
+
+def test_csv_fields_may_span_lines():
+    records = list(read_records(io.StringIO(CSV, newline=""), "csv"))
+
+    assert records == [
+        (2, {"type": "client", "ref": "c1", "name": "Acme, Inc.", "client": ""}),
+        (4, {"type": "project", "ref": "p1", "name": "Line one\r\nline two", "client": "c1"}),
+        (6, {"type": "client", "ref": "c2", "name": "Globex", "client": ""}),
+    ]
+
+
+def test_ndjson_errors_carry_their_line():
+    lines = ['{"type": "client", "name": "Acme"}\n', "\n", "[1]\n", "{oops\n"]
+
+    records = list(read_records(lines, "ndjson"))
+
+    assert records[0] == (1, {"type": "client", "name": "Acme"})
+    assert [number for number, _ in records[1:]] == [3, 4]
+    assert all(isinstance(record, RecordError) for _, record in records[1:])
+
+
+@pytest.fixture
+def data_client():
+    app = FastAPI()
+    app.include_router(data.router)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_csv_import_and_export_round_trip(data_client, db, admin_headers):
+    response = data_client.post(
+        "/data/import", params={"format": "csv"}, content=CSV.encode(), headers=admin_headers
+    )
+    assert response.status_code == 200, response.text
+    summary = response.json()
+    assert summary["failed"] == 0, summary["errors"]
+    assert summary["created"]["client"] == 2 and summary["created"]["project"] == 1
+
+    project = db.query(models.Project).one()
+    assert project.name == "Line one\r\nline two"
+    assert project.client.name == "Acme, Inc."
+
+    exported = "".join(export_lines(db, "csv"))
+    names = [record["name"] for _, record in read_records(io.StringIO(exported, newline=""), "csv")]
+    assert names == ["Acme, Inc.", "Globex", "Line one\r\nline two"]
+
+
+def test_import_reads_a_body_sent_in_pieces(data_client, db, admin_headers):
+    body = "".join(f'{{"type": "client", "name": "Client {i}"}}\n' for i in range(200)).encode()
+
+    def pieces():
+        for start in range(0, len(body), 97):
+            yield body[start:start + 97]
+
+    response = data_client.post("/data/import", params={"chunk_size": 50}, content=pieces(), headers=admin_headers)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["created"]["client"] == 200
+    assert db.query(models.Client).count() == 200
+
+
+def test_import_publishes_change_events(data_client, db, member, admin_headers):
+    records = [
+        {"type": "client", "ref": "c1", "name": "Acme"},
+        {"type": "project", "ref": "p1", "name": "ERP", "client": "c1"},
+        {"type": "instance", "name": "Prod", "url": "https://prod.example.com",
+         "instance_type": "production", "is_active": True, "project": "p1"},
+        {"type": "assignment", "project": "p1", "user": member.email},
+    ]
+    published = broker.published
+
+    response = data_client.post(
+        "/data/import", content="".join(json.dumps(record) + "\n" for record in records), headers=admin_headers
+    )
+    assert response.status_code == 200, response.text
+
+    instance = db.query(models.OdooInstance).one()
+    created, assigned = list(broker._history)[published - broker.published:]
+    assert (created.type, created.project_id) == (INSTANCE_CREATED, instance.project_id)
+    assert created.data == {
+        "id": instance.id, "name": "Prod", "url": "https://prod.example.com",
+        "instance_type": "PRODUCTION", "is_active": True, "project_id": instance.project_id,
+    }
+    assert (assigned.type, assigned.data) == (
+        USER_ASSIGNED, {"project_id": instance.project_id, "user_id": member.id}
+    )
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from collections import deque
+
+from app.events import USER_REMOVED, broker
+from app.membership_cache import membership_cache
+from app.models import UserRole
+from app.routers import events  # noqa: F401  installs the access log filter
+from app.user_cache import user_cache
+
+from .conftest import auth_headers, make_user
+
+
+async def _subscribe_and(action):
+    first = broker.subscribe(1, UserRole.STANDARD, {10})
+    second = broker.subscribe(2, UserRole.ADMIN, ())
+    try:
+        action()
+        # Let the handed-over callbacks run
+        await asyncio.sleep(0)
+        return [
+            subscriber.queue.get_nowait() if not subscriber.queue.empty() else "open"
+            for subscriber in (first, second)
+        ]
+    finally:
+        broker.unsubscribe(first)
+        broker.unsubscribe(second)
+
+
+def test_user_invalidation_closes_that_users_streams():
+    assert asyncio.run(_subscribe_and(lambda: user_cache.invalidate(1))) == [None, "open"]
+
+
+def test_invalidation_from_another_worker_closes_streams():
+    # What the bus calls for a message from another worker
+    assert asyncio.run(_subscribe_and(lambda: user_cache._drop(2))) == ["open", None]
+
+
+def test_membership_invalidation_closes_that_users_streams():
+    assert asyncio.run(_subscribe_and(lambda: membership_cache.invalidate(1))) == [None, "open"]
+
+
+def test_clearing_memberships_closes_every_stream():
+    assert asyncio.run(_subscribe_and(membership_cache.clear)) == [None, None]
+
+
+def test_events_still_flow_without_invalidations():
+    def publish():
+        broker.publish([(USER_REMOVED, 10, {"project_id": 10, "user_id": 1})])
+
+    first, second = asyncio.run(_subscribe_and(publish))
+
+    assert first.type == USER_REMOVED and second.type == USER_REMOVED
+
+
+def test_demotion_ends_the_stream_and_revokes_reconnects(client, db, admin_headers):
+    other = make_user(db, "other@example.com", UserRole.ADMIN)
+    headers = auth_headers(other)
+
+    async def demote():
+        # What GET /events subscribes for this user
+        subscriber = broker.subscribe(other.id, UserRole.ADMIN, ())
+        try:
+            await asyncio.to_thread(
+                client.patch, f"/users/{other.id}", json={"role": "STANDARD"}, headers=admin_headers
+            )
+            return await asyncio.wait_for(subscriber.queue.get(), 2)
+        finally:
+            broker.unsubscribe(subscriber)
+
+    # None ends the stream
+    assert asyncio.run(demote()) is None
+    # and the reconnect authenticates again with the revoked token
+    assert client.get("/projects/", headers=headers).status_code == 401
+
+
+def test_access_log_hides_stream_tokens(caplog):
+    access = logging.getLogger("uvicorn.access")
+    with caplog.at_level(logging.INFO, logger="uvicorn.access"):
+        # As uvicorn logs a request
+        access.info('%s - "%s %s HTTP/%s" %d', "127.0.0.1:5000", "GET", "/events/?token=eyJ.e30.sig&x=1", "1.1", 200)
+
+    assert caplog.messages == ['127.0.0.1:5000 - "GET /events/?token=***&x=1 HTTP/1.1" 200']
+
+
+def _resume(last_event_id, history=3):
+    async def run():
+        broker.publish([(USER_REMOVED, 10, {"project_id": 10, "user_id": 2})] * history)
+        subscriber = broker.subscribe(1, UserRole.ADMIN, (), last_event_id(broker))
+        try:
+            replayed = []
+            while not subscriber.queue.empty():
+                replayed.append(subscriber.queue.get_nowait())
+            return subscriber.missed, replayed
+        finally:
+            broker.unsubscribe(subscriber)
+
+    return asyncio.run(run())
+
+
+def test_reconnect_replays_events_after_last_event_id():
+    missed, replayed = _resume(lambda broker: f"{broker.boot}-{broker._history[-2].id}")
+
+    assert not missed
+    assert [change.id for change in replayed] == [broker._history[-1].id]
+    assert replayed[0].encode().startswith(f"id: {broker.boot}-{replayed[0].id}\n")
+
+
+def test_last_event_id_from_another_worker_is_not_replayed():
+    missed, replayed = _resume(lambda broker: f"0other0-{broker._history[-1].id - 2}")
+
+    assert missed and replayed == []
+
+
+def test_last_event_id_older_than_the_history_is_not_replayed(monkeypatch):
+    monkeypatch.setattr(broker, "_history", deque(maxlen=2))
+
+    missed, replayed = _resume(lambda broker: f"{broker.boot}-{broker._history[0].id - 2}")
+
+    assert missed and replayed == []
@@ -0,0 +1,149 @@
+import asyncio
+import functools
+import socket
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app import health
+from app.health import HealthChecker, probe_all
+from app.models import InstanceHealth
+
+from .conftest import make_instance, make_project
+
+TIMEOUT = 0.5
+
+
+async def _ok(request):
+    return web.Response(text="ok")
+
+
+async def _error(request):
+    return web.Response(status=500)
+
+
+async def _slow(request):
+    await asyncio.sleep(TIMEOUT * 4)
+    return web.Response(text="late")
+
+
+async def _busy(request):
+    await asyncio.sleep(0.3)
+    return web.Response(text="ok")
+
+
+def _stub_app():
+    app = web.Application()
+    app.router.add_get("/ok", _ok)
+    app.router.add_get("/error", _error)
+    app.router.add_get("/slow", _slow)
+    app.router.add_get("/busy", _busy)
+    return app
+
+
+def _refused_url():
+    # A port that was just free; nothing listens on it
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/"
+
+
+async def _with_server(run):
+    server = TestServer(_stub_app())
+    await server.start_server()
+    try:
+        return await run(lambda path: str(server.make_url(path)))
+    finally:
+        await server.close()
+
+
+def test_probe_outcomes():
+    async def run(url):
+        return await probe_all(
+            [(1, url("/ok")), (2, url("/error")), (3, url("/slow")), (4, _refused_url())],
+            timeout=TIMEOUT,
+        )
+
+    ok, error, slow, refused = asyncio.run(_with_server(run))
+
+    assert ok.ok and ok.status_code == 200 and ok.error is None
+    assert 0 <= ok.latency_ms < TIMEOUT * 1000
+
+    assert not error.ok and error.status_code == 500
+    assert error.latency_ms is not None
+
+    assert not slow.ok and slow.status_code is None and slow.latency_ms is None
+    assert "Timeout" in slow.error
+
+    assert not refused.ok and refused.status_code is None and refused.latency_ms is None
+    assert refused.error.startswith("ClientConnectorError")
+
+
+def test_latency_leaves_out_connection_waits():
+    async def run(url):
+        # One connection per host, so the second probe queues behind the first
+        return await probe_all([(1, url("/busy")), (2, url("/busy"))], timeout=TIMEOUT, per_host=1)
+
+    first, second = asyncio.run(_with_server(run))
+
+    assert first.ok and second.ok
+    assert second.latency_ms < 550
+    assert first.latency_ms >= 300 and second.latency_ms >= 300
+
+
+def test_queued_probes_do_not_time_out():
+    async def run(url):
+        # Together they take longer than the timeout, each one does not
+        targets = [(i, url("/busy")) for i in range(3)]
+        return await probe_all(targets, timeout=TIMEOUT, per_host=1)
+
+    results = asyncio.run(_with_server(run))
+
+    assert all(result.ok for result in results)
+
+
+def test_round_stores_status_latency_and_last_seen(monkeypatch, db):
+    monkeypatch.setattr(health, "probe_all", functools.partial(probe_all, timeout=TIMEOUT))
+
+    project = make_project(db)
+    instances = [make_instance(db, project, name) for name in ("Up", "Error", "Slow", "Refused")]
+    first_round = {}
+
+    async def run(url):
+        for instance, target in zip(instances, (url("/ok"), url("/error"), url("/slow"), _refused_url())):
+            instance.url = target
+        db.commit()
+
+        checker = HealthChecker()
+        for result in await checker.run_once():
+            first_round[result.instance_id] = result
+
+        db.expire_all()
+        up = db.get(InstanceHealth, instances[0].id)
+        assert up.ok and up.status_code == 200 and up.latency_ms is not None
+        assert up.last_seen_at == up.checked_at
+
+        # The instance that was up goes down
+        instances[0].url = url("/error")
+        db.commit()
+        return await checker.run_once()
+
+    asyncio.run(_with_server(run))
+
+    db.expire_all()
+    rows = {row.instance_id: row for row in db.query(InstanceHealth)}
+    up, error, slow, refused = (rows[instance.id] for instance in instances)
+
+    # Went down in the second round but keeps the time it was last seen up
+    assert not up.ok and up.status_code == 500
+    assert up.last_seen_at == first_round[instances[0].id].checked_at.replace(tzinfo=None)
+
+    assert not error.ok and error.status_code == 500 and error.latency_ms is not None
+    assert error.last_seen_at is None
+
+    assert not slow.ok and slow.latency_ms is None and "Timeout" in slow.error
+    assert slow.last_seen_at is None
+
+    assert not refused.ok and refused.error.startswith("ClientConnectorError")
+    assert refused.last_seen_at is None
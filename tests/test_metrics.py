@@ -0,0 +1,82 @@
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.metrics import MetricsMiddleware
+
+from .conftest import build_app, make_project
+
+SAMPLE = re.compile(r'^([a-z_]+)(\{(?:[a-z_]+="[^"]*",?)*\})? (-?[0-9.e+-]+|\+Inf)$')
+
+
+@pytest.fixture
+def metrics_client():
+    app = build_app("sync")
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route("/metrics", main.read_metrics)
+    with TestClient(app) as client:
+        yield client
+
+
+def _samples(client) -> dict:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    samples = {}
+    for line in response.text.splitlines():
+        if not line.startswith("#"):
+            name, labels, value = SAMPLE.match(line).groups()
+            samples[name + (labels or "")] = float(value)
+    return samples
+
+
+def test_exposition_format(metrics_client):
+    response = metrics_client.get("/metrics")
+
+    assert response.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    lines = response.text.splitlines()
+    for line in lines:
+        assert line.startswith(("# HELP ", "# TYPE ")) or SAMPLE.match(line), line
+
+    declared = [line.split()[2] for line in lines if line.startswith("# TYPE ")]
+    assert {"http_requests_total", "http_request_duration_seconds", "http_requests_in_flight"} <= set(declared)
+    assert len(declared) == len(set(declared))
+
+
+def test_requests_are_labelled_by_route_template(metrics_client, db, admin_headers):
+    first, second = make_project(db, "One"), make_project(db, "Two")
+    key = 'http_requests_total{method="GET",route="/projects/{project_id}",status="200"}'
+    before = _samples(metrics_client).get(key, 0)
+
+    metrics_client.get(f"/projects/{first.id}", headers=admin_headers)
+    metrics_client.get(f"/projects/{second.id}", headers=admin_headers)
+
+    samples = _samples(metrics_client)
+    assert samples[key] == before + 2
+    assert not any(f"/projects/{first.id}" in name for name in samples)
+
+
+def test_histogram_buckets_add_up(metrics_client, admin_headers):
+    for _ in range(3):
+        metrics_client.get("/clients/", headers=admin_headers)
+
+    labels = 'method="GET",route="/clients/"'
+    samples = _samples(metrics_client)
+    buckets = [
+        (float(le), value) for name, value in samples.items()
+        for le in re.findall(rf'^http_request_duration_seconds_bucket\{{{labels},le="([^"]+)"\}}$', name)
+    ]
+    counts = [value for _, value in sorted(buckets)]
+
+    assert counts == sorted(counts)
+    assert counts[-1] == samples[f"http_request_duration_seconds_count{{{labels}}}"] >= 3
+    assert samples[f"http_request_duration_seconds_sum{{{labels}}}"] > 0
+
+
+def test_metrics_token(monkeypatch, metrics_client):
+    monkeypatch.setattr(main, "METRICS_TOKEN", "scrape-secret")
+
+    assert metrics_client.get("/metrics").status_code == 401
+    assert metrics_client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert metrics_client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
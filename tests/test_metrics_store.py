@@ -0,0 +1,56 @@
+import types
+
+import pytest
+
+from app.metrics_store import MINUTE, append_samples, check_dialect
+from app.models import InstanceMetricRollup, InstanceSample
+
+from .conftest import make_instance, make_project
+
+TS = 1_700_000_040
+
+
+def _sample(instance_id, ts=TS, ok=True, latency_ms=10):
+    return {"instance_id": instance_id, "ts": ts, "ok": ok, "status_code": 200, "latency_ms": latency_ms}
+
+
+def _minute_rollup(db, instance_id):
+    return db.query(InstanceMetricRollup).filter_by(
+        instance_id=instance_id, resolution=MINUTE, bucket=TS - TS % MINUTE
+    ).one()
+
+
+def test_rollups_count_each_stored_sample_once(db):
+    instance = make_instance(db, make_project(db))
+
+    append_samples(db, [_sample(instance.id, latency_ms=10)])
+    db.commit()
+    # Already stored, e.g. a round rerun within the same second
+    append_samples(db, [_sample(instance.id, ok=False, latency_ms=900)])
+    db.commit()
+
+    assert db.query(InstanceSample).count() == 1
+    rollup = _minute_rollup(db, instance.id)
+    assert (rollup.samples, rollup.ok_samples, rollup.latency_sum, rollup.latency_max) == (1, 1, 10, 10)
+
+
+def test_rollups_skip_keys_repeated_within_a_batch(db):
+    instance = make_instance(db, make_project(db))
+
+    append_samples(db, [
+        _sample(instance.id, latency_ms=10),
+        _sample(instance.id, latency_ms=20),
+        _sample(instance.id, ts=TS + 1, latency_ms=30),
+    ])
+    db.commit()
+
+    assert db.query(InstanceSample).count() == 2
+    rollup = _minute_rollup(db, instance.id)
+    assert (rollup.samples, rollup.latency_sum, rollup.latency_min, rollup.latency_max) == (2, 40, 10, 30)
+
+
+def test_unsupported_database_is_refused():
+    bind = types.SimpleNamespace(dialect=types.SimpleNamespace(name="mssql"))
+
+    with pytest.raises(RuntimeError, match="mssql"):
+        check_dialect(bind)
@@ -0,0 +1,40 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.password_pool import PasswordPool
+
+
+def test_cancelled_caller_keeps_its_slot_until_the_job_ends():
+    pool = PasswordPool(workers=1, queue_size=0)
+    started, finish = threading.Event(), threading.Event()
+
+    def job():
+        started.set()
+        finish.wait(2)
+
+    async def run():
+        caller = asyncio.create_task(pool.run_async(job))
+        await asyncio.to_thread(started.wait, 2)
+        # As when the client disconnects mid-login
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+
+        # The job still runs, so there is no room for another
+        assert pool.stats()["in_flight"] == 1
+        with pytest.raises(HTTPException) as refused:
+            await pool.run_async(job)
+        assert refused.value.status_code == 503
+
+        finish.set()
+        deadline = time.monotonic() + 2
+        while pool.stats()["in_flight"] and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        return await pool.run_async(lambda: "done")
+
+    assert asyncio.run(run()) == "done"
+    assert pool.stats()["rejected"] == 1
@@ -0,0 +1,65 @@
+"""List endpoints must issue the same statements however many rows they return."""
+from datetime import datetime, timezone
+
+import pytest
+
+from app.membership_cache import membership_cache
+from app.models import InstanceHealth
+from app.query_stats import query_stats
+from app.user_cache import user_cache
+
+from .conftest import make_instance, make_project, make_user
+
+# The auth lookup, the membership lookup for standard users, the main query
+# and one selectinload per serialised relationship
+LIST_ENDPOINT_QUERY_BUDGET = 4
+
+LIST_ENDPOINTS = [
+    ("/clients/", "admin"),
+    ("/projects/", "admin"),
+    ("/projects/", "member"),
+    ("/instances/", "admin"),
+    ("/instances/", "member"),
+    ("/instances/health", "admin"),
+    ("/instances/health", "member"),
+    ("/users/", "admin"),
+    ("/users/with-projects", "admin"),
+]
+
+
+def _seed(db, member, start: int, stop: int):
+    """Projects visible to `member`, each with an instance, a health row and a user of its own."""
+    now = datetime.now(timezone.utc)
+    for i in range(start, stop):
+        user = make_user(db, f"user{i}@example.com")
+        project = make_project(db, f"Project {i}", members=[member, user])
+        instance = make_instance(db, project, f"Instance {i}")
+        db.add(InstanceHealth(instance_id=instance.id, ok=True, status_code=200, latency_ms=5, checked_at=now))
+    db.commit()
+
+
+def _queries(client, path: str, headers: dict) -> tuple[int, int]:
+    """Statements one request ran, with the user and membership caches cold."""
+    user_cache.clear()
+    membership_cache.clear()
+    query_stats.reset()
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200, response.text
+    (route,) = query_stats.snapshot()["routes"]
+    return route["max_queries"], len(response.json())
+
+
+@pytest.mark.parametrize("path,role", LIST_ENDPOINTS)
+def test_list_endpoint_stays_within_budget(client, db, member, admin_headers, member_headers, path, role):
+    headers = admin_headers if role == "admin" else member_headers
+
+    _seed(db, member, 0, 1)
+    one, returned = _queries(client, path, headers)
+    assert returned >= 1
+
+    # The writes invalidate the cached response, so this one is built again
+    _seed(db, member, 1, 25)
+    many, returned = _queries(client, path, headers)
+    assert returned >= 25
+
+    assert one == many <= LIST_ENDPOINT_QUERY_BUDGET
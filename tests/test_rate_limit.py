@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+
+from app import rate_limit
+from app.rate_limit import LOGIN_ACCOUNT_LIMIT, Limit, MemoryStore
+from app.routers import auth as auth_router
+
+from .conftest import build_app
+
+
+def test_take_spends_and_refunds():
+    store = MemoryStore()
+    limit = Limit(2, 1)
+
+    assert store.take("k", limit, 1) == 0
+    assert store.take("k", limit, 1) == 0
+    assert store.take("k", limit, 1) > 0
+    assert store.take("k", limit, -1) == 0
+    assert store.take("k", limit, 1) == 0
+
+
+def test_refunds_stop_at_the_burst():
+    store = MemoryStore()
+    limit = Limit(2, 1)
+
+    store.take("k", limit, -5)
+    assert store.take("k", limit, 1) == 0
+    assert store.take("k", limit, 1) == 0
+    assert store.take("k", limit, 1) > 0
+
+
+def _count_verifications(monkeypatch):
+    calls = []
+    verify = auth_router.verify_and_update_password_async
+
+    async def counting(plain_password, hashed_password):
+        calls.append(plain_password)
+        # Lets the other requests in while this one "hashes"
+        await asyncio.sleep(0.05)
+        return await verify(plain_password, hashed_password)
+
+    monkeypatch.setattr(auth_router, "verify_and_update_password_async", counting)
+    return calls
+
+
+async def _logins(passwords, email="member@example.com"):
+    transport = httpx.ASGITransport(app=build_app("sync"))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(
+            client.post("/login", data={"username": email, "password": password})
+            for password in passwords
+        ))
+
+
+def test_concurrent_guesses_share_the_account_bucket(monkeypatch, member):
+    monkeypatch.setattr(rate_limit, "LOGIN_IP_LIMIT", Limit(1000, 60))
+    calls = _count_verifications(monkeypatch)
+    attempts = LOGIN_ACCOUNT_LIMIT.burst * 4
+
+    responses = asyncio.run(_logins([f"guess-{i}" for i in range(attempts)]))
+
+    assert len(calls) <= LOGIN_ACCOUNT_LIMIT.burst
+    codes = sorted(response.status_code for response in responses)
+    assert codes.count(401) == len(calls)
+    assert codes.count(429) == attempts - len(calls)
+
+
+def test_successful_logins_give_the_token_back(monkeypatch, member):
+    monkeypatch.setattr(rate_limit, "LOGIN_IP_LIMIT", Limit(1000, 60))
+
+    for _ in range(LOGIN_ACCOUNT_LIMIT.burst * 2):
+        responses = asyncio.run(_logins(["secret"]))
+        assert responses[0].status_code == 200
@@ -0,0 +1,83 @@
+import sys
+import time
+import types
+
+import pytest
+
+from app.response_cache import CachedBody, RedisBackend
+
+
+class FakeRedis:
+    """Strings and sorted sets with expiry; no SCAN, so stats() cannot walk the keyspace."""
+
+    def __init__(self):
+        self.values = {}
+        self.sorted_sets = {}
+
+    def set(self, key, value, ex):
+        self.values[key] = value
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def zadd(self, name, mapping):
+        self.sorted_sets.setdefault(name, {}).update(mapping)
+
+    def zremrangebyscore(self, name, low, high):
+        members = self.sorted_sets.get(name, {})
+        for member, score in list(members.items()):
+            if float(low) <= score <= float(high):
+                del members[member]
+
+    def zcount(self, name, low, high):
+        return sum(1 for score in self.sorted_sets.get(name, {}).values() if float(low) <= score <= float(high))
+
+    def pipeline(self, transaction):
+        return FakePipeline(self)
+
+    def info(self, section):
+        return {"used_memory": 1024, "maxmemory": 0}
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self._calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in self._calls]
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    server = FakeRedis()
+    module = types.ModuleType("redis")
+    module.Redis = types.SimpleNamespace(from_url=lambda url: server)
+    monkeypatch.setitem(sys.modules, "redis", module)
+    return RedisBackend()
+
+
+def test_stats_count_live_entries(backend, monkeypatch):
+    backend.set("a", CachedBody(b"[]"), ttl=60)
+    backend.set("b", CachedBody(b"[1]", "next"), ttl=60)
+    backend.set("a", CachedBody(b"[2]"), ttl=60)
+
+    assert backend.stats()["entries"] == 2
+    assert backend.get("b").next_cursor == "next"
+
+    later = time.time() + 120
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert backend.stats()["entries"] == 0
+
+
+def test_expired_entries_leave_the_index(backend, monkeypatch):
+    backend.set("old", CachedBody(b"[]"), ttl=1)
+
+    later = time.time() + 10
+    monkeypatch.setattr(time, "time", lambda: later)
+    backend.set("new", CachedBody(b"[]"), ttl=60)
+
+    assert list(backend._client.sorted_sets[backend._index]) == ["new"]
@@ -0,0 +1,503 @@
+"""The resource routers, run once against each DB_MODE."""
+import json
+import re
+
+from app import models
+from app.query_stats import query_stats
+
+from .conftest import auth_headers, make_instance, make_project, make_user
+
+
+def _ids(response):
+    assert response.status_code == 200, response.text
+    return sorted(row["id"] for row in response.json())
+
+
+# Clients
+
+def test_client_crud(client, admin_headers):
+    created = client.post("/clients/", params={"name": "Acme"}, headers=admin_headers)
+    assert created.status_code == 200
+    client_id = created.json()["id"]
+
+    assert client.get("/clients/", headers=admin_headers).json() == [{"id": client_id, "name": "Acme"}]
+
+    renamed = client.patch(f"/clients/{client_id}", json={"name": "Acme Corp"}, headers=admin_headers)
+    assert renamed.status_code == 200
+    assert client.get("/clients/", headers=admin_headers).json()[0]["name"] == "Acme Corp"
+
+    assert client.delete(f"/clients/{client_id}", headers=admin_headers).status_code == 200
+    assert client.get("/clients/", headers=admin_headers).json() == []
+    assert client.delete(f"/clients/{client_id}", headers=admin_headers).status_code == 404
+
+
+def test_clients_are_admin_only(client, member_headers):
+    assert client.get("/clients/", headers=member_headers).status_code == 403
+    assert client.post("/clients/", params={"name": "Acme"}, headers=member_headers).status_code == 403
+
+
+def test_clients_need_a_token(client):
+    assert client.get("/clients/").status_code == 401
+
+
+def test_client_pages(client, admin_headers):
+    for name in ("a", "b", "c"):
+        client.post("/clients/", params={"name": name}, headers=admin_headers)
+
+    first = client.get("/clients/", params={"limit": 2}, headers=admin_headers)
+    assert [row["name"] for row in first.json()] == ["a", "b"]
+    cursor = first.headers["X-Next-Cursor"]
+
+    last = client.get("/clients/", params={"limit": 2, "cursor": cursor}, headers=admin_headers)
+    assert [row["name"] for row in last.json()] == ["c"]
+    assert "X-Next-Cursor" not in last.headers
+
+
+# Projects
+
+def test_project_crud(client, db, admin_headers):
+    acme = models.Client(name="Acme")
+    db.add(acme)
+    db.commit()
+
+    created = client.post("/projects/", json={"name": "ERP", "client_id": acme.id}, headers=admin_headers)
+    assert created.status_code == 200
+    project_id = created.json()["id"]
+
+    renamed = client.patch(f"/projects/{project_id}", json={"name": "CRM"}, headers=admin_headers)
+    assert renamed.status_code == 200
+    assert renamed.json()["name"] == "CRM"
+    assert client.get(f"/projects/{project_id}", headers=admin_headers).json()["name"] == "CRM"
+
+    assert client.delete(f"/projects/{project_id}", headers=admin_headers).status_code == 200
+    assert client.get(f"/projects/{project_id}", headers=admin_headers).status_code == 404
+
+
+def test_project_needs_an_existing_client(client, admin_headers):
+    response = client.post("/projects/", json={"name": "ERP", "client_id": 999}, headers=admin_headers)
+    assert response.status_code == 404
+
+
+def test_members_only_see_their_projects(client, db, member, admin_headers, member_headers):
+    mine = make_project(db, "Mine", members=[member])
+    other = make_project(db, "Other")
+
+    assert _ids(client.get("/projects/", headers=admin_headers)) == [mine.id, other.id]
+    assert _ids(client.get("/projects/", headers=member_headers)) == [mine.id]
+    assert client.get(f"/projects/{mine.id}", headers=member_headers).status_code == 200
+    assert client.get(f"/projects/{other.id}", headers=member_headers).status_code == 403
+
+
+def test_assign_and_unassign(client, db, member, admin_headers, member_headers):
+    project = make_project(db)
+    path = f"/projects/{project.id}/assign/{member.id}"
+
+    assert client.get(f"/projects/{project.id}", headers=member_headers).status_code == 403
+
+    assert client.post(path, headers=admin_headers).status_code == 200
+    assert client.post(path, headers=admin_headers).status_code == 400
+    assert client.get(f"/projects/{project.id}", headers=member_headers).status_code == 200
+    assert _ids(client.get("/projects/", headers=member_headers)) == [project.id]
+
+    assert client.delete(path, headers=admin_headers).status_code == 200
+    assert client.delete(path, headers=admin_headers).status_code == 404
+    assert client.get(f"/projects/{project.id}", headers=member_headers).status_code == 403
+    assert _ids(client.get("/projects/", headers=member_headers)) == []
+
+
+def test_project_changes_are_admin_only(client, db, member, member_headers):
+    project = make_project(db, members=[member])
+
+    assert client.patch(f"/projects/{project.id}", json={"name": "x"}, headers=member_headers).status_code == 403
+    assert client.delete(f"/projects/{project.id}", headers=member_headers).status_code == 403
+    assert client.post(f"/projects/{project.id}/assign/{member.id}", headers=member_headers).status_code == 403
+
+
+# Instances
+
+def _instance_body(project_id, name="Prod", instance_type="PRODUCTION", is_active=True):
+    return {
+        "name": name,
+        "url": f"https://{name.lower()}.example.com",
+        "instance_type": instance_type,
+        "is_active": is_active,
+        "project_id": project_id,
+    }
+
+
+def test_instance_crud(client, db, member, member_headers):
+    project = make_project(db, members=[member])
+
+    created = client.post("/instances/", json=_instance_body(project.id), headers=member_headers)
+    assert created.status_code == 200
+    instance_id = created.json()["id"]
+
+    fetched = client.get(f"/instances/{instance_id}", headers=member_headers)
+    assert fetched.json()["instance_type"] == "PRODUCTION"
+
+    updated = client.patch(f"/instances/{instance_id}", json={"name": "Live"}, headers=member_headers)
+    assert updated.status_code == 200
+    assert client.get(f"/instances/{instance_id}", headers=member_headers).json()["name"] == "Live"
+
+    assert client.delete(f"/instances/{instance_id}", headers=member_headers).status_code == 200
+    assert client.get(f"/instances/{instance_id}", headers=member_headers).status_code == 404
+
+
+def test_one_active_production_instance_per_project(client, db, admin_headers):
+    project = make_project(db)
+
+    first = client.post("/instances/", json=_instance_body(project.id, "One"), headers=admin_headers)
+    assert first.status_code == 200
+    second = client.post("/instances/", json=_instance_body(project.id, "Two"), headers=admin_headers)
+    assert second.status_code == 400
+
+    inactive = client.post(
+        "/instances/", json=_instance_body(project.id, "Three", is_active=False), headers=admin_headers
+    )
+    assert inactive.status_code == 200
+    reactivated = client.patch(
+        f"/instances/{inactive.json()['id']}", json={"is_active": True}, headers=admin_headers
+    )
+    assert reactivated.status_code == 400
+
+
+def test_members_only_reach_instances_of_their_projects(client, db, member, admin_headers, member_headers):
+    mine = make_project(db, "Mine", members=[member])
+    other = make_project(db, "Other")
+    visible = make_instance(db, mine, "Visible")
+    hidden = make_instance(db, other, "Hidden")
+
+    assert _ids(client.get("/instances/", headers=admin_headers)) == [visible.id, hidden.id]
+    assert _ids(client.get("/instances/", headers=member_headers)) == [visible.id]
+    assert _ids(client.get("/instances/", params={"project_id": mine.id}, headers=member_headers)) == [visible.id]
+    assert client.get("/instances/", params={"project_id": other.id}, headers=member_headers).status_code == 404
+
+    assert client.get(f"/instances/{hidden.id}", headers=member_headers).status_code == 403
+    assert client.patch(f"/instances/{hidden.id}", json={"name": "x"}, headers=member_headers).status_code == 403
+    assert client.delete(f"/instances/{hidden.id}", headers=member_headers).status_code == 403
+    created = client.post("/instances/", json=_instance_body(other.id), headers=member_headers)
+    assert created.status_code == 403
+
+
+def test_instance_needs_an_existing_project(client, admin_headers):
+    response = client.post("/instances/", json=_instance_body(999), headers=admin_headers)
+    assert response.status_code == 404
+
+
+def test_bulk_instances(client, db, admin_headers):
+    project = make_project(db)
+    existing = make_instance(db, project, "Existing")
+
+    response = client.post("/instances/bulk", json={"operations": [
+        {"op": "create", "data": _instance_body(project.id, "New", "STAGING")},
+        {"op": "update", "id": existing.id, "data": {"name": "Renamed"}},
+    ]}, headers=admin_headers)
+    assert response.status_code == 200, response.text
+
+    names = sorted(row["name"] for row in client.get("/instances/", headers=admin_headers).json())
+    assert names == ["New", "Renamed"]
+
+
+def test_bulk_instances_apply_all_or_nothing(client, db, admin_headers):
+    project = make_project(db)
+    existing = make_instance(db, project, "Existing")
+
+    response = client.post("/instances/bulk", json={"operations": [
+        {"op": "update", "id": existing.id, "data": {"name": "Renamed"}},
+        {"op": "delete", "id": 999},
+        {"op": "create"},
+    ]}, headers=admin_headers)
+    assert response.status_code == 400
+
+    results = response.json()["results"]
+    assert not response.json()["applied"]
+    assert [result["status"] for result in results] == [424, 404, 422]
+    assert client.get(f"/instances/{existing.id}", headers=admin_headers).json()["name"] == "Existing"
+
+
+# Users
+
+def test_user_crud(client, admin, admin_headers):
+    created = client.post(
+        "/users/", json={"email": "new@example.com", "password": "pw", "role": "STANDARD"}, headers=admin_headers
+    )
+    assert created.status_code == 200
+    user_id = created.json()["id"]
+
+    duplicate = client.post(
+        "/users/", json={"email": "new@example.com", "password": "pw", "role": "STANDARD"}, headers=admin_headers
+    )
+    assert duplicate.status_code == 400
+
+    promoted = client.patch(f"/users/{user_id}", json={"role": "ADMIN"}, headers=admin_headers)
+    assert promoted.status_code == 200
+    assert promoted.json()["role"] == "ADMIN"
+
+    assert _ids(client.get("/users/", headers=admin_headers)) == [admin.id, user_id]
+
+    assert client.delete(f"/users/{user_id}", headers=admin_headers).status_code == 200
+    assert client.delete(f"/users/{user_id}", headers=admin_headers).status_code == 404
+    assert _ids(client.get("/users/", headers=admin_headers)) == [admin.id]
+
+
+def test_admin_cannot_delete_themselves(client, admin, admin_headers):
+    assert client.delete(f"/users/{admin.id}", headers=admin_headers).status_code == 400
+
+
+def test_users_with_projects(client, db, member, admin_headers):
+    project = make_project(db, members=[member])
+
+    rows = {row["id"]: row for row in client.get("/users/with-projects", headers=admin_headers).json()}
+    assert [p["id"] for p in rows[member.id]["projects"]] == [project.id]
+
+
+def test_users_are_admin_only(client, member, member_headers):
+    assert client.get("/users/", headers=member_headers).status_code == 403
+    assert client.patch(f"/users/{member.id}", json={"role": "ADMIN"}, headers=member_headers).status_code == 403
+
+
+def test_password_change_revokes_tokens(client, db, member, admin_headers):
+    headers = auth_headers(member)
+    assert client.get("/projects/", headers=headers).status_code == 200
+
+    assert client.patch(f"/users/{member.id}", json={"password": "new"}, headers=admin_headers).status_code == 200
+    assert client.get("/projects/", headers=headers).status_code == 401
+
+    login = client.post("/login", data={"username": member.email, "password": "new"})
+    assert login.status_code == 200
+
+
+def test_deleting_a_user_ends_their_sessions(client, db, admin_headers):
+    user = make_user(db, "gone@example.com")
+    headers = auth_headers(user)
+    assert client.get("/projects/", headers=headers).status_code == 200
+
+    assert client.delete(f"/users/{user.id}", headers=admin_headers).status_code == 200
+    assert client.get("/projects/", headers=headers).status_code == 401
+
+
+# NDJSON streaming
+
+NDJSON = {"Accept": "application/x-ndjson"}
+
+
+def _ndjson(response):
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_lists_stream_the_same_rows_as_ndjson(client, db, member, admin_headers, member_headers):
+    mine = make_project(db, "Mine", members=[member])
+    other = make_project(db, "Other")
+    make_instance(db, mine, "Visible")
+    make_instance(db, other, "Hidden")
+
+    for path in ("/clients/", "/projects/", "/instances/", "/users/"):
+        streamed = _ndjson(client.get(path, headers={**admin_headers, **NDJSON}))
+        assert streamed == client.get(path, headers=admin_headers).json()
+
+    streamed = _ndjson(client.get("/instances/", headers={**member_headers, **NDJSON}))
+    assert [row["name"] for row in streamed] == ["Visible"]
+
+
+def test_streamed_fields(client, db, admin_headers):
+    project = make_project(db)
+    instance = make_instance(db, project)
+
+    response = client.get("/instances/", params={"fields": "name,is_active"}, headers={**admin_headers, **NDJSON})
+
+    assert _ndjson(response) == [{"id": instance.id, "name": instance.name, "is_active": True}]
+
+
+def test_streamed_pages(client, admin_headers):
+    for name in ("a", "b", "c"):
+        client.post("/clients/", params={"name": name}, headers=admin_headers)
+    headers = {**admin_headers, **NDJSON}
+
+    first = client.get("/clients/", params={"limit": 2}, headers=headers)
+    assert [row["name"] for row in _ndjson(first)] == ["a", "b"]
+    cursor = first.headers["X-Next-Cursor"]
+
+    last = client.get("/clients/", params={"limit": 2, "cursor": cursor}, headers=headers)
+    assert [row["name"] for row in _ndjson(last)] == ["c"]
+    assert "X-Next-Cursor" not in last.headers
+
+
+# ETags
+
+def test_unchanged_list_answers_304(client, db, admin_headers):
+    make_project(db)
+    first = client.get("/projects/", headers=admin_headers)
+    etag = first.headers["ETag"]
+
+    again = client.get("/projects/", headers={**admin_headers, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == etag
+
+
+def test_write_changes_the_etag(client, admin_headers):
+    etag = client.get("/clients/", headers=admin_headers).headers["ETag"]
+
+    client.post("/clients/", params={"name": "Acme"}, headers=admin_headers)
+
+    changed = client.get("/clients/", headers={**admin_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert [row["name"] for row in changed.json()] == ["Acme"]
+
+
+def test_etag_depends_on_scope_and_query(client, db, member, admin_headers, member_headers):
+    other = make_user(db, "other@example.com")
+    make_project(db, members=[member, other])
+
+    def etag(headers, **params):
+        response = client.get("/projects/", params=params, headers=headers)
+        assert response.status_code == 200
+        return response.headers["ETag"]
+
+    etags = {
+        etag(admin_headers),
+        etag(member_headers),
+        etag(auth_headers(other)),
+        etag(admin_headers, limit=1),
+        etag(admin_headers, fields="name"),
+    }
+    assert len(etags) == 5
+
+    # One visibility scope's ETag does not revalidate another's
+    admin_etag = etag(admin_headers)
+    response = client.get("/projects/", headers={**member_headers, "If-None-Match": admin_etag})
+    assert response.status_code == 200
+
+
+# Dashboard
+
+def test_dashboard_aggregates_projects(client, db, admin_headers, member):
+    alpha = make_project(db, "Alpha", members=[member])
+    beta = make_project(db, "Beta")
+    prod = make_instance(db, alpha, "Alpha prod", models.OdooInstanceType.PRODUCTION)
+    staging = make_instance(db, alpha, "Alpha staging")
+
+    response = client.get("/dashboard/", headers=admin_headers)
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert [c["id"] for c in body["clients"]] == [alpha.client_id, beta.client_id]
+    projects = {p["id"]: p for p in body["projects"]}
+    assert set(projects) == {alpha.id, beta.id}
+    assert projects[alpha.id]["client_id"] == alpha.client_id
+    assert [u["id"] for u in projects[alpha.id]["users"]] == [member.id]
+    assert [i["id"] for i in projects[alpha.id]["instances"]] == [prod.id, staging.id]
+    assert projects[beta.id]["users"] == projects[beta.id]["instances"] == []
+
+
+def test_dashboard_only_shows_a_members_projects(client, db, member, member_headers):
+    mine = make_project(db, "Mine", members=[member])
+    other = make_project(db, "Other")
+    make_instance(db, mine, "Mine dev")
+    make_instance(db, other, "Other dev")
+
+    body = client.get("/dashboard/", headers=member_headers).json()
+
+    assert [c["id"] for c in body["clients"]] == [mine.client_id]
+    assert [p["id"] for p in body["projects"]] == [mine.id]
+    assert [i["name"] for i in body["projects"][0]["instances"]] == ["Mine dev"]
+
+
+# Query statistics
+
+def test_server_timing_and_route_totals(client, db, admin_headers):
+    make_project(db)
+    query_stats.reset()
+
+    response = client.get("/projects/", headers=admin_headers)
+
+    timing = re.fullmatch(r'db;dur=(\d+\.\d{2});desc="(\d+) queries"', response.headers["Server-Timing"])
+    assert timing is not None, response.headers["Server-Timing"]
+    queries = int(timing[2])
+    assert queries >= 1
+
+    routes = {row["route"]: row for row in client.get("/db/queries", headers=admin_headers).json()["routes"]}
+    assert routes["GET /projects/"]["requests"] == 1
+    assert routes["GET /projects/"]["max_queries"] == queries
+
+
+def test_route_totals_use_the_route_template(client, db, admin_headers):
+    first, second = make_project(db, "One"), make_project(db, "Two")
+    query_stats.reset()
+
+    client.get(f"/projects/{first.id}", headers=admin_headers)
+    client.get(f"/projects/{second.id}", headers=admin_headers)
+
+    routes = {row["route"]: row for row in client.get("/db/queries", headers=admin_headers).json()["routes"]}
+    assert routes["GET /projects/{project_id}"]["requests"] == 2
+    assert not any(str(first.id) in route for route in routes)
+
+
+# Search
+
+def _hits(client, headers, q, **params):
+    response = client.get("/search/", params={"q": q, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [(hit["type"], hit["name"]) for hit in response.json()["hits"]]
+
+
+def test_search_index_follows_writes(client, search_index, admin_headers):
+    client_id = client.post("/clients/", params={"name": "Acme"}, headers=admin_headers).json()["id"]
+    assert _hits(client, admin_headers, "acme") == [("client", "Acme")]
+
+    client.patch(f"/clients/{client_id}", json={"name": "Globex"}, headers=admin_headers)
+    assert _hits(client, admin_headers, "acme") == []
+    assert _hits(client, admin_headers, "globex") == [("client", "Globex")]
+
+    client.delete(f"/clients/{client_id}", headers=admin_headers)
+    assert _hits(client, admin_headers, "globex") == []
+
+
+def test_search_ranks_names_over_details(monkeypatch, client, db, search_index, admin_headers):
+    project = make_project(db, "Zeta")
+    for name in ("One", "Two", "Three"):
+        instance = make_instance(db, project, name)
+        instance.url = f"https://{name.lower()}.acme.example.com"
+    db.add(models.Client(name="Big Acme"))
+    db.add(models.Client(name="Acme"))
+    db.commit()
+
+    # Prefix matches first, then names before URLs
+    assert _hits(client, admin_headers, "acme")[:3] == [
+        ("client", "Acme"), ("client", "Big Acme"), ("instance", "One"),
+    ]
+
+    # The candidate cut keeps the best matches, not the oldest rows
+    monkeypatch.setattr("app.search.SEARCH_CANDIDATES", 2)
+    assert _hits(client, admin_headers, "acme") == [("client", "Acme"), ("client", "Big Acme")]
+
+
+def test_short_queries_match_substrings(client, db, search_index, admin_headers):
+    make_project(db, "Acme")
+    db.add(models.Client(name="Zac"))
+    db.commit()
+
+    assert _hits(client, admin_headers, "ac") == [
+        ("project", "Acme"), ("client", "Acme client"), ("client", "Zac"),
+    ]
+
+
+def test_search_scope(client, db, member, search_index, admin_headers, member_headers):
+    mine = make_project(db, "Mine", members=[member])
+    other = make_project(db, "Other")
+    make_instance(db, mine, "Mine server")
+    make_instance(db, other, "Other server")
+
+    assert sorted(_hits(client, member_headers, "mine")) == [
+        ("client", "Mine client"), ("instance", "Mine server"), ("project", "Mine"),
+    ]
+    assert _hits(client, member_headers, "other") == []
+    assert _hits(client, member_headers, "example.com", types="user") == []
+
+    assert len(_hits(client, admin_headers, "other")) == 3
+    assert _hits(client, admin_headers, "example.com", types="user") == [
+        ("user", "admin@example.com"), ("user", "member@example.com"),
+    ]